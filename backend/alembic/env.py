@@ -6,6 +6,7 @@ from alembic import context
 sys.path.append(os.path.join(os.getcwd(), "app"))  # make sure app is importable
 
 from app.database import Base  # your SQLAlchemy Base
+from app import models  # noqa: F401  (registers the tables on Base.metadata)
 
 config = context.config
 
@@ -0,0 +1,311 @@
+"""baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+The schema as the app created it with `Base.metadata.create_all` at startup,
+before migrations existed, written out table by table so it never follows
+later model changes. A database created that way already has all of it:
+mark it as migrated once with
+
+    alembic stamp 0001
+
+and `alembic upgrade head` applies the later revisions from there.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('forum',
+        sa.Column('fid', sa.Integer(), nullable=False),
+        sa.Column('forum_name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('fid')
+    )
+    op.create_table('post_tags',
+        sa.Column('ptid', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('ptid'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_table('tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_table('users',
+        sa.Column('uid', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('password', sa.String(), nullable=True),
+        sa.Column('oauth_provider', sa.String(), nullable=True),
+        sa.Column('oauth_id', sa.String(), nullable=True),
+        sa.Column('birthdate', sa.TIMESTAMP(), nullable=True),
+        sa.Column('university', sa.String(), nullable=True),
+        sa.Column('is_private', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('profile_image', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('is_admin', sa.Boolean(), nullable=False),
+        sa.Column('is_banned', sa.Boolean(), nullable=True),
+        sa.Column('ban_until', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('uid'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('username')
+    )
+    op.create_table('blocks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('blocker_id', sa.Integer(), nullable=True),
+        sa.Column('blocked_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['blocked_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['blocker_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('blocker_id', 'blocked_id', name='unique_block')
+    )
+    op.create_index(op.f('ix_blocks_id'), 'blocks', ['id'], unique=False)
+    op.create_table('chats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user1_id', sa.Integer(), nullable=False),
+        sa.Column('user2_id', sa.Integer(), nullable=False),
+        sa.Column('user1_last_read_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('user2_last_read_at', sa.DateTime(timezone=True), nullable=True),
+        sa.CheckConstraint('user1_id < user2_id', name='ck_chat_order'),
+        sa.ForeignKeyConstraint(['user1_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user2_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user1_id', 'user2_id', name='uq_chat_pair')
+    )
+    op.create_table('daily_progress',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('total_minutes', sa.Integer(), nullable=False),
+        sa.Column('badge_level', sa.Integer(), nullable=False),
+        sa.Column('total_seconds', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('follow_requests',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('requester_id', sa.Integer(), nullable=True),
+        sa.Column('receiver_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.Enum('pending', 'approved', 'rejected', name='follow_request_status'), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['receiver_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['requester_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_follow_requests_id'), 'follow_requests', ['id'], unique=False)
+    op.create_table('follows',
+        sa.Column('follower_id', sa.Integer(), nullable=False),
+        sa.Column('following_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['follower_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['following_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('follower_id', 'following_id')
+    )
+    op.create_table('forum_tags',
+        sa.Column('forum_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['forum_id'], ['forum.fid']),
+        sa.ForeignKeyConstraint(['tag_id'], ['tags.id']),
+        sa.PrimaryKeyConstraint('forum_id', 'tag_id')
+    )
+    op.create_table('help_reports',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('message', sa.String(), nullable=False),
+        sa.Column('file_path', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('resolved', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_help_reports_id'), 'help_reports', ['id'], unique=False)
+    op.create_table('news',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('summary', sa.Text(), nullable=True),
+        sa.Column('detail', sa.Text(), nullable=True),
+        sa.Column('hover_text', sa.String(length=255), nullable=True),
+        sa.Column('image_url', sa.String(length=255), nullable=True),
+        sa.Column('is_published', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_news_id'), 'news', ['id'], unique=False)
+    op.create_table('notifications',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('sender_id', sa.Integer(), nullable=True),
+        sa.Column('receiver_id', sa.Integer(), nullable=True),
+        sa.Column('target_role', sa.String(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('is_read', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['sender_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('post',
+        sa.Column('pid', sa.Integer(), nullable=False),
+        sa.Column('post_content', sa.String(), nullable=False),
+        sa.Column('forum_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['forum_id'], ['forum.fid']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('pid')
+    )
+    op.create_table('study_sessions',
+        sa.Column('sid', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('end_time', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('duration_minutes', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('sid')
+    )
+    op.create_table('chat_messages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('chat_id', sa.Integer(), nullable=False),
+        sa.Column('sender_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=True),
+        sa.Column('text', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['chat_id'], ['chats.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['sender_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_msg_chat_created', 'chat_messages', ['chat_id', 'created_at'], unique=False)
+    op.create_table('comments',
+        sa.Column('cid', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['post.pid'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('cid')
+    )
+    op.create_table('likes',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['post.pid']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'post_id')
+    )
+    op.create_table('notification_reads',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('notification_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('read_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['notification_id'], ['notifications.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('post_images',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('caption', sa.String(), nullable=True),
+        sa.Column('file_type', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['post_id'], ['post.pid']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('post_post_tags',
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['post.pid']),
+        sa.ForeignKeyConstraint(['tag_id'], ['post_tags.ptid']),
+        sa.PrimaryKeyConstraint('post_id', 'tag_id')
+    )
+    op.create_table('chat_attachments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('message_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('original_name', sa.String(), nullable=True),
+        sa.Column('mime_type', sa.String(), nullable=True),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['message_id'], ['chat_messages.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('comment_files',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('comment_id', sa.Integer(), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('file_type', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['comment_id'], ['comments.cid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_comment_files_id'), 'comment_files', ['id'], unique=False)
+    op.create_table('reports',
+        sa.Column('rid', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('comment_id', sa.Integer(), nullable=True),
+        sa.Column('reporter_id', sa.Integer(), nullable=False),
+        sa.Column('report_type', sa.String(), nullable=False),
+        sa.Column('reason', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['comment_id'], ['comments.cid']),
+        sa.ForeignKeyConstraint(['post_id'], ['post.pid']),
+        sa.ForeignKeyConstraint(['reporter_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('rid')
+    )
+    op.create_index(op.f('ix_reports_rid'), 'reports', ['rid'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_reports_rid'), table_name='reports')
+    op.drop_table('reports')
+    op.drop_index(op.f('ix_comment_files_id'), table_name='comment_files')
+    op.drop_table('comment_files')
+    op.drop_table('chat_attachments')
+    op.drop_table('post_post_tags')
+    op.drop_table('post_images')
+    op.drop_table('notification_reads')
+    op.drop_table('likes')
+    op.drop_table('comments')
+    op.drop_index('ix_msg_chat_created', table_name='chat_messages')
+    op.drop_table('chat_messages')
+    op.drop_table('study_sessions')
+    op.drop_table('post')
+    op.drop_table('notifications')
+    op.drop_index(op.f('ix_news_id'), table_name='news')
+    op.drop_table('news')
+    op.drop_index(op.f('ix_help_reports_id'), table_name='help_reports')
+    op.drop_table('help_reports')
+    op.drop_table('forum_tags')
+    op.drop_table('follows')
+    op.drop_index(op.f('ix_follow_requests_id'), table_name='follow_requests')
+    op.drop_table('follow_requests')
+    op.drop_table('daily_progress')
+    op.drop_table('chats')
+    op.drop_index(op.f('ix_blocks_id'), table_name='blocks')
+    op.drop_table('blocks')
+    op.drop_table('users')
+    op.drop_table('tags')
+    op.drop_table('post_tags')
+    op.drop_table('forum')
+    sa.Enum(name='follow_request_status').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,108 @@
+"""post and chat counters, and the tables added since the baseline
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:10:00.000000
+
+The post like/comment counters and the chat unread counters are backfilled
+from the rows they summarize. The new tables start empty: media blobs and
+variants (app.media, app.imaging), timeline entries (app.timeline), badge
+counters (app.badges) and stored events (app.events).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("post", sa.Column("like_count", sa.Integer(), nullable=False, server_default=sa.text("0")))
+    op.add_column("post", sa.Column("comment_count", sa.Integer(), nullable=False, server_default=sa.text("0")))
+    op.execute(
+        "UPDATE post SET "
+        "like_count = (SELECT count(*) FROM likes WHERE likes.post_id = post.pid), "
+        "comment_count = (SELECT count(*) FROM comments WHERE comments.post_id = post.pid)"
+    )
+
+    op.add_column("chats", sa.Column("user1_unread", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("chats", sa.Column("user2_unread", sa.Integer(), nullable=False, server_default="0"))
+    op.execute(
+        "UPDATE chats SET "
+        "user1_unread = (SELECT count(*) FROM chat_messages m "
+        "WHERE m.chat_id = chats.id AND m.sender_id <> chats.user1_id "
+        "AND (chats.user1_last_read_at IS NULL OR m.created_at > chats.user1_last_read_at)), "
+        "user2_unread = (SELECT count(*) FROM chat_messages m "
+        "WHERE m.chat_id = chats.id AND m.sender_id <> chats.user2_id "
+        "AND (chats.user2_last_read_at IS NULL OR m.created_at > chats.user2_last_read_at))"
+    )
+
+    op.create_table('media_blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('content_type', sa.String(), nullable=True),
+        sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('sha256'),
+        sa.UniqueConstraint('path')
+    )
+    op.create_table('media_variants',
+        sa.Column('blob_sha256', sa.String(length=64), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=False),
+        sa.Column('format', sa.String(length=10), nullable=False),
+        sa.Column('height', sa.Integer(), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['blob_sha256'], ['media_blobs.sha256'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('blob_sha256', 'width', 'format')
+    )
+    op.create_table('timeline_entries',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['author_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['post_id'], ['post.pid'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'post_id')
+    )
+    op.create_table('user_badges',
+        sa.Column('uid', sa.Integer(), nullable=False),
+        sa.Column('unread_notifications', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('unread_messages', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['uid'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('uid')
+    )
+    op.create_table('user_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_user_events_created_at', 'user_events', ['created_at'], unique=False)
+    op.create_index('ix_user_events_user_id', 'user_events', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_events_user_id', table_name='user_events')
+    op.drop_index('ix_user_events_created_at', table_name='user_events')
+    op.drop_table('user_events')
+    op.drop_table('user_badges')
+    op.drop_table('timeline_entries')
+    op.drop_table('media_variants')
+    op.drop_table('media_blobs')
+    with op.batch_alter_table("chats") as batch:
+        batch.drop_column("user2_unread")
+        batch.drop_column("user1_unread")
+    with op.batch_alter_table("post") as batch:
+        batch.drop_column("comment_count")
+        batch.drop_column("like_count")
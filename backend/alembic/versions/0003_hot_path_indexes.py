@@ -0,0 +1,61 @@
+"""secondary indexes for the feed, notification and study-calendar queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:20:00.000000
+
+Built with CREATE INDEX CONCURRENTLY (outside a transaction) so writes keep
+flowing on a live database. A concurrent build that failed half-way leaves
+an INVALID index behind; those are dropped and rebuilt on the next run.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ("ix_post_forum_pid", "post", ["forum_id", "pid"]),
+    ("ix_post_user_pid", "post", ["user_id", "pid"]),
+    ("ix_likes_post_id", "likes", ["post_id"]),
+    ("ix_comments_post_created", "comments", ["post_id", "created_at"]),
+    ("ix_follows_following_id", "follows", ["following_id"]),
+    ("ix_notifications_receiver_created", "notifications", ["receiver_id", "created_at"]),
+    ("ix_notifications_role_created", "notifications", ["target_role", "created_at"]),
+    ("ix_notifications_title_created", "notifications", ["title", "created_at"]),
+    ("ix_notification_reads_user_notification", "notification_reads", ["user_id", "notification_id"]),
+    ("ix_daily_progress_user_date", "daily_progress", ["user_id", "date"]),
+    ("ix_study_sessions_user_end", "study_sessions", ["user_id", "end_time"]),
+]
+
+
+def _invalid_indexes() -> set:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or op.get_context().as_sql:
+        return set()
+    rows = bind.execute(sa.text(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid"
+    ))
+    return {name for (name,) in rows}
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        invalid = _invalid_indexes()
+        for name, table, columns in INDEXES:
+            if name in invalid:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
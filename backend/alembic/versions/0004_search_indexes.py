@@ -0,0 +1,62 @@
+"""search indexes and tsvector columns (PostgreSQL only)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 09:30:00.000000
+
+Replaces the after_create hook that app.search used to install these. See
+app/search.py for the queries they serve. Adding the generated columns
+rewrites post and comments; the indexes are built concurrently.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 'simple' does no stemming or stop words, which suits mixed Thai/English posts.
+TS_CONFIG = "simple"
+
+COLUMNS = [
+    f"ALTER TABLE post ADD COLUMN search_vector tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{TS_CONFIG}', coalesce(post_content, ''))) STORED",
+    f"ALTER TABLE comments ADD COLUMN search_vector tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{TS_CONFIG}', coalesce(content, ''))) STORED",
+]
+
+INDEXES = [
+    ("ix_users_username_trgm", "users USING gin (lower(username) gin_trgm_ops)"),
+    ("ix_users_name_trgm", "users USING gin (lower(name) gin_trgm_ops)"),
+    ("ix_users_username_prefix", "users (lower(username) text_pattern_ops)"),
+    ("ix_users_name_prefix", "users (lower(name) text_pattern_ops)"),
+    ("ix_post_search_vector", "post USING gin (search_vector)"),
+    ("ix_comments_search_vector", "comments USING gin (search_vector)"),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for statement in COLUMNS:
+        op.execute(statement)
+    with op.get_context().autocommit_block():
+        for name, target in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        for name, _target in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    op.execute("ALTER TABLE comments DROP COLUMN IF EXISTS search_vector")
+    op.execute("ALTER TABLE post DROP COLUMN IF EXISTS search_vector")
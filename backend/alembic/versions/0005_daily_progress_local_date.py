@@ -0,0 +1,82 @@
+"""daily_progress.local_date with a unique (user_id, local_date)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 10:00:00.000000
+
+The study calendar used to match rows on date(timezone(tz, date)), which no
+index serves, and serialized writers with SELECT ... FOR UPDATE. local_date
+is backfilled from date, rows that the old read-then-insert race duplicated
+are merged into the oldest one, and the unique index is built concurrently
+so the upsert can use ON CONFLICT (user_id, local_date). It supersedes
+ix_daily_progress_user_date.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app import config
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CONSTRAINT = "uq_daily_progress_user_local_date"
+
+DAY_SECONDS = "CASE WHEN d.total_seconds > 0 THEN d.total_seconds ELSE d.total_minutes * 60 END"
+SAME_DAY = "d.user_id = daily_progress.user_id AND d.local_date = daily_progress.local_date"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    postgres = bind.dialect.name == "postgresql"
+
+    op.add_column("daily_progress", sa.Column("local_date", sa.Date(), nullable=True))
+    if postgres:
+        op.execute(sa.text(
+            "UPDATE daily_progress SET local_date = (date AT TIME ZONE :tz)::date"
+        ).bindparams(tz=config.STUDY_TIMEZONE))
+    else:
+        # SQLite rows were written as naive local midnight.
+        op.execute("UPDATE daily_progress SET local_date = date(date)")
+
+    op.execute(
+        "UPDATE daily_progress SET "
+        f"total_seconds = (SELECT sum({DAY_SECONDS}) FROM daily_progress d WHERE {SAME_DAY}), "
+        f"total_minutes = (SELECT sum({DAY_SECONDS}) FROM daily_progress d WHERE {SAME_DAY}) / 60, "
+        f"badge_level = (SELECT max(d.badge_level) FROM daily_progress d WHERE {SAME_DAY}) "
+        "WHERE id IN (SELECT min(id) FROM daily_progress GROUP BY user_id, local_date HAVING count(*) > 1)"
+    )
+    op.execute(
+        "DELETE FROM daily_progress WHERE id NOT IN "
+        "(SELECT min(id) FROM daily_progress GROUP BY user_id, local_date)"
+    )
+    with op.batch_alter_table("daily_progress") as batch:
+        batch.alter_column("local_date", existing_type=sa.Date(), nullable=False)
+
+    with op.get_context().autocommit_block():
+        op.create_index(CONSTRAINT, "daily_progress", ["user_id", "local_date"], unique=True,
+                        postgresql_concurrently=True, if_not_exists=True)
+    if postgres:
+        op.execute(f"ALTER TABLE daily_progress ADD CONSTRAINT {CONSTRAINT} UNIQUE USING INDEX {CONSTRAINT}")
+
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_daily_progress_user_date", table_name="daily_progress",
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index("ix_daily_progress_user_date", "daily_progress", ["user_id", "date"],
+                        postgresql_concurrently=True, if_not_exists=True)
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(f"ALTER TABLE daily_progress DROP CONSTRAINT IF EXISTS {CONSTRAINT}")
+    else:
+        op.drop_index(CONSTRAINT, table_name="daily_progress", if_exists=True)
+    with op.batch_alter_table("daily_progress") as batch:
+        batch.drop_column("local_date")
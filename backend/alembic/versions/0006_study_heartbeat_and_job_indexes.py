@@ -0,0 +1,52 @@
+"""study_sessions.last_heartbeat_at and partial indexes for the scheduled jobs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 11:00:00.000000
+
+The stale-session reaper scans open sessions by last heartbeat and the
+ban-expiry job scans active bans by ban_until (see app/scheduler.py). Both
+indexes are partial, so they only hold the few rows those jobs can touch.
+Every row gets the migration time as its last heartbeat, so sessions open
+during the deploy get a full STUDY_SESSION_TIMEOUT_SECONDS to send one before
+the reaper closes them. Closed sessions never read it.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ("ix_study_sessions_open_heartbeat", "study_sessions", ["last_heartbeat_at"], "end_time IS NULL"),
+    ("ix_users_banned_until", "users", ["ban_until"], "is_banned"),
+]
+
+
+def upgrade() -> None:
+    # Batch mode so SQLite rebuilds the table: it cannot ADD COLUMN with a
+    # non-constant default. CURRENT_TIMESTAMP is now() on Postgres and also exists on SQLite.
+    with op.batch_alter_table("study_sessions") as batch:
+        batch.add_column(sa.Column(
+            "last_heartbeat_at", sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP"),
+        ))
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True,
+                            postgresql_where=sa.text(where), sqlite_where=sa.text(where))
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _columns, _where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    with op.batch_alter_table("study_sessions") as batch:
+        batch.drop_column("last_heartbeat_at")
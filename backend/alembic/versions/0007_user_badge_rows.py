@@ -0,0 +1,45 @@
+"""a user_badges row for every existing user
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 12:00:00.000000
+
+New users get their row when they are created (app.badges). Users from
+before that get it here, counted from notifications, notification_reads and
+the chat unread counters, so the increments never miss a row.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Who sees a notification (app.notifications.audience_filter), for users u
+AUDIENCE = (
+    "(n.title IN ('All', 'all') "
+    "OR (u.is_admin AND (n.target_role = 'admin' OR n.receiver_id = u.uid)) "
+    "OR (NOT u.is_admin AND n.target_role = 'user' AND n.receiver_id = u.uid))"
+)
+
+
+def upgrade() -> None:
+    op.execute(
+        "INSERT INTO user_badges (uid, unread_notifications, unread_messages) "
+        "SELECT u.uid, "
+        f"(SELECT count(*) FROM notifications n WHERE {AUDIENCE} "
+        "AND NOT EXISTS (SELECT 1 FROM notification_reads r WHERE r.notification_id = n.id AND r.user_id = u.uid)), "
+        "(SELECT coalesce(sum(CASE WHEN c.user1_id = u.uid THEN c.user1_unread ELSE c.user2_unread END), 0) "
+        "FROM chats c WHERE c.user1_id = u.uid OR c.user2_id = u.uid) "
+        "FROM users u WHERE NOT EXISTS (SELECT 1 FROM user_badges b WHERE b.uid = u.uid)"
+    )
+
+
+def downgrade() -> None:
+    # Rows are harmless at 0006, where they were built on demand.
+    pass
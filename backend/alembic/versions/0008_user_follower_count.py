@@ -0,0 +1,35 @@
+"""users.follower_count
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 12:10:00.000000
+
+The following feed decides which followed accounts to merge in on read by
+their follower count (app.timeline). Counting follows per request meant a
+GROUP BY over the whole table; the count is now kept on the user row
+(app.counters) and backfilled here.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("follower_count", sa.Integer(), nullable=False, server_default=sa.text("0")))
+    op.execute(
+        "UPDATE users SET follower_count = "
+        "(SELECT count(*) FROM follows WHERE follows.following_id = users.uid)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("follower_count")
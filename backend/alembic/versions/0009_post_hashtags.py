@@ -0,0 +1,61 @@
+"""post_hashtags
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 14:00:00.000000
+
+The tag pages counted and filtered hashtags by downloading every post and
+scanning its text in the browser. Hashtags now get one row per post and tag
+(app.hashtags), filled here from the existing posts.
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# app.hashtags.HASHTAG_RE at the time of this migration
+HASHTAG_RE = re.compile(r"#([A-Za-z0-9_ก-๙]+)")
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    post_hashtags = op.create_table(
+        "post_hashtags",
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("tag", sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(["post_id"], ["post.pid"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("post_id", "tag"),
+    )
+    op.create_index("ix_post_hashtags_tag_post", "post_hashtags", ["tag", "post_id"], unique=False)
+
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            "INSERT INTO post_hashtags (post_id, tag) "
+            "SELECT DISTINCT p.pid, lower(m[1]) "
+            "FROM post p CROSS JOIN LATERAL regexp_matches(p.post_content, '%s', 'g') AS m"
+            % HASHTAG_RE.pattern
+        )
+        return
+
+    batch = []
+    for pid, content in op.get_bind().execute(sa.text("SELECT pid, post_content FROM post")).all():
+        for tag in dict.fromkeys(t.lower() for t in HASHTAG_RE.findall(content or "")):
+            batch.append({"post_id": pid, "tag": tag})
+        if len(batch) >= BATCH_SIZE:
+            op.bulk_insert(post_hashtags, batch)
+            batch = []
+    if batch:
+        op.bulk_insert(post_hashtags, batch)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_post_hashtags_tag_post", table_name="post_hashtags")
+    op.drop_table("post_hashtags")
@@ -0,0 +1,306 @@
+"""
+Maintained unread counters behind GET /me/badges.
+
+- Chat.user1_unread / user2_unread: unread messages per user per chat.
+- UserBadge: one row per user with their unread notification and chat
+  message totals, so a badge poll is a primary-key lookup.
+
+The counters move in the same transaction as the rows they count, from a
+Session `after_flush` hook: a new Notification bumps everyone in its
+audience (one UPDATE, also for broadcasts), a NotificationRead or a deleted
+Notification takes it back, a new ChatMessage bumps the recipient, and
+moving a chat's last_read_at clears that side.
+
+A user's UserBadge row is inserted by the same hook in the transaction that
+creates the user, counted from the source tables (broadcasts sent before
+they joined are unread), so every increment afterwards has a row to land
+on; users created before the table existed got theirs from migration 0007.
+Changes the hook cannot see (ON DELETE CASCADE, bulk deletes, an is_admin
+change moving a user between audiences) can drift the counts;
+
+    python -m app.badges
+
+recomputes the chat counters and every UserBadge row in place.
+"""
+from typing import Optional
+
+from sqlalchemy import and_, case, event, func, inspect, or_, select, true, update
+from sqlalchemy.orm import Session
+
+from . import models, notifications
+
+_badges = models.UserBadge.__table__
+_chats = models.Chat.__table__
+
+READERS_KEY = "badges.readers"
+
+
+def notification_audience(title: str, target_role: str, receiver_id: Optional[int]):
+    """SELECT of the uids a notification is shown to (mirrors notifications.audience_filter)."""
+    User = models.User
+    if title in notifications.BROADCAST_TITLES:
+        return select(User.uid)
+    conditions = []
+    if target_role == "admin":
+        conditions.append(User.is_admin.is_(True))
+    if receiver_id is not None:
+        receiver = User.uid == receiver_id
+        conditions.append(receiver if target_role == "user" else and_(receiver, User.is_admin.is_(True)))
+    if not conditions:
+        return None
+    return select(User.uid).where(or_(*conditions))
+
+
+def _insert(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(models.UserBadge)
+
+
+def badge_rows(*criteria):
+    """
+    SELECT (uid, unread_notifications, unread_messages) counted from the source
+    tables for the users matching `criteria` (mirrors notifications.unread_count).
+    """
+    User, Notification, Read, Chat = models.User, models.Notification, models.NotificationRead, models.Chat
+    audience = or_(
+        Notification.title.in_(notifications.BROADCAST_TITLES),
+        and_(User.is_admin.is_(True), or_(Notification.target_role == "admin", Notification.receiver_id == User.uid)),
+        and_(User.is_admin.is_not(True), Notification.target_role == "user", Notification.receiver_id == User.uid),
+    )
+    unread_notifications = (
+        select(func.count(Notification.id))
+        .where(audience, ~(
+            select(Read.id)
+            .where(Read.notification_id == Notification.id, Read.user_id == User.uid)
+            .correlate(Notification, User)
+            .exists()
+        ))
+        .scalar_subquery()
+    )
+    unread_messages = (
+        select(func.coalesce(func.sum(my_unread_expr(User.uid)), 0))
+        .where(or_(Chat.user1_id == User.uid, Chat.user2_id == User.uid))
+        .scalar_subquery()
+    )
+    # SQLite needs a WHERE to tell INSERT ... SELECT ... ON CONFLICT apart from a join
+    return select(User.uid, unread_notifications, unread_messages).where(true(), *criteria)
+
+
+BADGE_COLUMNS = ["uid", "unread_notifications", "unread_messages"]
+
+
+def _user_added(conn, user: models.User):
+    conn.execute(
+        _insert(conn.dialect.name)
+        .from_select(BADGE_COLUMNS, badge_rows(models.User.uid == user.uid))
+        .on_conflict_do_nothing()
+    )
+
+
+def _floor_zero(expr):
+    return case((expr < 0, 0), else_=expr)
+
+
+def _notification_added(conn, noti: models.Notification):
+    audience = notification_audience(noti.title, noti.target_role, noti.receiver_id)
+    if audience is None:
+        return
+    conn.execute(
+        update(_badges)
+        .where(_badges.c.uid.in_(audience))
+        .values(unread_notifications=_badges.c.unread_notifications + 1)
+    )
+
+
+def _notification_removed(conn, noti: models.Notification, readers):
+    audience = notification_audience(noti.title, noti.target_role, noti.receiver_id)
+    if audience is None:
+        return
+    conn.execute(
+        update(_badges)
+        .where(_badges.c.uid.in_(audience), _badges.c.uid.not_in(readers))
+        .values(unread_notifications=_floor_zero(_badges.c.unread_notifications - 1))
+    )
+
+
+def _notification_read(conn, read: models.NotificationRead):
+    Notification = models.Notification
+    noti = conn.execute(
+        select(Notification.title, Notification.target_role, Notification.receiver_id)
+        .where(Notification.id == read.notification_id)
+    ).first()
+    if noti is None:
+        return
+    audience = notification_audience(*noti)
+    if audience is None:
+        return
+    conn.execute(
+        update(_badges)
+        .where(_badges.c.uid == read.user_id, _badges.c.uid.in_(audience))
+        .values(unread_notifications=_floor_zero(_badges.c.unread_notifications - 1))
+    )
+
+
+def _message_added(conn, message: models.ChatMessage):
+    sender = message.sender_id
+    conn.execute(
+        update(_chats)
+        .where(_chats.c.id == message.chat_id)
+        .values(
+            user1_unread=_chats.c.user1_unread + case((_chats.c.user1_id != sender, 1), else_=0),
+            user2_unread=_chats.c.user2_unread + case((_chats.c.user2_id != sender, 1), else_=0),
+        )
+    )
+    recipient = (
+        select(case((_chats.c.user1_id == sender, _chats.c.user2_id), else_=_chats.c.user1_id))
+        .where(_chats.c.id == message.chat_id)
+        .scalar_subquery()
+    )
+    conn.execute(
+        update(_badges)
+        .where(_badges.c.uid == recipient)
+        .values(unread_messages=_badges.c.unread_messages + 1)
+    )
+
+
+def _chat_read(conn, chat: models.Chat):
+    state = inspect(chat)
+    for side in ("user1", "user2"):
+        if not state.attrs[f"{side}_last_read_at"].history.has_changes():
+            continue
+        unread_column = _chats.c[f"{side}_unread"]
+        unread = select(unread_column).where(_chats.c.id == chat.id).scalar_subquery()
+        conn.execute(
+            update(_badges)
+            .where(_badges.c.uid == getattr(chat, f"{side}_id"))
+            .values(unread_messages=_floor_zero(_badges.c.unread_messages - unread))
+        )
+        conn.execute(update(_chats).where(_chats.c.id == chat.id).values({unread_column: 0}))
+
+
+@event.listens_for(Session, "before_flush")
+def _note_readers(session: Session, flush_context, instances):
+    # Who had read each notification being deleted. By after_flush the flush
+    # has already set those NotificationRead.notification_id values to NULL.
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, models.Notification)]
+    if not deleted:
+        return
+    Read = models.NotificationRead
+    readers = session.info.setdefault(READERS_KEY, {})
+    rows = session.connection().execute(
+        select(Read.notification_id, Read.user_id).where(Read.notification_id.in_(deleted))
+    )
+    for notification_id, uid in rows:
+        readers.setdefault(notification_id, set()).add(uid)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_counters(session: Session, flush_context):
+    readers = session.info.pop(READERS_KEY, {})
+    conn = None
+    for obj in list(session.new) + list(session.deleted) + list(session.dirty):
+        if isinstance(obj, (models.User, models.Notification, models.NotificationRead, models.ChatMessage, models.Chat)):
+            conn = session.connection()
+            break
+    if conn is None:
+        return
+
+    for obj in session.new:
+        if isinstance(obj, models.User):
+            _user_added(conn, obj)
+        elif isinstance(obj, models.Notification):
+            _notification_added(conn, obj)
+        elif isinstance(obj, models.NotificationRead):
+            _notification_read(conn, obj)
+        elif isinstance(obj, models.ChatMessage):
+            _message_added(conn, obj)
+    for obj in session.deleted:
+        if isinstance(obj, models.Notification):
+            _notification_removed(conn, obj, readers.get(obj.id, ()))
+    for obj in session.dirty:
+        if isinstance(obj, models.Chat):
+            _chat_read(conn, obj)
+
+
+def my_unread_expr(uid: int):
+    """This user's side of Chat.userN_unread."""
+    return case((models.Chat.user1_id == uid, models.Chat.user1_unread), else_=models.Chat.user2_unread)
+
+
+def _count_from_source(db: Session, uid: int, is_admin: bool) -> dict:
+    Chat = models.Chat
+    unread_messages = (
+        db.query(func.coalesce(func.sum(my_unread_expr(uid)), 0))
+        .filter(or_(Chat.user1_id == uid, Chat.user2_id == uid))
+        .scalar()
+    )
+    return {
+        "unread_notifications": notifications.unread_count(db, uid, is_admin),
+        "unread_messages": int(unread_messages),
+    }
+
+
+def get_badges(db: Session, uid: int, is_admin: bool) -> dict:
+    """The user's badge counts: one primary-key read."""
+    row = db.get(models.UserBadge, uid)
+    if row is None:
+        # Every user gets a row when created; count without storing one, since
+        # a row written here could miss increments that raced with the count.
+        return _count_from_source(db, uid, is_admin)
+    return {
+        "unread_notifications": row.unread_notifications,
+        "unread_messages": row.unread_messages,
+    }
+
+
+def recount(db: Session) -> int:
+    """Recompute every chat's unread counters and every user's badge row. Returns chats updated."""
+    Chat, Message = models.Chat, models.ChatMessage
+
+    def unread_for(user_column, last_read_column):
+        return (
+            select(func.count(Message.id))
+            .where(
+                Message.chat_id == Chat.id,
+                Message.sender_id != user_column,
+                or_(last_read_column.is_(None), Message.created_at > last_read_column),
+            )
+            .scalar_subquery()
+        )
+
+    result = db.execute(
+        update(Chat)
+        .values(
+            user1_unread=unread_for(Chat.user1_id, Chat.user1_last_read_at),
+            user2_unread=unread_for(Chat.user2_id, Chat.user2_last_read_at),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    stmt = _insert(db.get_bind().dialect.name).from_select(BADGE_COLUMNS, badge_rows())
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.UserBadge.uid],
+        set_={
+            "unread_notifications": stmt.excluded.unread_notifications,
+            "unread_messages": stmt.excluded.unread_messages,
+        },
+    ))
+    return result.rowcount
+
+
+def main():
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        updated = recount(db)
+        db.commit()
+        print(f"Recounted unread messages for {updated} chat(s) and every user's badge counts.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
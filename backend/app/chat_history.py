@@ -0,0 +1,105 @@
+"""
+Keyset pagination for chat message history (GET /chats/{chat_id}/messages).
+
+Pages are ordered by (created_at, id), which is served by ix_msg_chat_created.
+A cursor is an opaque token for one message; the boundary values are read
+from that message's row inside the page query, so timestamps never
+round-trip through the client.
+
+- no cursor      : the newest `limit` messages
+- before=cursor  : older messages (infinite scroll up)
+- after=cursor   : newer messages (gap fill after a reconnect)
+
+Messages in a page are always returned oldest first. X-Next-Cursor is set
+when older messages remain, X-Newer-Cursor when an `after` page was cut short.
+"""
+import base64
+import json
+from typing import List, NamedTuple, Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from . import models
+from .feed import NEXT_CURSOR_HEADER
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+NEWER_CURSOR_HEADER = "X-Newer-Cursor"
+
+
+class HistoryPage(NamedTuple):
+    before_id: Optional[int]
+    after_id: Optional[int]
+    limit: int
+
+
+def encode_cursor(message_id: int) -> str:
+    raw = json.dumps({"mid": message_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        mid = json.loads(base64.urlsafe_b64decode(padded.encode()))["mid"]
+        if not isinstance(mid, int):
+            raise ValueError(mid)
+        return mid
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def get_history_page(
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+) -> HistoryPage:
+    """Dependency: history page parameters."""
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    return HistoryPage(
+        before_id=decode_cursor(before) if before else None,
+        after_id=decode_cursor(after) if after else None,
+        limit=limit,
+    )
+
+
+def _boundary(message_id: int):
+    Message = models.ChatMessage
+    created_at = select(Message.created_at).where(Message.id == message_id).scalar_subquery()
+    return created_at, message_id
+
+
+def load_history(db: Session, chat_id: int, page: HistoryPage, response: Response) -> List[models.ChatMessage]:
+    """
+    Load one page of messages (oldest first) with sender joined and attachments
+    in a single extra IN query, and set the cursor headers.
+    """
+    Message = models.ChatMessage
+    query = (
+        db.query(Message)
+        .options(joinedload(Message.sender), selectinload(Message.attachments))
+        .filter(Message.chat_id == chat_id)
+    )
+
+    if page.after_id is not None:
+        ts, mid = _boundary(page.after_id)
+        query = query.filter(or_(Message.created_at > ts, and_(Message.created_at == ts, Message.id > mid)))
+        rows = query.order_by(Message.created_at.asc(), Message.id.asc()).limit(page.limit + 1).all()
+        if len(rows) > page.limit:
+            rows = rows[:page.limit]
+            response.headers[NEWER_CURSOR_HEADER] = encode_cursor(rows[-1].id)
+        return rows
+
+    if page.before_id is not None:
+        ts, mid = _boundary(page.before_id)
+        query = query.filter(or_(Message.created_at < ts, and_(Message.created_at == ts, Message.id < mid)))
+    rows = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
+    rows.reverse()
+    return rows
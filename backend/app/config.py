@@ -15,10 +15,82 @@ FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
 UPLOAD_ROOT = os.getenv("UPLOAD_ROOT", "uploads")
 
+# Upload size quotas (bytes), enforced while the file is streamed to disk.
+UPLOAD_MAX_IMAGE_BYTES = int(os.getenv("UPLOAD_MAX_IMAGE_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_MAX_VIDEO_BYTES = int(os.getenv("UPLOAD_MAX_VIDEO_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+# Resized image variants (needs Pillow). Feeds link the smallest variant at least
+# MEDIA_PREVIEW_WIDTH px wide.
+MEDIA_VARIANTS_ENABLED = os.getenv("MEDIA_VARIANTS_ENABLED", "1") == "1"
+MEDIA_VARIANT_WIDTHS = os.getenv("MEDIA_VARIANT_WIDTHS", "160,320,640,1280")
+MEDIA_VARIANT_WORKERS = int(os.getenv("MEDIA_VARIANT_WORKERS", "2"))
+MEDIA_PREVIEW_WIDTH = int(os.getenv("MEDIA_PREVIEW_WIDTH", "352"))
+
+# Home timeline (fan-out-on-write) for /posts/following.
+# Authors with more followers than TIMELINE_FANOUT_MAX_FOLLOWERS are merged in on read instead.
+TIMELINE_FANOUT_ENABLED = os.getenv("TIMELINE_FANOUT_ENABLED", "0") == "1"
+TIMELINE_FANOUT_MAX_FOLLOWERS = int(os.getenv("TIMELINE_FANOUT_MAX_FOLLOWERS", "1000"))
+TIMELINE_BACKFILL_POSTS = int(os.getenv("TIMELINE_BACKFILL_POSTS", "50"))
+# Newest comments embedded per post in feed pages; the rest come from GET /posts/{id}/comments.
+FEED_COMMENTS_PER_POST = int(os.getenv("FEED_COMMENTS_PER_POST", "3"))
+
 DATABASE_URL = (
     f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
 
+# Connection pool (per worker process). DB_STATEMENT_TIMEOUT_MS=0 disables the server-side limit.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+# Serve the hot read endpoints (feeds, chat, notifications) from an asyncpg AsyncSession
+# instead of the threadpool + psycopg2 session.
+DB_ASYNC_ENABLED = os.getenv("DB_ASYNC_ENABLED", "0") == "1"
+ASYNC_DATABASE_URL = (
+    f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+
+# Chat WebSocket fan-out. "memory" = single worker; "postgres" = LISTEN/NOTIFY across workers.
+REALTIME_BACKEND = os.getenv("REALTIME_BACKEND", "memory")
+REALTIME_SEND_QUEUE_SIZE = int(os.getenv("REALTIME_SEND_QUEUE_SIZE", "100"))
+# /ws/events resume window (app.events): how long events are kept, and how many a
+# reconnecting client may replay before it is told to reload instead.
+EVENT_RETENTION_HOURS = int(os.getenv("EVENT_RETENTION_HOURS", "72"))
+EVENT_REPLAY_LIMIT = int(os.getenv("EVENT_REPLAY_LIMIT", "500"))
+# Ids are taken at flush but transactions commit in any order, so an event can
+# become visible after one with a higher id. Resume re-reads this many ids below
+# last_event_id; clients drop ids they already have.
+EVENT_RESUME_OVERLAP = int(os.getenv("EVENT_RESUME_OVERLAP", "100"))
+
+# Study totals are bucketed into calendar days in this zone (daily_progress.local_date).
+STUDY_TIMEZONE = os.getenv("STUDY_TIMEZONE", "Asia/Bangkok")
+# An open study session with no heartbeat for this long is closed at its last heartbeat.
+STUDY_SESSION_TIMEOUT_SECONDS = int(os.getenv("STUDY_SESSION_TIMEOUT_SECONDS", "600"))
+
+# Periodic jobs (app.scheduler). Every worker runs the loop; only the one holding
+# the leader lock runs the jobs.
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "15"))
+STUDY_REAPER_INTERVAL_SECONDS = int(os.getenv("STUDY_REAPER_INTERVAL_SECONDS", "60"))
+BAN_EXPIRY_INTERVAL_SECONDS = int(os.getenv("BAN_EXPIRY_INTERVAL_SECONDS", "60"))
+EVENT_PRUNE_INTERVAL_SECONDS = int(os.getenv("EVENT_PRUNE_INTERVAL_SECONDS", "3600"))
+
+# Per-process cache of authenticated principals (app.identity). The TTL bounds how long
+# a ban/delete made through another worker can go unnoticed by this one.
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "30"))
+
+# bcrypt runs in its own process pool (app.passwords). Changing BCRYPT_ROUNDS
+# re-hashes each account on its next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
@@ -26,6 +98,9 @@ GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
 GOOGLE_AUTH_URL = os.getenv("GOOGLE_AUTH_URL", "https://accounts.google.com/o/oauth2/v2/auth")
 GOOGLE_TOKEN_URL = os.getenv("GOOGLE_TOKEN_URL", "https://oauth2.googleapis.com/token")
 GOOGLE_USERINFO_URL = os.getenv("GOOGLE_USERINFO_URL", "https://www.googleapis.com/oauth2/v3/userinfo")
+GOOGLE_DISCOVERY_URL = os.getenv("GOOGLE_DISCOVERY_URL", "https://accounts.google.com/.well-known/openid-configuration")
+GOOGLE_HTTP_TIMEOUT = float(os.getenv("GOOGLE_HTTP_TIMEOUT", "5"))
+GOOGLE_HTTP_RETRIES = int(os.getenv("GOOGLE_HTTP_RETRIES", "2"))
 
 FULL_GOOGLE_AUTH_URL = (
     f"{GOOGLE_AUTH_URL}"
@@ -0,0 +1,137 @@
+"""
+Denormalized counters: like/comment counts on Post, follower counts on User.
+
+The routers bump post.like_count / post.comment_count in the same
+transaction as the Like/Comment change. Follows are written from several
+routers (and cascade with deleted users), so user.follower_count is moved
+by a Session `after_flush` hook for every Follow added or deleted. When
+that takes an author back down to TIMELINE_FANOUT_MAX_FOLLOWERS, the hook
+also backfills their followers' timelines (see app/timeline.py).
+`recompute_post_counters` and `recompute_follower_counts` rebuild them from
+the source tables and can be run on their own:
+
+    python -m app.counters
+"""
+from collections import Counter
+from typing import Iterable, List, Optional
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+
+from . import config, models, timeline
+
+
+def bump_like_count(db: Session, post_id: int, delta: int):
+    """Atomically add `delta` to post.like_count (evaluated in SQL, no read-modify-write)."""
+    db.execute(
+        update(models.Post)
+        .where(models.Post.pid == post_id)
+        .values(like_count=models.Post.like_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bump_comment_count(db: Session, post_id: int, delta: int):
+    """Atomically add `delta` to post.comment_count."""
+    db.execute(
+        update(models.Post)
+        .where(models.Post.pid == post_id)
+        .values(comment_count=models.Post.comment_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_follower_counts(session: Session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, models.Follow):
+            deltas[obj.following_id] += 1
+    for obj in session.deleted:
+        if isinstance(obj, models.Follow):
+            deltas[obj.following_id] -= 1
+    if not any(deltas.values()):
+        return
+    conn = session.connection()
+    # Sorted, so concurrent flushes lock the user rows in the same order
+    for uid, delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        count = conn.execute(
+            update(models.User.__table__)
+            .where(models.User.uid == uid)
+            .values(follower_count=models.User.follower_count + delta)
+            .returning(models.User.follower_count)
+        ).scalar()
+        # Back to fan-out: posts that were only merged in on read must be in the timelines now
+        limit = config.TIMELINE_FANOUT_MAX_FOLLOWERS
+        if count is not None and count <= limit < count - delta and timeline.is_enabled():
+            timeline.backfill_followers(conn, uid)
+
+
+def recompute_post_counters(db: Session, post_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute like_count/comment_count from the source tables in one UPDATE.
+    Limits the update to `post_ids` when given. Returns the number of rows touched.
+    """
+    like_count = (
+        select(func.count())
+        .select_from(models.Like)
+        .where(models.Like.post_id == models.Post.pid)
+        .scalar_subquery()
+    )
+    comment_count = (
+        select(func.count())
+        .select_from(models.Comment)
+        .where(models.Comment.post_id == models.Post.pid)
+        .scalar_subquery()
+    )
+
+    stmt = update(models.Post).values(like_count=like_count, comment_count=comment_count)
+    if post_ids is not None:
+        post_ids = list(post_ids)
+        if not post_ids:
+            return 0
+        stmt = stmt.where(models.Post.pid.in_(post_ids))
+
+    result = db.execute(stmt.execution_options(synchronize_session=False))
+    return result.rowcount
+
+
+def recompute_follower_counts(db: Session) -> int:
+    """Recompute every user's follower_count from the follows table. Returns rows touched."""
+    follower_count = (
+        select(func.count())
+        .select_from(models.Follow)
+        .where(models.Follow.following_id == models.User.uid)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        update(models.User).values(follower_count=follower_count).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def posts_touched_by_user(db: Session, user_id: int) -> List[int]:
+    """Posts whose counters include this user's likes or comments (used before deleting the user)."""
+    liked = select(models.Like.post_id).where(models.Like.user_id == user_id)
+    commented = select(models.Comment.post_id).where(models.Comment.user_id == user_id)
+    rows = db.execute(liked.union(commented)).all()
+    return [r[0] for r in rows]
+
+
+def main():
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        updated = recompute_post_counters(db)
+        users = recompute_follower_counts(db)
+        db.commit()
+        print(f"Recomputed like/comment counters for {updated} post(s) and follower counts for {users} user(s).")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
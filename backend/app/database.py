@@ -1,13 +1,128 @@
+from fastapi import Depends
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
+from starlette.concurrency import run_in_threadpool
 import os
-from .config import DATABASE_URL
+import threading
+import time
+from . import config
+from .config import DATABASE_URL, ASYNC_DATABASE_URL, DB_ASYNC_ENABLED
 
-engine = create_engine(DATABASE_URL)
+
+class PoolStats:
+    """Counters for how long requests wait to get a connection out of the pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    # _do_get is where QueuePool blocks for a free connection (or raises TimeoutError).
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            pool_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record(time.perf_counter() - start)
+        return conn
+
+
+def pool_options() -> dict:
+    return {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+
+
+def statement_timeout_connect_args() -> dict:
+    # Applied per connection, so every statement of every request is bounded.
+    if config.DB_STATEMENT_TIMEOUT_MS <= 0:
+        return {}
+    return {"options": f"-c statement_timeout={config.DB_STATEMENT_TIMEOUT_MS}"}
+
+
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    connect_args=statement_timeout_connect_args(),
+    **pool_options(),
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async engine is only built when enabled, so asyncpg stays optional.
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC_ENABLED:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_connect_args = {}
+    if config.DB_STATEMENT_TIMEOUT_MS > 0:
+        async_connect_args["server_settings"] = {"statement_timeout": str(config.DB_STATEMENT_TIMEOUT_MS)}
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args=async_connect_args,
+        **pool_options(),
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def pool_status() -> dict:
+    """Current pool occupancy plus cumulative wait statistics."""
+    pool = engine.pool
+    status = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "timeout_seconds": config.DB_POOL_TIMEOUT,
+        **pool_stats.snapshot(),
+    }
+    if async_engine is not None:
+        apool = async_engine.sync_engine.pool
+        status["async"] = {
+            "size": apool.size(),
+            "checked_in": apool.checkedin(),
+            "checked_out": apool.checkedout(),
+            "overflow": apool.overflow(),
+        }
+    return status
+
 
 def get_db():
     db = SessionLocal()
@@ -15,3 +130,29 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database access is disabled (set DB_ASYNC_ENABLED=1)")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependency for the hot read endpoints: an AsyncSession when DB_ASYNC_ENABLED,
+# otherwise the regular session (so get_db overrides in tests still apply).
+if DB_ASYNC_ENABLED:
+    get_read_db = get_async_db
+else:
+    def get_read_db(db: Session = Depends(get_db)):
+        return db
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Run `fn(session, *args, **kwargs)` without blocking the event loop.
+    AsyncSession → run_sync on the asyncpg connection; Session → threadpool.
+    """
+    if isinstance(db, Session):
+        return await run_in_threadpool(fn, db, *args, **kwargs)
+    return await db.run_sync(fn, *args, **kwargs)
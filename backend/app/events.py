@@ -0,0 +1,305 @@
+"""
+Per-user event channel behind the /ws/events WebSocket.
+
+Events are produced by Session hooks, so no router has to remember to send
+them:
+
+- "notification"     a Notification was created (likes, comments, follow
+                     requests, reports, admin broadcasts), with the same
+                     fields as the notification lists;
+- "new_message"      a chat message (text, upload or forward) with its
+                     attachments, to both members of the chat;
+- "message_deleted"  a chat message was deleted;
+- "unread"           the user's /me/badges counts changed (live only).
+
+While a transaction runs, `after_flush` notes what changed; `before_commit`
+turns that into `user_events` rows (one per recipient, user_id NULL for a
+broadcast) written in the same transaction; `after_commit` hands them to
+realtime.hub. A rolled-back transaction sends nothing.
+
+Every stored event has an increasing id. A client reconnecting with
+?last_event_id=N gets what it missed, in order, before live events; if that
+is more than EVENT_REPLAY_LIMIT events, or older than the retention window,
+it gets {"type": "resync"} and should reload its lists instead. Ids are taken
+at flush time and transactions commit in any order, so an event can appear
+after the client has seen a higher id: the replay starts EVENT_RESUME_OVERLAP
+ids below N, and clients drop events whose id they already have. "unread" is
+not stored: every connection starts with a fresh snapshot. Broadcast
+notifications move everyone's unread count without a per-user "unread".
+
+Events older than EVENT_RETENTION_HOURS are removed by the "event-prune"
+scheduler job (app.scheduler), or once with
+
+    python -m app.events
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import event, func, inspect, or_
+from sqlalchemy.orm import Session, selectinload
+
+from . import badges, config, identity, models, notifications, oauth2, schemas
+from .realtime import hub
+
+PENDING_KEY = "events.pending"
+PUBLISH_KEY = "events.publish"
+
+# What the legacy /chats/ws/{user_id} socket is sent: which chat changed, not
+# the message itself (the client reloads the chat).
+CHAT_EVENT_TYPES = ("new_message", "message_deleted")
+CHAT_EVENT_FIELDS = ("type", "chat_id")
+
+
+def _pending(session: Session) -> dict:
+    pending = session.info.get(PENDING_KEY)
+    if pending is None:
+        pending = session.info[PENDING_KEY] = {
+            "notifications": set(),
+            "audiences": [],
+            "messages": set(),
+            "deleted": set(),
+            "unread": set(),
+        }
+    return pending
+
+
+@event.listens_for(Session, "after_flush")
+def _note_changes(session: Session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, models.Notification):
+            _pending(session)["notifications"].add(obj.id)
+        elif isinstance(obj, models.NotificationRead):
+            _pending(session)["unread"].add(obj.user_id)
+        elif isinstance(obj, models.ChatMessage):
+            _pending(session)["messages"].add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, models.Notification):
+            _pending(session)["audiences"].append((obj.title, obj.target_role, obj.receiver_id))
+    for obj in session.dirty:
+        if isinstance(obj, models.ChatMessage):
+            if obj.kind == "deleted" and inspect(obj).attrs.kind.history.has_changes():
+                _pending(session)["deleted"].add(obj.id)
+        elif isinstance(obj, models.Chat):
+            state = inspect(obj)
+            for side in ("user1", "user2"):
+                if state.attrs[f"{side}_last_read_at"].history.has_changes():
+                    _pending(session)["unread"].add(getattr(obj, f"{side}_id"))
+
+
+def _audience_uids(session: Session, title: str, target_role: str, receiver_id: Optional[int]) -> List[int]:
+    audience = badges.notification_audience(title, target_role, receiver_id)
+    return session.execute(audience).scalars().all() if audience is not None else []
+
+
+def _notification_events(session: Session, ids, unread: set) -> List[models.UserEvent]:
+    Notification = models.Notification
+    rows = (
+        session.query(Notification, models.User.username, models.User.profile_image)
+        .outerjoin(models.User, models.User.uid == Notification.sender_id)
+        .filter(Notification.id.in_(ids))
+        .order_by(Notification.id)
+        .all()
+    )
+    out = []
+    for noti, username, avatar in rows:
+        payload = {"notification": schemas.NotificationResponse.model_validate(noti).model_copy(update={
+            "is_read": False,
+            "sender_username": username,
+            "sender_avatar": avatar,
+        }).model_dump(mode="json")}
+        if noti.title in notifications.BROADCAST_TITLES:
+            out.append(models.UserEvent(user_id=None, type="notification", payload=payload))
+            continue
+        uids = _audience_uids(session, noti.title, noti.target_role, noti.receiver_id)
+        out += [models.UserEvent(user_id=uid, type="notification", payload=payload) for uid in uids]
+        unread.update(uids)
+    return out
+
+
+def message_payload(message: models.ChatMessage) -> dict:
+    return {
+        "id": message.id,
+        "kind": message.kind,
+        "text": message.text,
+        "created_at": message.created_at.isoformat() if message.created_at else None,
+        "attachments": [
+            {
+                "id": a.id,
+                "kind": a.kind,
+                "url": f"/uploads/{a.path}",
+                "name": a.original_name,
+                "mime_type": a.mime_type,
+            }
+            for a in message.attachments
+        ],
+    }
+
+
+def _message_events(session: Session, ids, deleted: set, unread: set) -> List[models.UserEvent]:
+    Message, Chat = models.ChatMessage, models.Chat
+    rows = (
+        session.query(Message, Chat.user1_id, Chat.user2_id)
+        .join(Chat, Chat.id == Message.chat_id)
+        .options(selectinload(Message.attachments))
+        .filter(Message.id.in_(ids))
+        .order_by(Message.id)
+        .all()
+    )
+    out = []
+    for message, user1_id, user2_id in rows:
+        if message.id in deleted:
+            kind, payload = "message_deleted", {"chat_id": message.chat_id, "message_id": message.id}
+        else:
+            kind, payload = "new_message", {
+                "chat_id": message.chat_id,
+                "from_user_id": message.sender_id,
+                "message": message_payload(message),
+            }
+            unread.add(user2_id if message.sender_id == user1_id else user1_id)
+        out += [models.UserEvent(user_id=uid, type=kind, payload=payload) for uid in (user1_id, user2_id)]
+    return out
+
+
+def unread_message(counts: dict) -> dict:
+    return {"type": "unread", **counts}
+
+
+def event_message(row: models.UserEvent) -> dict:
+    return {"id": row.id, "type": row.type, **row.payload}
+
+
+@event.listens_for(Session, "before_commit")
+def _store_events(session: Session):
+    session.flush()
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+
+    unread = set(pending["unread"])
+    rows = []
+    if pending["notifications"]:
+        rows += _notification_events(session, pending["notifications"], unread)
+    for audience in pending["audiences"]:
+        unread.update(_audience_uids(session, *audience))
+    if pending["messages"] or pending["deleted"]:
+        rows += _message_events(session, pending["messages"] | pending["deleted"], pending["deleted"], unread)
+
+    publish: List[Tuple[Optional[List[int]], dict]] = []
+    if rows:
+        session.add_all(rows)
+        session.flush()
+        publish += [([row.user_id] if row.user_id is not None else None, event_message(row)) for row in rows]
+    if unread:
+        for badge in session.query(models.UserBadge).filter(models.UserBadge.uid.in_(unread)):
+            publish.append(([badge.uid], unread_message({
+                "unread_notifications": badge.unread_notifications,
+                "unread_messages": badge.unread_messages,
+            })))
+    if publish:
+        session.info.setdefault(PUBLISH_KEY, []).extend(publish)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_events(session: Session):
+    publish = session.info.pop(PUBLISH_KEY, None)
+    if publish:
+        hub.publish_threadsafe(publish)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_events(session: Session):
+    session.info.pop(PENDING_KEY, None)
+    session.info.pop(PUBLISH_KEY, None)
+
+
+def authenticate(db: Session, token: str) -> Optional[identity.Principal]:
+    """The principal for an access token passed in the socket URL, or None."""
+    try:
+        token_data = oauth2.verify_access_token(token, ValueError("invalid token"))
+    except ValueError:
+        return None
+    principal = identity.load_principal(db, token_data.id)
+    if principal is None:
+        return None
+    try:
+        identity.ensure_not_banned(principal)
+    except HTTPException:
+        return None
+    return principal
+
+
+def resume(db: Session, principal: identity.Principal, last_event_id: Optional[int]) -> Tuple[List[dict], Set[int]]:
+    """
+    What a new connection is sent before live events: the missed events (or
+    "resync"), an "unread" snapshot and {"type": "ready", "last_event_id"}.
+    The replay includes the EVENT_RESUME_OVERLAP ids below last_event_id.
+    Also returns the replayed ids, so live copies of them are skipped.
+    """
+    UserEvent = models.UserEvent
+    out: List[dict] = []
+    replayed: Set[int] = set()
+
+    if last_event_id is None:
+        ready_id = db.query(func.max(UserEvent.id)).scalar() or 0
+    else:
+        ready_id = last_event_id
+        oldest = db.query(func.min(UserEvent.id)).scalar()
+        # The overlap holds at most EVENT_RESUME_OVERLAP rows, so past this
+        # limit more than EVENT_REPLAY_LIMIT of the rows are new.
+        limit = config.EVENT_REPLAY_LIMIT + config.EVENT_RESUME_OVERLAP
+        rows = (
+            db.query(UserEvent)
+            .filter(
+                UserEvent.id > last_event_id - config.EVENT_RESUME_OVERLAP,
+                or_(UserEvent.user_id == principal.uid, UserEvent.user_id.is_(None)),
+            )
+            .order_by(UserEvent.id)
+            .limit(limit + 1)
+            .all()
+        )
+        missed = sum(1 for row in rows if row.id > last_event_id)
+        if len(rows) > limit or missed > config.EVENT_REPLAY_LIMIT or (oldest is not None and last_event_id < oldest - 1):
+            out.append({"type": "resync"})
+            ready_id = db.query(func.max(UserEvent.id)).scalar() or 0
+        elif rows:
+            out += [event_message(row) for row in rows]
+            replayed = {row.id for row in rows}
+            ready_id = max(ready_id, rows[-1].id)
+
+    out.append(unread_message(badges.get_badges(db, principal.uid, principal.is_admin)))
+    out.append({"type": "ready", "last_event_id": ready_id})
+    db.commit()
+    return out, replayed
+
+
+def prune(db: Session, older_than: timedelta) -> int:
+    """Delete events older than `older_than`. Returns rows deleted."""
+    cutoff = datetime.now(timezone.utc) - older_than
+    return (
+        db.query(models.UserEvent)
+        .filter(models.UserEvent.created_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+
+
+def prune_expired(db: Session) -> int:
+    """Delete events past EVENT_RETENTION_HOURS; commits. Returns rows deleted."""
+    deleted = prune(db, timedelta(hours=config.EVENT_RETENTION_HOURS))
+    db.commit()
+    return deleted
+
+
+def main():
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        deleted = prune_expired(db)
+        print(f"Removed {deleted} event(s) older than {config.EVENT_RETENTION_HOURS}h.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import base64
+import json
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import and_, exists, func, or_
+from sqlalchemy.orm import Query as SAQuery, Session, aliased, joinedload, selectinload
+
+from . import config, imaging, models, schemas
+
+
+# Loader options for the relationships every feed page renders.
+# selectinload keeps it to one extra IN query per relationship for the whole page.
+POST_FEED_OPTIONS = (
+    joinedload(models.Post.user),
+    selectinload(models.Post.images),
+    selectinload(models.Post.tags),
+)
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+# The list endpoints keep returning a plain JSON array; the cursor for the
+# next page travels in this header (absent on the last page).
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class FeedPage(NamedTuple):
+    before_pid: Optional[int]
+    limit: int
+
+
+def encode_cursor(pid: int) -> str:
+    raw = json.dumps({"pid": pid}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        pid = json.loads(base64.urlsafe_b64decode(padded.encode()))["pid"]
+        if not isinstance(pid, int):
+            raise ValueError(pid)
+        return pid
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def get_feed_page(
+    cursor: Optional[str] = None,
+    before_pid: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+) -> FeedPage:
+    """Dependency: keyset page parameters. An opaque `cursor` wins over `before_pid`."""
+    if cursor:
+        before_pid = decode_cursor(cursor)
+    return FeedPage(before_pid=before_pid, limit=limit)
+
+
+def paginate_posts(query: SAQuery, page: FeedPage, response: Response) -> List[models.Post]:
+    """
+    Apply keyset pagination on post.pid (newest first) and set the next-cursor header.
+    One extra row is fetched to tell whether another page exists.
+    """
+    if page.before_pid is not None:
+        query = query.filter(models.Post.pid < page.before_pid)
+
+    posts = query.order_by(models.Post.pid.desc()).limit(page.limit + 1).all()
+    if len(posts) > page.limit:
+        posts = posts[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(posts[-1].pid)
+    return posts
+
+
+def visibility_filter(viewer_uid: int):
+    """
+    Posts the viewer may see, as NOT EXISTS / EXISTS conditions on the post's
+    author: not blocked in either direction, and not a private account the
+    viewer does not follow (the viewer's own posts always pass).
+    """
+    Post, Block, Follow = models.Post, models.Block, models.Follow
+    blocked = exists().where(or_(
+        and_(Block.blocker_id == viewer_uid, Block.blocked_id == Post.user_id),
+        and_(Block.blocker_id == Post.user_id, Block.blocked_id == viewer_uid),
+    ))
+    private_author = exists().where(models.User.uid == Post.user_id, models.User.is_private.is_(True))
+    followed = exists().where(Follow.follower_id == viewer_uid, Follow.following_id == Post.user_id)
+    return and_(~blocked, or_(Post.user_id == viewer_uid, ~private_author, followed))
+
+
+def visible_to(query: SAQuery, viewer_uid: int) -> SAQuery:
+    """Apply visibility_filter inside the page query, so pages come back full."""
+    return query.filter(visibility_filter(viewer_uid))
+
+
+def fetch_liked_post_ids(db: Session, post_ids: List[int], viewer_uid: Optional[int]) -> Set[int]:
+    """Return the subset of post_ids the viewer has liked."""
+    if not post_ids or viewer_uid is None:
+        return set()
+    rows = (
+        db.query(models.Like.post_id)
+        .filter(
+            models.Like.user_id == viewer_uid,
+            models.Like.post_id.in_(post_ids),
+        )
+        .all()
+    )
+    return {r[0] for r in rows}
+
+
+def fetch_comments(
+    db: Session,
+    post_ids: List[int],
+    per_post: Optional[int] = None,
+) -> Dict[int, List[schemas.CommentResponse]]:
+    """
+    Return {post_id: [CommentResponse, ...]}, oldest first, with author and
+    attachments hydrated. With `per_post`, only the newest `per_post` comments
+    of each post (ROW_NUMBER over the post's comments, newest first).
+    One query for comments + authors, one for all their files.
+    """
+    if not post_ids:
+        return {}
+
+    Comment = models.Comment
+    if per_post is not None:
+        ranked = (
+            db.query(
+                Comment,
+                func.row_number().over(
+                    partition_by=Comment.post_id,
+                    order_by=(Comment.created_at.desc(), Comment.cid.desc()),
+                ).label("rank"),
+            )
+            .filter(Comment.post_id.in_(post_ids))
+            .subquery()
+        )
+        Comment = aliased(models.Comment, ranked)
+
+    query = (
+        db.query(Comment, models.User)
+        .outerjoin(models.User, models.User.uid == Comment.user_id)
+        .order_by(Comment.created_at.asc(), Comment.cid.asc())
+    )
+    if per_post is None:
+        query = query.filter(Comment.post_id.in_(post_ids))
+    else:
+        query = query.filter(ranked.c.rank <= per_post)
+    rows = query.all()
+    if not rows:
+        return {}
+
+    comment_ids = [c.cid for c, _ in rows]
+    files_by_comment = defaultdict(list)
+    for f in (
+        db.query(models.CommentFile)
+        .filter(models.CommentFile.comment_id.in_(comment_ids))
+        .order_by(models.CommentFile.id.asc())
+        .all()
+    ):
+        files_by_comment[f.comment_id].append(
+            schemas.CommentFileResponse(id=f.id, path=f.path, file_type=f.file_type)
+        )
+
+    comments_by_post = defaultdict(list)
+    for c, user in rows:
+        comments_by_post[c.post_id].append(
+            schemas.CommentResponse(
+                cid=c.cid,
+                content=c.content,
+                user_id=c.user_id,
+                username=user.username if user else (c.username or "Unknown"),
+                profile_image=user.profile_image if user else None,
+                created_at=c.created_at,
+                files=files_by_comment.get(c.cid, []),
+            )
+        )
+    return comments_by_post
+
+
+def build_post_responses(
+    db: Session,
+    posts: List[models.Post],
+    viewer_uid: Optional[int] = None,
+    all_comments: bool = False,
+) -> List[schemas.PostResponse]:
+    """
+    Build PostResponse objects for a page of posts.
+
+    Like/comment counts come from the denormalized columns on Post; the
+    viewer's likes, the newest FEED_COMMENTS_PER_POST comments of each post
+    (every comment with `all_comments`; with authors and files) and image
+    previews are loaded for the whole page at once, so the number of queries
+    does not grow with the number of posts or comments. The full comment list
+    is GET /posts/{id}/comments. Load `posts` with POST_FEED_OPTIONS to avoid
+    lazy loads of user/images/tags.
+    """
+    post_ids = [p.pid for p in posts]
+
+    liked_ids = fetch_liked_post_ids(db, post_ids, viewer_uid)
+    per_post = None if all_comments else config.FEED_COMMENTS_PER_POST
+    comments_by_post = fetch_comments(db, post_ids, per_post=per_post)
+    previews = imaging.preview_urls(db, [img.path for p in posts for img in p.images])
+
+    response = []
+    for post in posts:
+        author = post.user
+        response.append(
+            schemas.PostResponse(
+                pid=post.pid,
+                post_content=post.post_content,
+                forum_id=post.forum_id,
+                user_id=post.user_id,
+                username=author.username if author else "Unknown",
+                profile_image=author.profile_image if author else None,
+                like_count=post.like_count or 0,
+                comment_count=post.comment_count or 0,
+                liked=post.pid in liked_ids,
+                tags=post.tags,
+                images=[
+                    schemas.PostImageResponse(
+                        id=img.id,
+                        path=img.path,
+                        caption=img.caption,
+                        preview_path=previews.get(img.path),
+                    )
+                    for img in post.images
+                ],
+                comments=comments_by_post.get(post.pid, []),
+                created_at=post.created_at,
+            )
+        )
+    return response
+
+
+def build_post_response(
+    db: Session,
+    post: models.Post,
+    viewer_uid: Optional[int] = None,
+) -> schemas.PostResponse:
+    """Single-post wrapper around build_post_responses, with every comment."""
+    return build_post_responses(db, [post], viewer_uid, all_comments=True)[0]
@@ -0,0 +1,169 @@
+"""
+Google sign-in over a shared, connection-pooled async HTTP client.
+
+The callback exchanges the authorization code at GOOGLE_TOKEN_URL and
+verifies the returned OpenID Connect ID token locally against Google's
+signing keys, so a login costs one round trip to Google instead of two.
+The discovery document (GOOGLE_DISCOVERY_URL) and the JWKS it points at are
+cached for as long as their Cache-Control allows; an ID token signed with an
+unknown key id forces one early refresh, which covers Google's key rotation.
+The userinfo endpoint is only used when the token response has no ID token.
+
+Every call has a GOOGLE_HTTP_TIMEOUT timeout. Connection failures are
+retried by the transport, and GETs are also retried on 5xx and timeouts,
+GOOGLE_HTTP_RETRIES times each. The code exchange itself is never retried
+after it reached Google, because codes are single-use.
+
+The client is opened lazily and closed by the app lifespan.
+"""
+import asyncio
+import logging
+import re
+import time
+from typing import Optional
+
+import httpx
+import jwt
+from fastapi import HTTPException, status
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SECONDS = 3600
+# Minimum age of the cached JWKS before an unknown `kid` may trigger a refetch
+JWKS_MIN_REFRESH_SECONDS = 60
+ID_TOKEN_LEEWAY_SECONDS = 60
+
+_RETRY_STATUSES = {500, 502, 503, 504}
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def _cache_seconds(response: httpx.Response) -> int:
+    match = _MAX_AGE.search(response.headers.get("cache-control", ""))
+    return int(match.group(1)) if match else DEFAULT_CACHE_SECONDS
+
+
+class GoogleOAuthClient:
+    def __init__(self):
+        self._http: Optional[httpx.AsyncClient] = None
+        # url -> (fetched_at, expires_at, json)
+        self._documents = {}
+
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(config.GOOGLE_HTTP_TIMEOUT),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                transport=httpx.AsyncHTTPTransport(retries=config.GOOGLE_HTTP_RETRIES),
+            )
+        return self._http
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def clear_cache(self):
+        self._documents.clear()
+
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self.http().get(url, **kwargs)
+                if response.status_code not in _RETRY_STATUSES or attempt >= config.GOOGLE_HTTP_RETRIES:
+                    return response
+            except httpx.TimeoutException:
+                if attempt >= config.GOOGLE_HTTP_RETRIES:
+                    raise
+            attempt += 1
+            await asyncio.sleep(0.2 * 2 ** (attempt - 1))
+
+    async def _document(self, url: str, force: bool = False) -> dict:
+        now = time.monotonic()
+        cached = self._documents.get(url)
+        if cached is not None and not force and cached[1] > now:
+            return cached[2]
+
+        response = await self._get(url)
+        response.raise_for_status()
+        document = response.json()
+        self._documents[url] = (now, now + _cache_seconds(response), document)
+        return document
+
+    async def discovery(self) -> dict:
+        return await self._document(config.GOOGLE_DISCOVERY_URL)
+
+    async def _signing_key(self, kid: Optional[str]):
+        jwks_uri = (await self.discovery())["jwks_uri"]
+        for attempt in range(2):
+            jwks = await self._document(jwks_uri, force=attempt > 0)
+            for jwk in jwks.get("keys", []):
+                if jwk.get("kid") == kid:
+                    return jwt.PyJWK(jwk).key
+            fetched_at = self._documents[jwks_uri][0]
+            if time.monotonic() - fetched_at < JWKS_MIN_REFRESH_SECONDS:
+                break
+        return None
+
+    async def verify_id_token(self, id_token: str) -> dict:
+        invalid = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Google ID token")
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except jwt.InvalidTokenError:
+            raise invalid
+
+        key = await self._signing_key(header.get("kid"))
+        if key is None:
+            raise invalid
+
+        issuer = (await self.discovery())["issuer"]
+        try:
+            return jwt.decode(
+                id_token,
+                key=key,
+                algorithms=["RS256"],
+                audience=config.GOOGLE_CLIENT_ID,
+                # Google signs with either form of its issuer
+                issuer=[issuer, issuer.removeprefix("https://")],
+                leeway=ID_TOKEN_LEEWAY_SECONDS,
+            )
+        except jwt.InvalidTokenError:
+            raise invalid
+
+    async def exchange_code(self, code: str) -> dict:
+        data = {
+            "code": code,
+            "client_id": config.GOOGLE_CLIENT_ID,
+            "client_secret": config.GOOGLE_CLIENT_SECRET,
+            "redirect_uri": config.GOOGLE_REDIRECT_URI,
+            "grant_type": "authorization_code",
+        }
+        response = await self.http().post(config.GOOGLE_TOKEN_URL, data=data)
+        if response.status_code != 200:
+            raise HTTPException(status_code=400, detail="Failed to retrieve Google token")
+        return response.json()
+
+    async def userinfo(self, access_token: str) -> dict:
+        response = await self._get(
+            config.GOOGLE_USERINFO_URL,
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+        if response.status_code != 200:
+            raise HTTPException(status_code=400, detail="Failed to retrieve Google user info")
+        return response.json()
+
+    async def profile(self, code: str) -> dict:
+        """Exchange an authorization code for the user's claims (sub, email, picture, ...)."""
+        try:
+            tokens = await self.exchange_code(code)
+            if tokens.get("id_token"):
+                return await self.verify_id_token(tokens["id_token"])
+            return await self.userinfo(tokens.get("access_token"))
+        except httpx.HTTPError:
+            logger.warning("Google sign-in request failed", exc_info=True)
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Google sign-in is unavailable, please retry")
+
+
+client = GoogleOAuthClient()
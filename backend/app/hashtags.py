@@ -0,0 +1,117 @@
+"""
+Hashtags (#word) in post text, behind the tag pages:
+
+    GET /posts/hashtags        tags with their post counts, most used first
+    GET /posts/hashtag/{tag}   posts carrying a tag, newest first (keyset pages)
+
+The tag pages used to download /posts/all and count tags in the browser,
+which stopped working once post lists were paged.
+
+A Session `before_flush` hook keeps one post_hashtags row per distinct
+lowercased hashtag of every post added or edited, so neither endpoint reads
+post text. Both only count posts the viewer may see (feed.visibility_filter).
+`reindex` rebuilds the rows from post text:
+
+    python -m app.hashtags
+"""
+import re
+from typing import List, NamedTuple, Optional
+
+from fastapi import Query, Response
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Query as SAQuery, Session
+
+from . import feed, models, schemas, search
+
+# Same characters the frontend highlights as a tag (Latin letters, digits, _ and Thai)
+HASHTAG_RE = re.compile(r"#([A-Za-z0-9_ก-๙]+)")
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class HashtagPage(NamedTuple):
+    q: Optional[str]
+    offset: int
+    limit: int
+
+
+def extract(text: Optional[str]) -> List[str]:
+    """Distinct lowercased hashtags of `text`, in order of first appearance."""
+    return list(dict.fromkeys(tag.lower() for tag in HASHTAG_RE.findall(text or "")))
+
+
+@event.listens_for(Session, "before_flush")
+def _index_hashtags(session: Session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, models.Post):
+            continue
+        state = inspect(obj)
+        if state.pending or state.attrs.post_content.history.has_changes():
+            obj.hashtags = [models.PostHashtag(tag=tag) for tag in extract(obj.post_content)]
+
+
+def get_hashtag_page(
+    q: Optional[str] = Query(None, max_length=search.MAX_QUERY_LENGTH),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+) -> HashtagPage:
+    """Dependency: an optional tag filter (substring, leading # ignored) and the page."""
+    q = (q or "").strip().lstrip("#").lower() or None
+    return HashtagPage(q=q, offset=search.decode_cursor(cursor) if cursor else 0, limit=limit)
+
+
+def tag_counts(db: Session, page: HashtagPage, viewer_uid: int, response: Response) -> List[schemas.HashtagCount]:
+    """Tags with the number of visible posts carrying them, most used first."""
+    PostHashtag = models.PostHashtag
+    count = func.count(PostHashtag.post_id)
+    query = (
+        db.query(PostHashtag.tag, count)
+        .join(models.Post, models.Post.pid == PostHashtag.post_id)
+        .filter(feed.visibility_filter(viewer_uid))
+    )
+    if page.q:
+        query = query.filter(PostHashtag.tag.contains(page.q, autoescape=True))
+    query = query.group_by(PostHashtag.tag).order_by(count.desc(), PostHashtag.tag)
+
+    rows = query.offset(page.offset).limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        if page.offset + page.limit <= search.MAX_OFFSET:
+            response.headers[feed.NEXT_CURSOR_HEADER] = search.encode_cursor(page.offset + page.limit)
+    return [schemas.HashtagCount(name=tag, count=n) for tag, n in rows]
+
+
+def tagged_posts(query: SAQuery, tag: str) -> SAQuery:
+    """Restrict a post query to posts carrying `tag` (with or without the #, any case)."""
+    tagged = select(models.PostHashtag.post_id).where(models.PostHashtag.tag == tag.lstrip("#").lower())
+    return query.filter(models.Post.pid.in_(tagged))
+
+
+def reindex(db: Session) -> int:
+    """Rebuild post_hashtags from post text. Returns the number of rows written."""
+    db.query(models.PostHashtag).delete(synchronize_session=False)
+    rows = [
+        {"post_id": pid, "tag": tag}
+        for pid, content in db.query(models.Post.pid, models.Post.post_content).yield_per(1000)
+        for tag in extract(content)
+    ]
+    if rows:
+        db.execute(models.PostHashtag.__table__.insert(), rows)
+    return len(rows)
+
+
+def main():
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        written = reindex(db)
+        db.commit()
+        print(f"Indexed {written} post hashtag(s).")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
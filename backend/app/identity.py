@@ -0,0 +1,136 @@
+"""
+Cached principals for authenticated requests.
+
+`oauth2.get_current_principal` resolves a bearer token to a `Principal`
+(uid, username, is_admin, is_banned, ban_until) without loading the ORM User.
+Principals are kept in a bounded LRU cache with a TTL, per worker process.
+The admin/users routers call `invalidate(uid)` after ban, unban, delete
+and profile updates; other workers pick the change up within
+IDENTITY_CACHE_TTL seconds.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from . import config, models
+
+
+class Principal(NamedTuple):
+    uid: int
+    username: str
+    is_admin: bool
+    is_banned: bool
+    ban_until: Optional[datetime]
+
+
+class PrincipalCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, uid: int) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry is None:
+                return None
+            expires, principal = entry
+            if expires < time.monotonic():
+                del self._entries[uid]
+                return None
+            self._entries.move_to_end(uid)
+            return principal
+
+    def put(self, principal: Principal):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[principal.uid] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(principal.uid)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, uid: int):
+        with self._lock:
+            self._entries.pop(uid, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+cache = PrincipalCache(config.IDENTITY_CACHE_SIZE, config.IDENTITY_CACHE_TTL)
+
+
+def invalidate(uid: int):
+    cache.invalidate(uid)
+
+
+def load_principal(db: Session, uid: int) -> Optional[Principal]:
+    principal = cache.get(uid)
+    if principal is not None:
+        return principal
+
+    row = (
+        db.query(
+            models.User.uid,
+            models.User.username,
+            models.User.is_admin,
+            models.User.is_banned,
+            models.User.ban_until,
+        )
+        .filter(models.User.uid == uid)
+        .first()
+    )
+    if row is None:
+        return None
+    principal = Principal(
+        uid=row.uid,
+        username=row.username,
+        is_admin=bool(row.is_admin),
+        is_banned=bool(row.is_banned),
+        ban_until=row.ban_until,
+    )
+    cache.put(principal)
+    return principal
+
+
+def ensure_not_banned(user):
+    """
+    Raise 403 while a ban is active. Works for a Principal or a User row.
+    ban_until decides; the ban-expiry job (app.scheduler) only clears the flag
+    of bans that have run out.
+    """
+    if user.is_banned and user.ban_until:
+        now = datetime.now()
+        if user.ban_until > now:
+            ban_until_str = user.ban_until.strftime("%Y-%m-%d %H:%M:%S")
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"{user.username} is banned until {ban_until_str}"
+            )
+
+
+def expire_bans(db: Session) -> int:
+    """Lift every ban whose ban_until has passed; commits. Returns how many were lifted."""
+    # ban_until is naive local time, as written by the admin ban route.
+    lifted = db.execute(
+        update(models.User)
+        .where(models.User.is_banned.is_(True), models.User.ban_until <= datetime.now())
+        .values(is_banned=False, ban_until=None)
+        .returning(models.User.uid)
+    ).scalars().all()
+    db.commit()
+    for uid in lifted:
+        invalidate(uid)
+    return len(lifted)
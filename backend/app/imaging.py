@@ -0,0 +1,235 @@
+"""
+Image derivatives (thumbnails and responsive widths) for the media store.
+
+When a transaction that stored new image blobs commits, each blob is handed
+to a process pool that writes a resized copy for every MEDIA_VARIANT_WIDTHS
+entry narrower than the original, as WebP plus the original format, under
+UPLOAD_ROOT/variants/. The results are recorded as MediaVariant rows keyed
+by blob, so every PostImage / ChatAttachment / avatar pointing at that blob
+shares them. The upload request never waits for any of this.
+
+Pillow is optional: without it (or with MEDIA_VARIANTS_ENABLED=0) nothing is
+generated and responses keep linking the originals.
+
+Variants for images uploaded before this existed can be generated with:
+
+    python -m app.imaging
+"""
+import logging
+import os
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import config, media, models
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - depends on the environment
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = "variants"
+
+# Pillow format -> (extension, save options). Anything else is only converted to WebP.
+_KEEP_FORMATS = {
+    "JPEG": ("jpg", {"quality": 82, "optimize": True, "progressive": True}),
+    "PNG": ("png", {"optimize": True}),
+    "WEBP": ("webp", {"quality": 80}),
+}
+_WEBP = ("webp", {"quality": 80, "method": 4})
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def is_enabled() -> bool:
+    return Image is not None and config.MEDIA_VARIANTS_ENABLED
+
+
+def variant_path(sha256: str, width: int, ext: str) -> str:
+    return f"{VARIANT_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}_w{width}.{ext}"
+
+
+def render_variants(source: str, sha256: str, widths: List[int], upload_root: str) -> List[dict]:
+    """
+    Write the variants of one image and describe them. Runs in a worker process,
+    so it only touches the filesystem.
+    """
+    results = []
+    with Image.open(source) as original:
+        source_format = (original.format or "").upper()
+        image = ImageOps.exif_transpose(original)
+        formats = [_WEBP]
+        if source_format in _KEEP_FORMATS and source_format != "WEBP":
+            formats.append(_KEEP_FORMATS[source_format])
+
+        for width in sorted(set(widths)):
+            if width >= image.width:
+                continue
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+
+            for ext, options in formats:
+                frame = resized
+                if ext == "jpg" and frame.mode not in ("RGB", "L"):
+                    frame = frame.convert("RGB")
+                path = variant_path(sha256, width, ext)
+                dest = os.path.join(upload_root, *path.split("/"))
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), suffix=".part")
+                try:
+                    with os.fdopen(fd, "wb") as out:
+                        frame.save(out, format="JPEG" if ext == "jpg" else ext.upper(), **options)
+                    os.replace(tmp, dest)
+                except BaseException:
+                    os.unlink(tmp)
+                    raise
+                results.append({
+                    "width": width,
+                    "height": height,
+                    "format": ext,
+                    "path": path,
+                    "size": os.path.getsize(dest),
+                })
+    return results
+
+
+def record_variants(db: Session, sha256: str, variants: List[dict]):
+    db.query(models.MediaVariant).filter(models.MediaVariant.blob_sha256 == sha256).delete(
+        synchronize_session=False
+    )
+    db.add_all([models.MediaVariant(blob_sha256=sha256, **v) for v in variants])
+
+
+def _widths() -> List[int]:
+    return [int(w) for w in config.MEDIA_VARIANT_WIDTHS.split(",") if w.strip()]
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=config.MEDIA_VARIANT_WORKERS)
+    return _executor
+
+
+def _on_rendered(sha256: str, future):
+    try:
+        variants = future.result()
+    except Exception:
+        logger.warning("Could not generate variants for blob %s", sha256, exc_info=True)
+        return
+
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        record_variants(db, sha256, variants)
+        db.commit()
+    except Exception:
+        logger.exception("Could not record variants for blob %s", sha256)
+        db.rollback()
+    finally:
+        db.close()
+
+
+def schedule(blobs: Iterable[tuple]):
+    """Queue (sha256, path) image blobs for variant generation. Returns immediately."""
+    if not is_enabled():
+        return
+    executor = _get_executor()
+    for sha256, path in blobs:
+        source = os.path.join(config.UPLOAD_ROOT, *path.split("/"))
+        future = executor.submit(render_variants, source, sha256, _widths(), config.UPLOAD_ROOT)
+        future.add_done_callback(lambda f, sha256=sha256: _on_rendered(sha256, f))
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_committed_images(session: Session):
+    pending = session.info.pop(media.NEW_IMAGES_KEY, None)
+    if pending:
+        schedule(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_images(session: Session):
+    session.info.pop(media.NEW_IMAGES_KEY, None)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def preview_urls(db: Session, references: Iterable[Optional[str]], min_width: Optional[int] = None) -> Dict[str, str]:
+    """
+    Map media references (as stored on PostImage.path, ChatAttachment.path, ...)
+    to the URL of their smallest variant at least `min_width` wide, WebP first.
+    References without a suitable variant are left out: the original is already small enough
+    (or has no variants yet). One query for the whole batch.
+    """
+    min_width = min_width or config.MEDIA_PREVIEW_WIDTH
+    by_path = defaultdict(list)
+    for ref in references:
+        path = media.relative_path(ref)
+        if path and path.startswith(media.BLOB_DIR + "/"):
+            by_path[path].append(ref)
+    if not by_path:
+        return {}
+
+    rows = (
+        db.query(models.MediaBlob.path, models.MediaVariant)
+        .join(models.MediaVariant, models.MediaVariant.blob_sha256 == models.MediaBlob.sha256)
+        .filter(models.MediaBlob.path.in_(list(by_path)), models.MediaVariant.width >= min_width)
+        .all()
+    )
+    best = {}
+    for path, variant in rows:
+        rank = (variant.width, variant.format != "webp")
+        if path not in best or rank < best[path][0]:
+            best[path] = (rank, variant.path)
+
+    return {
+        ref: media.url_for(variant)
+        for path, (_, variant) in best.items()
+        for ref in by_path[path]
+    }
+
+
+def main():
+    from .database import SessionLocal
+
+    if Image is None:
+        print("Pillow is not installed; nothing to do.")
+        return
+
+    db = SessionLocal()
+    try:
+        missing = (
+            db.query(models.MediaBlob.sha256, models.MediaBlob.path)
+            .filter(models.MediaBlob.content_type.like("image/%"))
+            .filter(~models.MediaBlob.variants.any())
+            .all()
+        )
+        for sha256, path in missing:
+            source = os.path.join(config.UPLOAD_ROOT, *path.split("/"))
+            try:
+                variants = render_variants(source, sha256, _widths(), config.UPLOAD_ROOT)
+            except Exception as e:
+                print(f"Skipping {path}: {e}")
+                continue
+            record_variants(db, sha256, variants)
+            db.commit()
+        print(f"Generated variants for {len(missing)} image(s).")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
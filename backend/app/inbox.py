@@ -0,0 +1,156 @@
+"""
+Chat inbox (GET /chats).
+
+Chat rooms are created when a follow becomes mutual (`open_chat_if_mutual`,
+called from the follow endpoints), not while listing. The inbox itself is a
+single query: a ROW_NUMBER() window picks each room's latest message,
+correlated subqueries add the first attachment (for the preview), and the
+unread count is the room's maintained counter (see app.badges).
+
+Rooms for mutuals that existed before this can be created with:
+
+    python -m app.inbox
+"""
+from typing import List, Optional
+
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from . import badges, models
+
+
+def open_chat_if_mutual(db: Session, follower_id: int, following_id: int) -> Optional[models.Chat]:
+    """
+    Call after adding follower -> following. If the follow back already exists,
+    make sure the pair has a chat room (flushed, committed by the caller).
+    """
+    follows_back = (
+        db.query(models.Follow.follower_id)
+        .filter_by(follower_id=following_id, following_id=follower_id)
+        .first()
+    )
+    if follows_back is None:
+        return None
+
+    u1, u2 = sorted((follower_id, following_id))
+    chat = db.query(models.Chat).filter_by(user1_id=u1, user2_id=u2).first()
+    if chat is None:
+        chat = models.Chat(user1_id=u1, user2_id=u2)
+        db.add(chat)
+        db.flush()
+    return chat
+
+
+def message_preview(text: Optional[str], attachment_kind: Optional[str], attachment_name: Optional[str]) -> str:
+    if attachment_kind == "image":
+        return "[image]"
+    if attachment_kind == "video":
+        return "[video]"
+    if attachment_kind:
+        return attachment_name or "[file]"
+    return text or ""
+
+
+def inbox_query(me_id: int):
+    Chat, Message, Attachment = models.Chat, models.ChatMessage, models.ChatAttachment
+    friend = aliased(models.User)
+    follows_out = aliased(models.Follow)
+    follows_in = aliased(models.Follow)
+
+    is_user1 = Chat.user1_id == me_id
+    other_id = case((is_user1, Chat.user2_id), else_=Chat.user1_id)
+    in_my_chats = or_(Chat.user1_id == me_id, Chat.user2_id == me_id)
+
+    ranked = (
+        select(
+            Message.id,
+            Message.chat_id,
+            Message.text,
+            Message.created_at,
+            func.row_number().over(
+                partition_by=Message.chat_id,
+                order_by=(Message.created_at.desc(), Message.id.desc()),
+            ).label("rn"),
+        )
+        .where(Message.chat_id.in_(select(Chat.id).where(in_my_chats)))
+        .subquery("ranked")
+    )
+
+    def first_attachment(column):
+        return (
+            select(column)
+            .where(Attachment.message_id == ranked.c.id)
+            .order_by(Attachment.id.asc())
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    return (
+        select(
+            Chat.id,
+            friend.name,
+            friend.username,
+            friend.profile_image,
+            ranked.c.text,
+            ranked.c.created_at,
+            first_attachment(Attachment.kind).label("attachment_kind"),
+            first_attachment(Attachment.original_name).label("attachment_name"),
+            badges.my_unread_expr(me_id).label("unread"),
+        )
+        .join(friend, friend.uid == other_id)
+        # Only rooms whose two users still follow each other both ways
+        .join(follows_out, and_(follows_out.follower_id == me_id, follows_out.following_id == other_id))
+        .join(follows_in, and_(follows_in.follower_id == other_id, follows_in.following_id == me_id))
+        .outerjoin(ranked, and_(ranked.c.chat_id == Chat.id, ranked.c.rn == 1))
+        .where(in_my_chats)
+        .order_by(ranked.c.created_at.desc().nulls_last(), Chat.id.desc())
+    )
+
+
+def build_inbox(db: Session, me_id: int) -> List[dict]:
+    return [
+        {
+            "id": row.id,
+            "name": row.name or row.username,
+            "username": row.username,
+            "avatar": row.profile_image or "/images/default.jpg",
+            "lastMessage": message_preview(row.text, row.attachment_kind, row.attachment_name),
+            "last_ts": row.created_at.isoformat() if row.created_at else None,
+            "unread": row.unread,
+        }
+        for row in db.execute(inbox_query(me_id))
+    ]
+
+
+def create_missing_chats(db: Session) -> int:
+    """Create a room for every mutual follow pair that has none. Returns how many were created."""
+    f1, f2 = aliased(models.Follow), aliased(models.Follow)
+    pairs = (
+        db.query(f1.follower_id, f1.following_id)
+        .join(f2, and_(f2.follower_id == f1.following_id, f2.following_id == f1.follower_id))
+        .filter(f1.follower_id < f1.following_id)
+        .outerjoin(
+            models.Chat,
+            and_(models.Chat.user1_id == f1.follower_id, models.Chat.user2_id == f1.following_id),
+        )
+        .filter(models.Chat.id.is_(None))
+        .all()
+    )
+    db.add_all([models.Chat(user1_id=u1, user2_id=u2) for u1, u2 in pairs])
+    return len(pairs)
+
+
+def main():
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        created = create_missing_chats(db)
+        db.commit()
+        print(f"Created {created} chat room(s) for mutual follows.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Index usage report from pg_stat_user_indexes (PostgreSQL only):
+
+    python -m app.index_usage            # every index, least scanned first
+    python -m app.index_usage --unused   # only never-scanned indexes that could be dropped
+
+Scan counts accumulate from the last statistics reset (shown in the header),
+per server: run it against the primary and each replica that takes reads.
+Primary-key and unique indexes back constraints, so they are never listed as
+unused.
+"""
+import argparse
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import text
+
+USAGE_QUERY = text("""
+    SELECT s.relname AS table_name,
+           s.indexrelname AS index_name,
+           s.idx_scan AS scans,
+           s.idx_tup_read AS tuples_read,
+           pg_relation_size(s.indexrelid) AS size_bytes,
+           pg_size_pretty(pg_relation_size(s.indexrelid)) AS size,
+           i.indisunique AS is_unique,
+           i.indisprimary AS is_primary,
+           i.indisvalid AS is_valid
+    FROM pg_stat_user_indexes s
+    JOIN pg_index i ON i.indexrelid = s.indexrelid
+    ORDER BY s.idx_scan ASC, pg_relation_size(s.indexrelid) DESC, s.indexrelname
+""")
+
+STATS_RESET_QUERY = text("SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()")
+
+
+class IndexUsage(NamedTuple):
+    table_name: str
+    index_name: str
+    scans: int
+    tuples_read: int
+    size_bytes: int
+    size: str
+    is_unique: bool
+    is_primary: bool
+    is_valid: bool
+
+    @property
+    def unused(self) -> bool:
+        return self.scans == 0 and not (self.is_unique or self.is_primary)
+
+
+def index_usage(conn) -> List[IndexUsage]:
+    return [IndexUsage(**row._mapping) for row in conn.execute(USAGE_QUERY)]
+
+
+def format_report(rows: List[IndexUsage], stats_reset=None) -> str:
+    since = f"since {stats_reset:%Y-%m-%d %H:%M}" if stats_reset else "since the statistics were last reset"
+    lines = [f"Index scans {since}", ""]
+    if not rows:
+        lines.append("(no indexes)")
+        return "\n".join(lines)
+
+    header = ("table", "index", "scans", "tuples read", "size", "note")
+    table = [header]
+    for r in rows:
+        notes = []
+        if r.is_primary:
+            notes.append("primary key")
+        elif r.is_unique:
+            notes.append("unique")
+        if not r.is_valid:
+            notes.append("INVALID")
+        if r.unused:
+            notes.append("unused")
+        table.append((r.table_name, r.index_name, str(r.scans), str(r.tuples_read), r.size, ", ".join(notes)))
+
+    widths = [max(len(row[i]) for row in table) for i in range(len(header))]
+    for row in table:
+        lines.append("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+    unused = [r for r in rows if r.unused]
+    if unused:
+        total = sum(r.size_bytes for r in unused)
+        lines += ["", f"{len(unused)} unused index(es), {total // 1024} kB in total."]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    from .database import engine
+
+    parser = argparse.ArgumentParser(prog="python -m app.index_usage", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--unused", action="store_true", help="only list never-scanned, non-unique indexes")
+    args = parser.parse_args(argv)
+
+    if engine.dialect.name != "postgresql":
+        print("Index statistics are PostgreSQL-only; nothing to report.")
+        return
+    with engine.connect() as conn:
+        rows = index_usage(conn)
+        stats_reset = conn.execute(STATS_RESET_QUERY).scalar()
+    if args.unused:
+        rows = [r for r in rows if r.unused]
+    print(format_report(rows, stats_reset))
+
+
+if __name__ == "__main__":
+    main()
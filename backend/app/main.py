@@ -1,21 +1,20 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-from . import models, database, config
+from . import models, database, config, feed, realtime, chat_history, imaging, passwords, google_oauth, static_media, scheduler
 from .database import engine
 from .routers import (
     users, auth, study_calendar, posts, chat, admin,
-    notification, follow, news, news_upload, block, help, user_public
+    notification, follow, news, news_upload, block, help, user_public,
+    internal, search, badges, events
 )
 import os
 
 # Allow tests to skip DB init by setting SKIP_DB_INIT=1 in the environment.
+# The schema itself comes from `alembic upgrade head` (backend/alembic/versions).
 SKIP_DB_INIT = os.getenv("SKIP_DB_INIT", "") == "1"
-if not SKIP_DB_INIT:
-    models.Base.metadata.create_all(bind=engine)
 
 @asynccontextmanager
 async def lifespan(app):
@@ -35,7 +34,19 @@ async def lifespan(app):
                 print("ℹ Forum table already has data.")
         finally:
             db.close()
-    yield
+    await realtime.hub.start()
+    jobs = scheduler.create_scheduler() if config.SCHEDULER_ENABLED else None
+    if jobs:
+        await jobs.start()
+    try:
+        yield
+    finally:
+        if jobs:
+            await jobs.stop()
+        await realtime.hub.stop()
+        imaging.shutdown()
+        passwords.shutdown()
+        await google_oauth.client.aclose()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -50,13 +61,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[feed.NEXT_CURSOR_HEADER, chat_history.NEWER_CURSOR_HEADER],
 )
 
 # Uploads
 os.makedirs("uploads/post", exist_ok=True)
 os.makedirs("uploads/comments", exist_ok=True)
 os.makedirs("uploads/user", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", static_media.MediaFiles(directory="uploads"), name="uploads")
 
 # DB connection check
 if not SKIP_DB_INIT:
@@ -81,6 +93,10 @@ app.include_router(news.router)
 app.include_router(news_upload.router)
 app.include_router(block.router)
 app.include_router(help.router)
+app.include_router(internal.router)
+app.include_router(search.router)
+app.include_router(badges.router)
+app.include_router(events.router)
 
 @app.get("/")
 def root():
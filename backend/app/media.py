@@ -0,0 +1,286 @@
+"""
+Content-addressed media store.
+
+Uploaded files are stored once, keyed by the SHA-256 of their content, under
+UPLOAD_ROOT/blobs/<aa>/<bb>/<sha256><ext>, with a MediaBlob row holding a
+reference count. PostImage, CommentFile, ChatAttachment, News.image_url,
+HelpReport.file_path and User.profile_image store the blob's path in the
+format each column already used ("/uploads/blobs/..." or "blobs/...").
+Uploading the same bytes again, or forwarding a chat attachment, only adds
+a reference.
+
+Counts go up when a row starts pointing at a blob and down on the delete /
+replace paths. `collect_garbage` recounts from the reference columns before
+deleting anything, so a missed decrement only delays cleanup:
+
+    python -m app.media gc        # delete unreferenced blobs
+    python -m app.media import    # move pre-existing uploads into the store
+"""
+import os
+import re
+import sys
+import time
+import uuid
+from collections import Counter
+from typing import Iterable, Optional
+
+from fastapi import UploadFile
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from . import config, models, uploads
+
+BLOB_DIR = "blobs"
+# Public URL prefix of UPLOAD_ROOT (the /uploads StaticFiles mount in main.py)
+MEDIA_URL_PREFIX = "/uploads/"
+
+# Unreferenced blobs (and orphan files) younger than this are left alone, so
+# an upload whose transaction has not committed yet is never collected.
+GC_GRACE_SECONDS = 3600
+
+_SAFE_EXT = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+# session.info key: image blobs stored in the current transaction, picked up
+# by app.imaging once it commits.
+NEW_IMAGES_KEY = "media_new_images"
+
+
+def _reference_columns():
+    """(column, stored with the /uploads/ prefix?) for every column that points at media."""
+    return [
+        (models.PostImage.path, True),
+        (models.CommentFile.path, True),
+        (models.News.image_url, True),
+        (models.User.profile_image, True),
+        (models.ChatAttachment.path, False),
+        (models.HelpReport.file_path, False),
+    ]
+
+
+def blob_path(sha256: str, ext: str) -> str:
+    """Path of a blob relative to UPLOAD_ROOT."""
+    return f"{BLOB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+
+def url_for(path: str) -> str:
+    return MEDIA_URL_PREFIX + path
+
+
+def relative_path(reference: Optional[str]) -> Optional[str]:
+    """Normalize a stored reference ("/uploads/blobs/..", "blobs/..") to a path under UPLOAD_ROOT."""
+    if not reference:
+        return None
+    ref = reference.lstrip("/")
+    prefix = MEDIA_URL_PREFIX.strip("/") + "/"
+    if ref.startswith(prefix):
+        ref = ref[len(prefix):]
+    return ref
+
+
+def _disk_path(path: str) -> str:
+    return os.path.join(config.UPLOAD_ROOT, *path.split("/"))
+
+
+def _extension(filename: Optional[str]) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if _SAFE_EXT.match(ext) else ""
+
+
+def _insert_or_add_ref(db: Session, sha256: str, path: str, size: int, content_type: Optional[str]) -> str:
+    """Insert the blob row or take a reference to the existing one. Returns the blob's stored path."""
+    values = dict(sha256=sha256, path=path, size=size, content_type=content_type, ref_count=1)
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(models.MediaBlob).values(**values).on_conflict_do_update(
+        index_elements=[models.MediaBlob.sha256],
+        set_={"ref_count": models.MediaBlob.ref_count + 1},
+    ).returning(models.MediaBlob.path)
+    return db.execute(stmt).scalar_one()
+
+
+def store_upload(db: Session, upload: UploadFile, max_bytes: Optional[int] = None) -> uploads.StoredUpload:
+    """
+    Stream an upload into the store and take one reference to it.
+    Returns the StoredUpload with `path` set to the blob path (relative to UPLOAD_ROOT).
+    """
+    staging = _disk_path(f"{BLOB_DIR}/.staging/{uuid.uuid4().hex}")
+    stored = uploads.save_upload(upload, staging, max_bytes=max_bytes)
+
+    ext = _extension(stored.original_name)
+    existing = db.get(models.MediaBlob, stored.sha256)
+    path = existing.path if existing is not None else blob_path(stored.sha256, ext)
+    dest = _disk_path(path)
+
+    moved = not os.path.exists(dest)
+    if moved:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(staging, dest)
+    else:
+        os.unlink(staging)
+        # Refresh mtime so a concurrent gc run does not treat it as stale.
+        os.utime(dest)
+
+    stored_path = _insert_or_add_ref(db, stored.sha256, path, stored.size, stored.content_type)
+    if stored_path != path:
+        # A concurrent first upload of the same bytes under another extension
+        # created the row first: use its file and drop ours.
+        if moved:
+            try:
+                os.unlink(dest)
+            except FileNotFoundError:
+                pass
+        return stored._replace(path=stored_path)
+
+    if existing is None and stored.kind == "image":
+        db.info.setdefault(NEW_IMAGES_KEY, set()).add((stored.sha256, path))
+    return stored._replace(path=path)
+
+
+def _change_refs(db: Session, references: Iterable[Optional[str]], delta: int):
+    counts = Counter(p for p in map(relative_path, references) if p and p.startswith(BLOB_DIR + "/"))
+    for path, n in counts.items():
+        db.execute(
+            update(models.MediaBlob)
+            .where(models.MediaBlob.path == path)
+            .values(ref_count=models.MediaBlob.ref_count + delta * n)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def add_refs(db: Session, references: Iterable[Optional[str]]):
+    """A new row now points at these blobs (e.g. a forwarded chat attachment)."""
+    _change_refs(db, references, 1)
+
+
+def release(db: Session, references: Iterable[Optional[str]]):
+    """Rows pointing at these blobs are going away. Non-blob (legacy/external) references are ignored."""
+    _change_refs(db, references, -1)
+
+
+def post_media_paths(db: Session, post_id: int) -> list:
+    """Media referenced by a post: its images and its comments' files."""
+    images = db.query(models.PostImage.path).filter(models.PostImage.post_id == post_id)
+    comment_files = (
+        db.query(models.CommentFile.path)
+        .join(models.Comment, models.Comment.cid == models.CommentFile.comment_id)
+        .filter(models.Comment.post_id == post_id)
+    )
+    return [path for (path,) in images.union_all(comment_files)]
+
+
+def recount_references(db: Session) -> int:
+    """Set every blob's ref_count from the reference columns. Returns how many rows were corrected."""
+    counts = Counter()
+    for column, _ in _reference_columns():
+        for (value,) in db.query(column).filter(column.like(f"%{BLOB_DIR}/%")):
+            counts[relative_path(value)] += 1
+
+    fixed = 0
+    for blob in db.query(models.MediaBlob):
+        actual = counts.get(blob.path, 0)
+        if blob.ref_count != actual:
+            blob.ref_count = actual
+            fixed += 1
+    db.flush()
+    return fixed
+
+
+def _is_stale(disk_path: str, now: float, grace: float) -> bool:
+    try:
+        return now - os.path.getmtime(disk_path) >= grace
+    except FileNotFoundError:
+        return True
+
+
+def collect_garbage(db: Session, grace_seconds: float = GC_GRACE_SECONDS) -> int:
+    """
+    Delete blobs nobody references, plus files under blobs/ with no MediaBlob row
+    (uploads whose transaction rolled back). Returns the number of files removed.
+    """
+    now = time.time()
+    recount_references(db)
+
+    removed = 0
+    for blob in db.query(models.MediaBlob).filter(models.MediaBlob.ref_count <= 0).all():
+        disk_path = _disk_path(blob.path)
+        if not _is_stale(disk_path, now, grace_seconds):
+            continue
+        for variant in blob.variants:
+            try:
+                os.unlink(_disk_path(variant.path))
+            except FileNotFoundError:
+                pass
+        db.delete(blob)
+        if os.path.exists(disk_path):
+            os.unlink(disk_path)
+            removed += 1
+    db.flush()
+
+    known = {path for (path,) in db.query(models.MediaBlob.path)}
+    root = _disk_path(BLOB_DIR)
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            disk_path = os.path.join(dirpath, name)
+            path = os.path.relpath(disk_path, config.UPLOAD_ROOT).replace(os.sep, "/")
+            if path not in known and _is_stale(disk_path, now, grace_seconds):
+                os.unlink(disk_path)
+                removed += 1
+    return removed
+
+
+def import_legacy_files(db: Session) -> int:
+    """Move files referenced by name-based paths into the store and repoint the rows."""
+    moved = {}      # old relative path -> new blob path
+    for column, url_style in _reference_columns():
+        model = column.class_
+        rows = (
+            db.query(model)
+            .filter(column.isnot(None), ~column.like(f"%{BLOB_DIR}/%"), ~column.like("http%"))
+            .all()
+        )
+        for row in rows:
+            old = relative_path(getattr(row, column.key))
+            if old not in moved:
+                disk_path = _disk_path(old)
+                if not os.path.isfile(disk_path):
+                    continue
+                with open(disk_path, "rb") as fh:
+                    stored = store_upload(db, UploadFile(fh, filename=os.path.basename(old)), max_bytes=sys.maxsize)
+                moved[old] = stored.path
+            else:
+                add_refs(db, [moved[old]])
+            setattr(row, column.key, url_for(moved[old]) if url_style else moved[old])
+    db.commit()
+
+    for old in moved:
+        try:
+            os.unlink(_disk_path(old))
+        except FileNotFoundError:
+            pass
+    return len(moved)
+
+
+def main(argv=None):
+    from .database import SessionLocal
+
+    command = (argv or sys.argv[1:] or ["gc"])[0]
+    db = SessionLocal()
+    try:
+        if command == "gc":
+            removed = collect_garbage(db)
+            db.commit()
+            print(f"Removed {removed} unreferenced media file(s).")
+        elif command == "import":
+            moved = import_legacy_files(db)
+            print(f"Moved {moved} file(s) into the media store.")
+        else:
+            print("usage: python -m app.media [gc|import]")
+            sys.exit(2)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,22 @@
 from sqlalchemy.sql import func
-from sqlalchemy import Table, ForeignKey, Column, Integer, String, Boolean, TIMESTAMP, text, Text, func, UniqueConstraint, CheckConstraint, Index, Date , DateTime, BigInteger
+from sqlalchemy import Table, ForeignKey, Column, Integer, String, Boolean, TIMESTAMP, text, Text, func, UniqueConstraint, CheckConstraint, Index, Date , DateTime, BigInteger, JSON
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.hybrid import hybrid_property
 from datetime import datetime
+from zoneinfo import ZoneInfo
 from sqlalchemy import Enum
+from . import config
 from .database import Base
 
 
 class User(Base):
     __tablename__ = "users"
+    # Active bans by expiry: what the ban-expiry job scans
+    __table_args__ = (
+        Index("ix_users_banned_until", "ban_until", postgresql_where=text("is_banned"), sqlite_where=text("is_banned")),
+    )
 
     uid = Column(Integer, primary_key=True, nullable=False)
     username = Column(String, nullable=False, unique=True)  # Use when registering (login)
@@ -33,6 +39,8 @@ class User(Base):
     is_admin = Column(Boolean, nullable=False, default=False)
     is_banned = Column(Boolean, default=False)
     ban_until = Column(DateTime, nullable=True)
+    # Denormalized, kept in step with follows by a Session hook (see app/counters.py)
+    follower_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
 
     likes = relationship("Like", back_populates="user", cascade="all, delete-orphan")
     posts = relationship("Post", back_populates="user", cascade="all, delete-orphan")
@@ -43,10 +51,6 @@ class User(Base):
     reports = relationship("Report", back_populates="reporter", foreign_keys="[Report.reporter_id]", cascade="all, delete-orphan")
     comments = relationship("Comment", back_populates="user", cascade="all, delete-orphan")
 
-    @hybrid_property
-    def follower_count(self):
-        return len(self.followers)
-
     @hybrid_property
     def following_count(self):
         return len(self.following)
@@ -62,6 +66,9 @@ forum_tags = Table(
 
 class Follow(Base):
     __tablename__ = "follows"
+    # The primary key serves "who do I follow"; this serves "who follows me"
+    __table_args__ = (Index("ix_follows_following_id", "following_id"),)
+
     follower_id = Column(Integer, ForeignKey("users.uid", ondelete="CASCADE"), primary_key=True)
     following_id = Column(Integer, ForeignKey("users.uid", ondelete="CASCADE"), primary_key=True)
     created_at = Column(
@@ -105,7 +112,12 @@ class PostTag(Base):
 
 class Post(Base):
     __tablename__ = "post"
-    
+    # Keyset feeds per forum / per author walk pid downwards (see app/feed.py)
+    __table_args__ = (
+        Index("ix_post_forum_pid", "forum_id", "pid"),
+        Index("ix_post_user_pid", "user_id", "pid"),
+    )
+
     pid = Column(Integer, primary_key=True, nullable=False)
     post_content = Column(String, nullable=False)
     forum_id = Column(Integer, ForeignKey("forum.fid"), nullable=False)
@@ -123,10 +135,59 @@ class Post(Base):
         nullable=False,
         server_default=text('now()')
     )
+    # Denormalized counters, kept in step by the like/comment endpoints (see app/counters.py)
+    like_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    comment_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
     images = relationship("PostImage", back_populates="post", cascade="all, delete-orphan")
     likes = relationship("Like", back_populates="post", cascade="all, delete-orphan")
     comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
     reports = relationship("Report", back_populates="post", cascade="all, delete-orphan")
+    hashtags = relationship("PostHashtag", cascade="all, delete-orphan")
+
+
+# One row per distinct #hashtag in a post's text, lowercased (see app/hashtags.py)
+class PostHashtag(Base):
+    __tablename__ = "post_hashtags"
+    # Posts of a tag, newest first; counts per tag
+    __table_args__ = (Index("ix_post_hashtags_tag_post", "tag", "post_id"),)
+
+    post_id = Column(Integer, ForeignKey("post.pid", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String, primary_key=True)
+
+
+# One row per (viewer, post) in a viewer's precomputed following feed (see app/timeline.py)
+class TimelineEntry(Base):
+    __tablename__ = "timeline_entries"
+
+    user_id = Column(Integer, ForeignKey("users.uid", ondelete="CASCADE"), primary_key=True)
+    post_id = Column(Integer, ForeignKey("post.pid", ondelete="CASCADE"), primary_key=True)
+    author_id = Column(Integer, ForeignKey("users.uid", ondelete="CASCADE"), nullable=False)
+
+
+# One stored file, shared by every row that references its content (see app/media.py)
+class MediaBlob(Base):
+    __tablename__ = "media_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String, nullable=False, unique=True)   # relative to UPLOAD_ROOT, e.g. blobs/ab/cd/<sha256>.png
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+    variants = relationship("MediaVariant", cascade="all, delete-orphan", passive_deletes=True)
+
+
+# A resized copy of an image blob (see app/imaging.py)
+class MediaVariant(Base):
+    __tablename__ = "media_variants"
+
+    blob_sha256 = Column(String(64), ForeignKey("media_blobs.sha256", ondelete="CASCADE"), primary_key=True)
+    width = Column(Integer, primary_key=True)
+    format = Column(String(10), primary_key=True)   # "webp" | "jpg" | "png"
+    height = Column(Integer, nullable=False)
+    path = Column(String, nullable=False)           # relative to UPLOAD_ROOT, e.g. variants/ab/cd/<sha256>_w320.webp
+    size = Column(BigInteger, nullable=False)
 
 
 class PostImage(Base):
@@ -142,11 +203,22 @@ class PostImage(Base):
 
 class StudySession(Base):
     __tablename__ = "study_sessions"
+    __table_args__ = (
+        # Open-session and per-range lookups for one user
+        Index("ix_study_sessions_user_end", "user_id", "end_time"),
+        # Open sessions only, by last heartbeat: what the stale-session reaper scans
+        Index(
+            "ix_study_sessions_open_heartbeat", "last_heartbeat_at",
+            postgresql_where=text("end_time IS NULL"), sqlite_where=text("end_time IS NULL"),
+        ),
+    )
 
     sid = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.uid", ondelete="CASCADE"), nullable=False)
     start_time = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("now()"))
     end_time = Column(TIMESTAMP(timezone=True))
+    # Bumped by POST /study/heartbeat/{sid} while the client's timer runs
+    last_heartbeat_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("now()"))
     duration_minutes = Column(Integer)
 
     user = relationship("User", back_populates="sessions")
@@ -155,12 +227,25 @@ from sqlalchemy import Column, Integer, Date, TIMESTAMP, ForeignKey
 # If you continue to use TIMESTAMP, you do not need to change the date type.
 
 
+def _study_local_date(context):
+    """Default for DailyProgress.local_date: the study-timezone day that `date` starts."""
+    value = context.get_current_parameters()["date"]
+    if not isinstance(value, datetime):
+        return value
+    if value.tzinfo is not None:
+        value = value.astimezone(ZoneInfo(config.STUDY_TIMEZONE))
+    return value.date()
+
+
 class DailyProgress(Base):
     __tablename__ = "daily_progress"
+    # One row per user per local day; the upsert in routers/study_calendar.py targets this.
+    __table_args__ = (UniqueConstraint("user_id", "local_date", name="uq_daily_progress_user_local_date"),)
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.uid", ondelete="CASCADE"), nullable=False)
-    date = Column(TIMESTAMP(timezone=True), nullable=False)
+    date = Column(TIMESTAMP(timezone=True), nullable=False)  # start of the local day, in UTC
+    local_date = Column(Date, nullable=False, default=_study_local_date)  # the day in config.STUDY_TIMEZONE
     total_minutes = Column(Integer, default=0, nullable=False)
     badge_level = Column(Integer, default=0, nullable=False)
 
@@ -175,6 +260,8 @@ class DailyProgress(Base):
 
 class Like(Base):
     __tablename__ = "likes"
+    # The primary key leads with user_id; likes of a post need their own index
+    __table_args__ = (Index("ix_likes_post_id", "post_id"),)
 
     user_id = Column(Integer, ForeignKey("users.uid", ondelete="CASCADE"), primary_key=True)
     post_id = Column(Integer, ForeignKey("post.pid"), primary_key=True)
@@ -185,6 +272,8 @@ class Like(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    # A post's comments, oldest first (see feed.fetch_comments)
+    __table_args__ = (Index("ix_comments_post_created", "post_id", "created_at"),)
 
     cid = Column(Integer, primary_key=True, nullable=False)
     content = Column(Text, nullable=False)
@@ -249,6 +338,9 @@ class Chat(Base):
 
     user1_last_read_at = Column(DateTime(timezone=True), nullable=True)
     user2_last_read_at = Column(DateTime(timezone=True), nullable=True)
+    # Unread messages per side, maintained by app.badges
+    user1_unread = Column(Integer, nullable=False, default=0, server_default="0")
+    user2_unread = Column(Integer, nullable=False, default=0, server_default="0")
 
     user1 = relationship("User", foreign_keys=[user1_id])
     user2 = relationship("User", foreign_keys=[user2_id])
@@ -289,6 +381,12 @@ class ChatAttachment(Base):
   
 class Notification(Base):
     __tablename__ = "notifications"
+    # Newest-first pages per audience (see app.notifications)
+    __table_args__ = (
+        Index("ix_notifications_receiver_created", "receiver_id", "created_at"),
+        Index("ix_notifications_role_created", "target_role", "created_at"),
+        Index("ix_notifications_title_created", "title", "created_at"),
+    )
     id = Column(Integer, primary_key=True)
     title = Column(String, nullable=False)
     message = Column(Text, nullable=False)
@@ -301,6 +399,8 @@ class Notification(Base):
 
 class NotificationRead(Base):
     __tablename__ = "notification_reads"
+    # Read-state lookups are "has this user read this notification"
+    __table_args__ = (Index("ix_notification_reads_user_notification", "user_id", "notification_id"),)
 
     id = Column(Integer, primary_key=True)
     notification_id = Column(Integer, ForeignKey("notifications.id"))
@@ -311,6 +411,32 @@ class NotificationRead(Base):
     user = relationship("User")
 
 
+# Per-user unread totals behind /me/badges, maintained by app.badges
+class UserBadge(Base):
+    __tablename__ = "user_badges"
+
+    uid = Column(Integer, ForeignKey("users.uid", ondelete="CASCADE"), primary_key=True)
+    unread_notifications = Column(Integer, nullable=False, default=0, server_default="0")
+    unread_messages = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+# Events pushed over /ws/events, kept for a while so clients can resume (app.events)
+class UserEvent(Base):
+    __tablename__ = "user_events"
+    # Replay is "this user's events and broadcasts after id N"; pruning is by age
+    __table_args__ = (
+        Index("ix_user_events_user_id", "user_id", "id"),
+        Index("ix_user_events_created_at", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # NULL: a broadcast to every user
+    user_id = Column(Integer, ForeignKey("users.uid", ondelete="CASCADE"), nullable=True)
+    type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+
 class Block(Base):
     __tablename__ = "blocks"
 
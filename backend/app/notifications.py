@@ -0,0 +1,141 @@
+"""
+Notification lists for routers/notification.py.
+
+Every list is one query: the notification, its sender's username/avatar
+(outer join) and, for per-user lists, whether the viewer has read it (an
+EXISTS against notification_reads). Pages are keyset-paginated on
+(created_at, id), newest first, with the cursor in X-Next-Cursor; without
+that, broadcast notifications make every list grow without bound.
+
+Audience rules:
+- admins see admin-targeted notifications, their own, and broadcasts
+- users see user-targeted notifications addressed to them, and broadcasts
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import and_, exists, func, or_
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .feed import NEXT_CURSOR_HEADER
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Both spellings have been used for "send to everyone"
+BROADCAST_TITLES = ("All", "all")
+SYSTEM_TITLES = ("HelpReport", "HelpReportReply", "Help Update", "Report Update")
+
+
+class NotificationPage(NamedTuple):
+    # created_at and id of the last notification on the previous page
+    before_ts: Optional[datetime]
+    before_id: Optional[int]
+    limit: int
+
+
+def encode_cursor(notification: models.Notification) -> str:
+    raw = json.dumps(
+        {"ts": notification.created_at.isoformat(), "nid": notification.id}, separators=(",", ":")
+    ).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        ts, nid = datetime.fromisoformat(data["ts"]), data["nid"]
+        if not isinstance(nid, int):
+            raise ValueError(nid)
+        return ts, nid
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def get_notification_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+) -> NotificationPage:
+    """Dependency: notification page parameters."""
+    before_ts, before_id = decode_cursor(cursor) if cursor else (None, None)
+    return NotificationPage(before_ts=before_ts, before_id=before_id, limit=limit)
+
+
+def audience_filter(uid: int, is_admin: bool):
+    Notification = models.Notification
+    broadcast = Notification.title.in_(BROADCAST_TITLES)
+    if is_admin:
+        return or_(Notification.target_role == "admin", Notification.receiver_id == uid, broadcast)
+    return or_(and_(Notification.target_role == "user", Notification.receiver_id == uid), broadcast)
+
+
+def is_read_by(uid: int):
+    Read = models.NotificationRead
+    return exists().where(Read.notification_id == models.Notification.id, Read.user_id == uid)
+
+
+def _comparable(db: Session, value):
+    # SQLite keeps timestamps as text and compares them as strings, so a stored
+    # "...08" sorts before a bound "...08.000000". Put both sides in one format.
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:%M:%f", value)
+    return value
+
+
+def load_page(
+    db: Session,
+    criteria,
+    page: NotificationPage,
+    response: Response,
+    reader_uid: Optional[int] = None,
+) -> List[schemas.NotificationResponse]:
+    """
+    One page of notifications matching `criteria`, with sender fields and,
+    when `reader_uid` is given, that user's read state.
+    """
+    Notification = models.Notification
+    read = is_read_by(reader_uid) if reader_uid is not None else None
+    columns = [Notification, models.User.username, models.User.profile_image]
+    if read is not None:
+        columns.append(read.label("is_read"))
+
+    query = (
+        db.query(*columns)
+        .outerjoin(models.User, models.User.uid == Notification.sender_id)
+        .filter(criteria)
+    )
+    if page.before_id is not None:
+        # The boundary travels in the cursor, so deleting that notification
+        # does not end the list.
+        created_at, before_ts = _comparable(db, Notification.created_at), _comparable(db, page.before_ts)
+        query = query.filter(or_(
+            created_at < before_ts,
+            and_(created_at == before_ts, Notification.id < page.before_id),
+        ))
+
+    rows = query.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1][0])
+
+    return [
+        schemas.NotificationResponse.model_validate(row[0]).model_copy(update={
+            "is_read": bool(row[3]) if read is not None else False,
+            "sender_username": row[1],
+            "sender_avatar": row[2],
+        })
+        for row in rows
+    ]
+
+
+def unread_count(db: Session, uid: int, is_admin: bool) -> int:
+    return (
+        db.query(func.count(models.Notification.id))
+        .filter(audience_filter(uid, is_admin), ~is_read_by(uid))
+        .scalar()
+    )
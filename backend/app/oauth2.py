@@ -2,7 +2,7 @@ import jwt
 from jwt.exceptions import InvalidTokenError
 from fastapi import Depends, status, HTTPException
 from datetime import datetime, timedelta, timezone
-from . import schemas, database, models
+from . import schemas, database, models, identity
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 import os
@@ -42,6 +42,7 @@ def verify_access_token(token: str, credentials_exception):
 
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+    """The ORM User, for endpoints that write the row or need its profile fields; others use get_current_principal."""
     credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
                                          detail="Couldn't validate credentials", headers={"WWW-Authenticate": "Bearer"})
     
@@ -52,7 +53,45 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     return user
 
 
-def get_admin_user(current_user: models.User = Depends(get_current_user)):
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db = Depends(database.get_read_db)):
+    """get_current_user for async handlers; the lookup runs via database.run_db."""
+    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
+                                         detail="Couldn't validate credentials", headers={"WWW-Authenticate": "Bearer"})
+
+    token = verify_access_token(token, credentials_exception)
+    user = await database.run_db(db, lambda s: s.get(models.User, token.id))
+    if user is None:
+        raise credentials_exception
+    return user
+
+
+def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> identity.Principal:
+    """Claims-only get_current_user: a cached identity.Principal instead of the ORM User."""
+    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
+                                         detail="Couldn't validate credentials", headers={"WWW-Authenticate": "Bearer"})
+
+    token = verify_access_token(token, credentials_exception)
+    principal = identity.load_principal(db, token.id)
+    if principal is None:
+        raise credentials_exception
+    return principal
+
+
+async def get_current_principal_async(token: str = Depends(oauth2_scheme), db = Depends(database.get_read_db)) -> identity.Principal:
+    """get_current_principal for async handlers; the database is only hit on a cache miss."""
+    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
+                                         detail="Couldn't validate credentials", headers={"WWW-Authenticate": "Bearer"})
+
+    token = verify_access_token(token, credentials_exception)
+    principal = identity.cache.get(token.id)
+    if principal is None:
+        principal = await database.run_db(db, lambda s: identity.load_principal(s, token.id))
+    if principal is None:
+        raise credentials_exception
+    return principal
+
+
+def get_admin_user(current_user: identity.Principal = Depends(get_current_principal)) -> identity.Principal:
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
@@ -0,0 +1,111 @@
+"""
+Password hashing off the request path.
+
+bcrypt is deliberately CPU-bound, so hashing and verification run in a small
+process pool (PASSWORD_HASH_WORKERS) instead of the request threadpool. At
+most PASSWORD_HASH_MAX_PENDING operations may be queued or running; beyond
+that callers get an immediate 503 instead of piling up behind a login storm.
+
+The cost factor comes from BCRYPT_ROUNDS. Hashes made with a different cost
+are reported by `needs_rehash`, and `auth.login` re-hashes them with the
+password it just verified.
+"""
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from . import config
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def hash_sync(password: str, rounds: Optional[int] = None) -> str:
+    return context(rounds or config.BCRYPT_ROUNDS).hash(password)
+
+
+def verify_sync(password: str, hashed: Optional[str]) -> bool:
+    if not hashed:
+        # OAuth-only accounts have no password
+        return False
+    return context(config.BCRYPT_ROUNDS).verify(password, hashed)
+
+
+def needs_rehash(hashed: Optional[str]) -> bool:
+    return bool(hashed) and context(config.BCRYPT_ROUNDS).needs_update(hashed)
+
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    if config.PASSWORD_HASH_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=config.PASSWORD_HASH_WORKERS)
+        return _executor
+
+
+def _acquire_slot():
+    global _pending
+    with _pending_lock:
+        if _pending >= config.PASSWORD_HASH_MAX_PENDING:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in attempts right now, please retry",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+
+
+def _release_slot():
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+def pending() -> int:
+    return _pending
+
+
+async def _run(fn, *args):
+    _acquire_slot()
+    try:
+        executor = _get_executor()
+        if executor is None:
+            from starlette.concurrency import run_in_threadpool
+
+            return await run_in_threadpool(fn, *args)
+        return await asyncio.wrap_future(executor.submit(fn, *args))
+    finally:
+        _release_slot()
+
+
+async def hash_password(password: str) -> str:
+    # The cost is resolved here, not in the worker, so it always matches this process's config.
+    return await _run(hash_sync, password, config.BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, hashed: Optional[str]) -> bool:
+    if not hashed:
+        return False
+    return await _run(verify_sync, password, hashed)
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
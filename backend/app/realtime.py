@@ -0,0 +1,302 @@
+"""
+Real-time event hub for the WebSockets (/chats/ws/{user_id}, /ws/events).
+
+Every worker process keeps its own sockets (several per user, one per tab).
+`hub.publish(user_ids, data)` delivers an event to all of them (user_ids=None:
+to every connected user):
+
+- REALTIME_BACKEND=memory   : delivery only inside this process (single worker).
+- REALTIME_BACKEND=postgres : events go through Postgres LISTEN/NOTIFY, so every
+                              worker delivers to the sockets it holds (`--workers N`).
+                              An event too big for one NOTIFY is sent in chunks,
+                              in one transaction, and put back together by each worker.
+
+Each socket has a bounded send queue drained by its own task. A client that
+cannot keep up (queue full) is disconnected instead of stalling the publisher;
+the frontend reloads chats on reconnect.
+
+Synchronous code (commit hooks, threadpool handlers) publishes through
+`hub.publish_threadsafe`, which hands the events to the loop the hub was
+started on.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from typing import Collection, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "hubersity_realtime"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+MAX_NOTIFY_PAYLOAD = 7900
+# Characters of an oversized payload per chunk. Payloads are ASCII (json.dumps
+# escapes the rest) and quoting one inside the chunk at most doubles it.
+NOTIFY_CHUNK_CHARS = (MAX_NOTIFY_PAYLOAD - 200) // 2
+
+# WebSocket close code 1013: "try again later".
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class Connection:
+    """One WebSocket plus its outgoing queue and sender task."""
+
+    def __init__(self, user_id: int, websocket: WebSocket, queue_size: int,
+                 event_types: Optional[Collection[str]] = None,
+                 fields: Optional[Collection[str]] = None):
+        self.user_id = user_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: Optional[asyncio.Task] = None
+        # None: every event type
+        self.event_types = event_types
+        # None: the whole event; otherwise only these keys are sent
+        self.fields = fields
+        # Ids of events already sent by the resume replay. Not a high-water
+        # mark: events commit out of id order, so a lower id can still arrive live.
+        self.skip_ids: Set[int] = set()
+
+    def accepts(self, data: dict) -> bool:
+        return self.event_types is None or data.get("type") in self.event_types
+
+    def offer(self, data: dict) -> bool:
+        """Queue an event without waiting. False when the client is too far behind."""
+        if self.fields is not None:
+            data = {key: data[key] for key in self.fields if key in data}
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def run_sender(self):
+        while True:
+            data = await self.queue.get()
+            event_id = data.get("id")
+            if event_id is not None and event_id in self.skip_ids:
+                continue
+            await self.websocket.send_json(data)
+
+
+class LocalHub:
+    """In-process hub: user_id -> set of live connections."""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.connections: Dict[int, Set[Connection]] = defaultdict(set)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        self.loop = None
+        for conns in list(self.connections.values()):
+            for conn in list(conns):
+                await self.disconnect(conn)
+
+    async def connect(self, user_id: int, websocket: WebSocket,
+                      event_types: Optional[Collection[str]] = None, start: bool = True,
+                      fields: Optional[Collection[str]] = None) -> Connection:
+        """
+        Accept and register a socket. With start=False, events are queued but
+        not sent until `start_sender` (so a replay can go out first).
+        `event_types` and `fields` narrow what the socket is sent.
+        """
+        await websocket.accept()
+        conn = Connection(user_id, websocket, self.queue_size, event_types, fields)
+        self.connections[user_id].add(conn)
+        if start:
+            self.start_sender(conn)
+        return conn
+
+    def start_sender(self, conn: Connection):
+        conn.sender = asyncio.create_task(self._send_loop(conn))
+
+    async def disconnect(self, conn: Connection):
+        conns = self.connections.get(conn.user_id)
+        if conns is not None:
+            conns.discard(conn)
+            if not conns:
+                self.connections.pop(conn.user_id, None)
+        if conn.sender and conn.sender is not asyncio.current_task():
+            conn.sender.cancel()
+
+    def connection_count(self, user_id: Optional[int] = None) -> int:
+        if user_id is not None:
+            return len(self.connections.get(user_id, ()))
+        return sum(len(c) for c in self.connections.values())
+
+    def deliver_local(self, user_ids: Optional[Iterable[int]], data: dict):
+        """Queue `data` on every socket this process holds for `user_ids` (None: everyone)."""
+        targets = list(self.connections) if user_ids is None else set(user_ids)
+        for uid in targets:
+            for conn in list(self.connections.get(uid, ())):
+                if not conn.accepts(data):
+                    continue
+                if not conn.offer(data):
+                    logger.warning("Dropping slow realtime client for user %s", uid)
+                    asyncio.create_task(self._evict(conn))
+
+    async def publish(self, user_ids: Optional[Iterable[int]], data: dict):
+        self.deliver_local(user_ids, data)
+
+    async def publish_many(self, events: List[Tuple[Optional[Iterable[int]], dict]]):
+        for user_ids, data in events:
+            await self.publish(user_ids, data)
+
+    def publish_threadsafe(self, events: List[Tuple[Optional[Iterable[int]], dict]]):
+        """
+        Publish (user_ids, data) pairs, in order, from synchronous code on any
+        thread. Dropped when the hub is not running (CLI scripts, tests
+        without a client).
+        """
+        loop = self.loop
+        if loop is None or loop.is_closed() or not events:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            loop.create_task(self.publish_many(events))
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.publish_many(events), loop)
+        except RuntimeError:
+            # Loop shut down between the check and the call
+            pass
+
+    async def _send_loop(self, conn: Connection):
+        try:
+            await conn.run_sender()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Socket went away mid-send; the receive loop will notice too.
+            await self.disconnect(conn)
+
+    async def _evict(self, conn: Connection):
+        await self.disconnect(conn)
+        try:
+            await conn.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
+
+
+class PostgresHub(LocalHub):
+    """
+    Cross-worker hub on Postgres LISTEN/NOTIFY. Each worker listens on one
+    dedicated connection and delivers incoming events to its local sockets.
+    """
+
+    def __init__(self, dsn: str, queue_size: int = 100, reconnect_delay: float = 2.0):
+        super().__init__(queue_size)
+        self.dsn = dsn
+        self.reconnect_delay = reconnect_delay
+        self._listener: Optional[asyncio.Task] = None
+        self._publish_pool = None
+        # Chunked events still being received: chunk id -> parts by position
+        self._partial: Dict[str, List[Optional[str]]] = {}
+
+    async def start(self):
+        import asyncpg
+
+        await super().start()
+        self._publish_pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=2)
+        self._listener = asyncio.create_task(self._listen_forever())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+        if self._publish_pool is not None:
+            await self._publish_pool.close()
+            self._publish_pool = None
+        await super().stop()
+
+    async def publish(self, user_ids: Optional[Iterable[int]], data: dict):
+        targets = sorted(set(user_ids)) if user_ids is not None else None
+        payload = json.dumps({"user_ids": targets, "data": data}, default=str)
+        if self._publish_pool is None:
+            # Not started: at least reach this worker's sockets.
+            logger.warning("Realtime hub not started; event delivered to this worker only")
+            self.deliver_local(user_ids, data)
+            return
+        if len(payload.encode()) <= MAX_NOTIFY_PAYLOAD:
+            await self._publish_pool.execute("SELECT pg_notify($1, $2)", NOTIFY_CHANNEL, payload)
+            return
+
+        # Notifications of one transaction are delivered together and in order.
+        chunk_id = uuid.uuid4().hex
+        parts = [payload[i:i + NOTIFY_CHUNK_CHARS] for i in range(0, len(payload), NOTIFY_CHUNK_CHARS)]
+        async with self._publish_pool.acquire() as conn:
+            async with conn.transaction():
+                for seq, part in enumerate(parts):
+                    chunk = json.dumps({"chunk": chunk_id, "seq": seq, "total": len(parts), "part": part})
+                    await conn.execute("SELECT pg_notify($1, $2)", NOTIFY_CHANNEL, chunk)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+            if "chunk" in event:
+                payload = self._add_chunk(event)
+                if payload is None:
+                    return
+                event = json.loads(payload)
+            self.deliver_local(event["user_ids"], event["data"])
+        except (ValueError, KeyError, TypeError, IndexError):
+            logger.warning("Ignoring malformed realtime payload on %s", channel)
+
+    def _add_chunk(self, chunk: dict) -> Optional[str]:
+        """Store one chunk; returns the whole payload once its last chunk is in."""
+        parts = self._partial.setdefault(chunk["chunk"], [None] * chunk["total"])
+        parts[chunk["seq"]] = chunk["part"]
+        if any(part is None for part in parts):
+            return None
+        del self._partial[chunk["chunk"]]
+        return "".join(parts)
+
+    async def _listen_forever(self):
+        import asyncpg
+
+        while True:
+            conn = None
+            # Chunks of an event cut off by a lost connection never complete.
+            self._partial.clear()
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _conn: lost.set())
+                await conn.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                await lost.wait()
+            except asyncio.CancelledError:
+                if conn is not None:
+                    await conn.close()
+                raise
+            except Exception:
+                logger.exception("Realtime LISTEN connection failed; retrying")
+            await asyncio.sleep(self.reconnect_delay)
+
+
+def listen_dsn() -> str:
+    return (
+        f"postgresql://{config.DB_USER}:{config.DB_PASSWORD}"
+        f"@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}"
+    )
+
+
+def create_hub() -> LocalHub:
+    if config.REALTIME_BACKEND == "postgres":
+        return PostgresHub(listen_dsn(), queue_size=config.REALTIME_SEND_QUEUE_SIZE)
+    if config.REALTIME_BACKEND != "memory":
+        raise ValueError(f"Unknown REALTIME_BACKEND: {config.REALTIME_BACKEND!r}")
+    return LocalHub(queue_size=config.REALTIME_SEND_QUEUE_SIZE)
+
+
+hub = create_hub()
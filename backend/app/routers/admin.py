@@ -2,7 +2,7 @@ from fastapi import status, HTTPException, Depends, APIRouter, UploadFile, File
 from datetime import timedelta
 from sqlalchemy import func, distinct, desc, or_
 from sqlalchemy.orm import Session
-from .. import models, schemas, utils, oauth2
+from .. import models, schemas, utils, oauth2, counters, media, identity
 from ..database import get_db
 from typing import List
 import datetime, shutil, os
@@ -72,8 +72,8 @@ def get_reported_user_detail(username: str, db: Session = Depends(get_db)):
                 "id": str(post.pid),
                 "content": post.post_content,
                 "createdAt": post.created_at.isoformat(),
-                "likes": len(post.likes),
-                "comments": len(post.comments),
+                "likes": post.like_count,
+                "comments": post.comment_count,
                 "status": "Reported" if any(r.post_id == post.pid for r in post_reports) else "Normal",
             }
             for post in posts
@@ -143,6 +143,7 @@ def ban_user(user_id: int, request: schemas.BanRequest, db: Session = Depends(ge
         report.status = "Resolved"
 
     db.commit()
+    identity.invalidate(user_id)
     return {"message": f"{user.username} banned until {user.ban_until.strftime('%Y-%m-%d %H:%M:%S')}"}
 
 
@@ -151,8 +152,14 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.uid == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+
+    # Their likes/comments on other people's posts go with them
+    touched_post_ids = counters.posts_touched_by_user(db, user_id)
     db.delete(user)
+    db.flush()
+    counters.recompute_post_counters(db, touched_post_ids)
     db.commit()
+    identity.invalidate(user_id)
     return {"message": "User deleted"}
 
 
@@ -165,6 +172,7 @@ def unban_user(user_id: int, db: Session = Depends(get_db)):
     user.is_banned = False
     user.ban_until = None
     db.commit()
+    identity.invalidate(user_id)
 
     return {"message": f"User {user.username} has been unbanned"}
 
@@ -178,6 +186,7 @@ def delete_post(
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
+    media.release(db, media.post_media_paths(db, post_id))
     db.query(models.PostImage).filter(models.PostImage.post_id == post_id).delete()
 
     post.tags.clear()
@@ -202,7 +211,9 @@ def delete_comment(
     if noti:
         db.delete(noti)
 
+    media.release(db, [f.path for f in comment.files])
     db.delete(comment)
+    counters.bump_comment_count(db, comment.post_id, -1)
     db.commit()
     return
 
@@ -1,22 +1,18 @@
 from fastapi import APIRouter, Depends, status, HTTPException
 from sqlalchemy.orm import Session
-from .. import database, schemas, models, utils, oauth2
-import requests
+from .. import database, schemas, models, oauth2, passwords, google_oauth
 from fastapi.responses import RedirectResponse
-from ..config import (
-    GOOGLE_AUTH_URL, GOOGLE_TOKEN_URL,
-    GOOGLE_USERINFO_URL, GOOGLE_CLIENT_ID,
-    GOOGLE_CLIENT_SECRET, GOOGLE_REDIRECT_URI,
-    FRONTEND_URL, FULL_GOOGLE_AUTH_URL
-)
+from ..config import FRONTEND_URL, FULL_GOOGLE_AUTH_URL
 
 router = APIRouter(tags=["Authentication"])
 
 
 @router.post("/login")
-def login(user_cred: schemas.UserLogin, db: Session = Depends(database.get_db)):
+async def login(user_cred: schemas.UserLogin, db: Session = Depends(database.get_db)):
     # Search for users by email sent from the frontend.
-    user = db.query(models.User).filter(models.User.email == user_cred.email).first()
+    user = await database.run_db(
+        db, lambda s: s.query(models.User).filter(models.User.email == user_cred.email).first()
+    )
 
     if not user:
         raise HTTPException(
@@ -24,13 +20,25 @@ def login(user_cred: schemas.UserLogin, db: Session = Depends(database.get_db)):
             detail="Invalid Credentials"
         )
 
-    # Check password
-    if not utils.verify(user_cred.password, user.password):
+    # Check password (in the hashing pool, not on a request thread)
+    if not await passwords.verify_password(user_cred.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid Credentials"
         )
 
+    # Upgrade hashes made with a different BCRYPT_ROUNDS while we have the plain password
+    if passwords.needs_rehash(user.password):
+        try:
+            new_hash = await passwords.hash_password(user_cred.password)
+        except HTTPException:
+            new_hash = None     # pool saturated: keep the old hash, try again next login
+        if new_hash:
+            def save(s):
+                user.password = new_hash
+                s.commit()
+            await database.run_db(db, save)
+
     # Generate access token
     access_token = oauth2.create_access_token(data={"user_id": user.uid})
 
@@ -43,62 +51,43 @@ def google_login():
 
 
 @router.get("/auth/google/callback")
-def google_callback(code: str, db: Session = Depends(database.get_db)):
-    # 1. Exchange code for access token
-    token_data = {
-        "code": code,
-        "client_id": GOOGLE_CLIENT_ID,
-        "client_secret": GOOGLE_CLIENT_SECRET,
-        "redirect_uri": GOOGLE_REDIRECT_URI,
-        "grant_type": "authorization_code",
-    }
-
-    token_res = requests.post(GOOGLE_TOKEN_URL, data=token_data)
-    if token_res.status_code != 200:
-        raise HTTPException(status_code=400, detail="Failed to retrieve Google token")
-
-    token_json = token_res.json()
-    access_token = token_json.get("access_token")
-
-    # 2. Get Google profile
-    userinfo_res = requests.get(
-        GOOGLE_USERINFO_URL,
-        headers={"Authorization": f"Bearer {access_token}"}
-    )
-    if userinfo_res.status_code != 200:
-        raise HTTPException(status_code=400, detail="Failed to retrieve Google user info")
-
-    g_user = userinfo_res.json()
+async def google_callback(code: str, db: Session = Depends(database.get_db)):
+    # 1-2. Exchange the code and verify the ID token (see app.google_oauth)
+    g_user = await google_oauth.client.profile(code)
     google_id = g_user["sub"]
     email = g_user["email"]
     name = email.split("@")[0]
     picture = g_user.get("picture")
 
-    # 3. Check if user exists
-    user = db.query(models.User).filter(
-        models.User.oauth_provider == "google",
-        models.User.oauth_id == google_id
-    ).first()
+    def find_or_create(db: Session):
+        # 3. Check if user exists
+        user = db.query(models.User).filter(
+            models.User.oauth_provider == "google",
+            models.User.oauth_id == google_id
+        ).first()
 
-    if not user:
-        user = db.query(models.User).filter(models.User.email == email).first()
         if not user:
-            user = models.User(
-                username=name,
-                email=email,
-                profile_image=picture,
-                oauth_provider="google",
-                oauth_id=google_id,
-                password=None
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-            new_user = True
+            user = db.query(models.User).filter(models.User.email == email).first()
+            if not user:
+                user = models.User(
+                    username=name,
+                    email=email,
+                    profile_image=picture,
+                    oauth_provider="google",
+                    oauth_id=google_id,
+                    password=None
+                )
+                db.add(user)
+                db.commit()
+                db.refresh(user)
+                new_user = True
+            else:
+                new_user = False
         else:
             new_user = False
-    else:
-        new_user = False
+        return user, new_user
+
+    user, new_user = await database.run_db(db, find_or_create)
 
     # 4. Generate JWT
     jwt_token = oauth2.create_access_token(data={"user_id": user.uid})
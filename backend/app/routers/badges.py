@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from .. import badges, database, identity, oauth2, schemas
+
+router = APIRouter(tags=["Badges"])
+
+
+# Polled every few seconds by every logged-in client: cached principal + one primary-key read.
+@router.get("/me/badges", response_model=schemas.BadgesResponse)
+async def get_my_badges(
+    db: Session = Depends(database.get_db),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
+):
+    def load(db: Session):
+        return badges.get_badges(db, current_user.uid, current_user.is_admin)
+
+    return await database.run_db(db, load)
@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app import models
-from app.models import User
-from app.utils import get_current_user
+from app.identity import Principal
+from app.oauth2 import get_current_principal
 
 router = APIRouter(
     prefix="/block",
@@ -12,7 +12,7 @@ router = APIRouter(
 
 
 @router.post("/{uid}")
-def block_user(uid: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def block_user(uid: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
 
     if uid == current_user.uid:
         raise HTTPException(status_code=400, detail="You cannot block yourself")
@@ -36,7 +36,7 @@ def block_user(uid: int, db: Session = Depends(get_db), current_user: User = Dep
 
 
 @router.delete("/{uid}")
-def unblock_user(uid: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def unblock_user(uid: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
 
     block = db.query(models.Block).filter(
         models.Block.blocker_id == current_user.uid,
@@ -53,7 +53,7 @@ def unblock_user(uid: int, db: Session = Depends(get_db), current_user: User = D
 
 
 @router.get("/list")
-def get_block_list(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_block_list(db: Session = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
 
     blocks = db.query(models.Block).filter(
         models.Block.blocker_id == current_user.uid
@@ -1,15 +1,17 @@
 from fastapi import (
-    APIRouter, Depends, HTTPException, Query,
-    File, UploadFile, Form, Body, WebSocket, BackgroundTasks
+    APIRouter, Depends, HTTPException, Query, Response,
+    File, UploadFile, Form, Body, WebSocket
 )
 from sqlalchemy.orm import Session, selectinload
-from .. import models, database
+from .. import models, database, inbox, chat_history, media, imaging, events
+from ..realtime import hub
 from fastapi import File, UploadFile, Form
 import os, uuid
 from typing import List
 import os, uuid
 from fastapi import HTTPException, Body, WebSocket, APIRouter
-from starlette.status import HTTP_404_NOT_FOUND
+from starlette.concurrency import run_in_threadpool
+from starlette.status import HTTP_404_NOT_FOUND, WS_1008_POLICY_VIOLATION
 from datetime import datetime, timezone
 from sqlalchemy import or_, and_, func
 from typing import Optional
@@ -18,28 +20,6 @@ router = APIRouter(prefix="/chats", tags=["Chat"])
 UPLOAD_ROOT = "uploads"  # There is already a mount /uploads in main.py.
 UPLOAD_DIR = "uploads/chat"  # Use relative path for compatibility with GitHub Actions
 os.makedirs(UPLOAD_DIR, exist_ok=True)
-active_connections = {}
-
-async def connect_user(user_id: int, websocket: WebSocket):
-    await websocket.accept()
-    active_connections[user_id] = websocket
-
-async def send_to_user(user_id: int, data: dict):
-    ws = active_connections.get(user_id)
-    if ws:
-        await ws.send_json(data)
-
-async def notify_new_message(chat_id: int, user1: int, user2: int):
-    data = {
-        "type": "new_message",
-        "chat_id": chat_id
-    }
-
-    # Send to both relevant people.
-    for uid in [user1, user2]:
-        ws = active_connections.get(uid)
-        if ws:
-            await ws.send_json(data)
 
 
 # Helper functions
@@ -107,87 +87,15 @@ def get_year_in_local_language(year: int, lang: str) -> str:
 
 # A function that runs when someone calls that URL.
 @router.get("")
-def list_my_chats(
+async def list_my_chats(
     me_id: int = Query(...),
-    db: Session = Depends(database.get_db),
+    db = Depends(database.get_read_db),
 ):
-   # 1) Find mutuals
-    following = {f.following_id for f in db.query(models.Follow).filter_by(follower_id=me_id).all()}
-    followers = {f.follower_id for f in db.query(models.Follow).filter_by(following_id=me_id).all()}
-    mutuals = following & followers
-
-    # 2) ensure chat for each mutual
-    for uid in mutuals:
-        ensure_chat_if_friends(db, me_id, uid)
-
-    # 3) Then query chats as usual.
-    chats = (
-        db.query(models.Chat)
-        .filter((models.Chat.user1_id == me_id) | (models.Chat.user2_id == me_id))
-        .all()
-    )
-
-    result = []
-    for c in chats:
-        other_id = c.user2_id if c.user1_id == me_id else c.user1_id
-        # Skip pairs that are no longer friends (unfriend case)
-        if not is_friends(db, me_id, other_id):
-            continue
-        friend = c.user2 if c.user1_id == me_id else c.user1
-
-        # Latest message
-        last = (
-            db.query(models.ChatMessage)
-            .options(selectinload(models.ChatMessage.attachments))
-            .filter(models.ChatMessage.chat_id == c.id)
-            .order_by(models.ChatMessage.created_at.desc())
-            .first()
-        )
-
-        # Preview as usual
-        if last and last.attachments:
-            a = last.attachments[0]
-            if a.kind == "image":
-                preview = "[image]"
-            elif a.kind == "video":
-                preview = "[video]"
-            else:
-                preview = a.original_name or "[file]"
-        else:
-            preview = last.text or "" if last else ""
+    # Rooms are created when a follow becomes mutual (see app.inbox), not here.
+    def load(db: Session):
+        return inbox.build_inbox(db, me_id)
 
-        # count unread
-        my_last_read = (
-            c.user1_last_read_at if me_id == c.user1_id else c.user2_last_read_at
-        )
-
-        # If you have never read it → from the beginning
-        base_time = my_last_read or datetime.min.replace(tzinfo=timezone.utc)
-
-        unread_count = (
-            db.query(func.count(models.ChatMessage.id))
-            .filter(
-                models.ChatMessage.chat_id == c.id,
-                models.ChatMessage.sender_id != me_id,      # Not including my own
-                models.ChatMessage.created_at > base_time,  # After the last read time
-            )
-            .scalar()
-        )
-
-        result.append({
-            "id": c.id,
-            "name": friend.name or friend.username,
-            "username": friend.username,
-            "avatar": getattr(friend, "profile_image", None) or "/images/default.jpg",
-            "lastMessage": preview,
-            "last_ts": last.created_at.isoformat() if last else None,
-            "unread": unread_count,
-        })
-
-    # sort: ห้องที่มีข้อความล่าสุดอยู่ข้างบน
-    result.sort(key=lambda x: x["last_ts"] or "", reverse=True)
-
-    return result
+    return await database.run_db(db, load)
 
 
 @router.post("/with/{other_user_id}")
@@ -229,59 +137,76 @@ def sync_my_friend_chats(
     return {"created_or_existing": created, "total": len(mutuals)}
 
 
-# Retrieve all messages in the room
+# Retrieve messages in the room, one keyset page at a time (see app.chat_history)
 @router.get("/{chat_id}/messages")
-def get_messages(chat_id: int, me_id: int = Query(...), db: Session = Depends(database.get_db)):
-    msgs = (db.query(models.ChatMessage)
-            .options(selectinload(models.ChatMessage.attachments),
-                     selectinload(models.ChatMessage.sender))
-            .filter(models.ChatMessage.chat_id == chat_id)
-            .order_by(models.ChatMessage.created_at.asc())
-            .all())
-
-    out = []
-    for m in msgs:
-        sender = "me" if m.sender_id == me_id else (m.sender.name or m.sender.username)
-
-        # If it has been deleted → send a single bubble saying deleted and "file not extracted"
-        if (m.kind or "").lower() == "deleted":
-            out.append({
-                "id": m.id,
-                "sender": sender,
-                "text": "",
-                "kind": "deleted",
-                "url": None,
-                "name": "",
-                "created_at": m.created_at.isoformat(),
-            })
-            continue
+async def get_messages(
+    chat_id: int,
+    response: Response,
+    me_id: int = Query(...),
+    lang: Optional[str] = "en",
+    page: chat_history.HistoryPage = Depends(chat_history.get_history_page),
+    db = Depends(database.get_read_db),
+):
+    def load(db: Session):
+        chat = db.get(models.Chat, chat_id)
+        if not chat or me_id not in (chat.user1_id, chat.user2_id):
+            raise HTTPException(403, "Not allowed")
+
+        msgs = chat_history.load_history(db, chat_id, page, response)
+        previews = imaging.preview_urls(
+            db, [a.path for m in msgs for a in m.attachments if a.kind == "image"]
+        )
 
-        if m.attachments:
-            for a in m.attachments:
+        out = []
+        for m in msgs:
+            sender = "me" if m.sender_id == me_id else (m.sender.name or m.sender.username)
+            message_year = get_year_in_local_language(m.created_at.year, lang)
+
+            # If it has been deleted → send a single bubble saying deleted and "file not extracted"
+            if (m.kind or "").lower() == "deleted":
+                out.append({
+                    "id": m.id,
+                    "sender": sender,
+                    "text": "",
+                    "kind": "deleted",
+                    "url": None,
+                    "name": "",
+                    "created_at": m.created_at.isoformat(),
+                    "message_year": message_year,
+                })
+                continue
+
+            if m.attachments:
+                for a in m.attachments:
+                    out.append({
+                        "id": f"{m.id}:{a.id}",     # Let the front side use the original key.
+                        "sender": sender,
+                        "text": m.text or "",
+                        "kind": a.kind,
+                        "url":  f"/uploads/{a.path}",
+                        "preview_url": previews.get(a.path),
+                        "name": a.original_name or "",
+                        "created_at": m.created_at.isoformat(),
+                        "message_year": message_year,
+                    })
+            else:
                 out.append({
-                    "id": f"{m.id}:{a.id}",     # Let the front side use the original key.
+                    "id": m.id,
                     "sender": sender,
                     "text": m.text or "",
-                    "kind": a.kind,
-                    "url":  f"/uploads/{a.path}",
-                    "name": a.original_name or "",
+                    "kind": m.kind or "text",
+                    "url":  None,
+                    "name": "",
                     "created_at": m.created_at.isoformat(),
+                    "message_year": message_year,
                 })
-        else:
-            out.append({
-                "id": m.id,
-                "sender": sender,
-                "text": m.text or "",
-                "kind": m.kind or "text",
-                "url":  None,
-                "name": "",
-                "created_at": m.created_at.isoformat(),
-            })
-    return out
+        return out
+
+    return await database.run_db(db, load)
 
 
 @router.post("/{chat_id}/messages")
-async def send_message(
+def send_message(
     chat_id: int,
     payload: dict,
     me_id: int = Query(...),
@@ -299,23 +224,11 @@ async def send_message(
 
     message = models.ChatMessage(chat_id=chat_id, sender_id=me_id, kind="text", text=text)
     db.add(message)
+    # Committing sends "new_message" to both sides (app.events), so the
+    # sender's other tabs refresh too.
     db.commit()
     db.refresh(message)
 
-    other_id = chat.user2_id if me_id == chat.user1_id else chat.user1_id
-
-    # Just use the same one.
-    await send_to_user(other_id, {
-        "type": "new_message",
-        "chat_id": chat_id,
-        "from_user_id": me_id,
-        "message": {
-            "id": message.id,
-            "text": message.text,
-            "created_at": message.created_at.isoformat(),
-        },
-    })
-
     return {
         "id": message.id,
         "sender": "me",
@@ -330,7 +243,6 @@ async def send_message(
 @router.post("/{chat_id}/upload")
 def upload_attachments(
     chat_id: int,
-    background_tasks: BackgroundTasks = None,
     me_id: int = Query(...),
     files: List[UploadFile] = File(...),
     db: Session = Depends(database.get_db),
@@ -345,45 +257,25 @@ def upload_attachments(
     db.add(msg)
     db.flush()
 
-    # Subfolders by room
-    chat_dir = os.path.join(UPLOAD_DIR, str(chat_id))
-    os.makedirs(chat_dir, exist_ok=True)
-
     saved = []
     for f in files:
-        ext = os.path.splitext(f.filename)[1]
-        fname = f"{uuid.uuid4().hex}{ext}"
-
-        # Where the actual file is saved
-        dest = os.path.join(chat_dir, fname)
+        # Identical files (e.g. the same meme sent to many chats) are stored once.
+        stored = media.store_upload(db, f)
 
-        # Relative path stored in DB
-        rel_path = os.path.join("chat", str(chat_id), fname)  # e.g. chat/1/xxx.png
-
-        with open(dest, "wb") as out:
-            out.write(f.file.read())
-
-        att_kind = "image" if f.content_type.startswith("image/") else \
-                   "video" if f.content_type.startswith("video/") else "file"
+        att_kind = stored.kind if stored.kind in ("image", "video") else "file"
 
         att = models.ChatAttachment(
             message_id=msg.id,
             kind=att_kind,
-            path=rel_path,                # Important: Keep paths relative.
+            path=stored.path,             # Important: Keep paths relative (blobs/...).
             original_name=f.filename,
             mime_type=f.content_type,
+            size=stored.size,
         )
         db.add(att)
         saved.append(att)
 
     db.commit()
-    if background_tasks:
-        background_tasks.add_task(
-            notify_new_message,
-            chat.id,
-            chat.user1_id,
-            chat.user2_id,
-        )
 
     return {
         "message_id": msg.id,
@@ -391,7 +283,7 @@ def upload_attachments(
             {
                 "id": a.id,
                 "kind": a.kind,
-                "url": f"/uploads/{a.path}",   # => /uploads/chat/<chat_id>/<file>
+                "url": f"/uploads/{a.path}",   # => /uploads/blobs/<aa>/<bb>/<sha256>.<ext>
                 "name": a.original_name,
                 "mime_type": a.mime_type,
             }
@@ -404,7 +296,6 @@ def upload_attachments(
 def delete_message(
     chat_id: int,
     message_id: int,
-    background_tasks: BackgroundTasks = None,
     me_id: int = Query(...),
     db: Session = Depends(database.get_db),
 ):
@@ -432,13 +323,6 @@ def delete_message(
     msg.text = None
     db.add(msg)
     db.commit()
-    if background_tasks:
-        background_tasks.add_task(
-            notify_new_message,
-            chat.id,
-            chat.user1_id,
-            chat.user2_id,
-        )
 
     return {"ok": True}
 
@@ -509,8 +393,10 @@ def forward_message(
             path=att.path,  # reuse
             original_name=att.original_name,
             mime_type=att.mime_type,
+            size=att.size,
         )
         db.add(new_att)
+        media.add_refs(db, [att.path])
         db.flush()
         out_attachments.append({
             "id": new_att.id, "kind": new_att.kind,
@@ -523,8 +409,10 @@ def forward_message(
                 message_id=new_msg.id,
                 kind=a.kind, path=a.path,
                 original_name=a.original_name, mime_type=a.mime_type,
+                size=a.size,
             )
             db.add(new_att); db.flush()
+            media.add_refs(db, [a.path])
             out_attachments.append({
                 "id": new_att.id, "kind": new_att.kind,
                 "url": f"/uploads/{new_att.path}",
@@ -535,62 +423,6 @@ def forward_message(
     return {"message_id": new_msg.id, "sender": "me", "text": new_msg.text, "attachments": out_attachments}
 
 
-@router.get("/{chat_id}/messages")
-def list_messages(chat_id: int, me_id: int = Query(...), db: Session = Depends(database.get_db)):
-    chat = db.query(models.Chat).filter(models.Chat.id == chat_id).first()
-    if not chat or me_id not in (chat.user1_id, chat.user2_id):
-        raise HTTPException(403, "Not allowed")
-
-    rows = (
-        db.query(models.ChatMessage)
-        .options(selectinload(models.ChatMessage.attachments))
-        .filter(models.ChatMessage.chat_id == chat_id)
-        .order_by(models.ChatMessage.created_at.asc())
-        .all()
-    )
-
-    out = []
-    for m in rows:
-        sender = "me" if m.sender_id == me_id else "other"
-
-        if m.kind == "deleted":
-            out.append({
-                "id": m.id,
-                "sender": sender,
-                "kind": "deleted",
-                "text": None,
-                "url": None,
-                "name": None,
-                "attachments": [],  # Do not return files
-            })
-            continue
-
-        # normal
-        atts = [{
-            "id": a.id,
-            "kind": a.kind,
-            "url": f"/uploads/{a.path}",
-            "name": a.original_name,
-            "mime_type": a.mime_type,
-        } for a in (m.attachments or [])]
-
-        # In case the frontend uses a single url/name field
-        url = atts[0]["url"] if atts else None
-        name = atts[0]["name"] if atts else None
-
-        out.append({
-            "id": m.id,
-            "sender": sender,
-            "kind": m.kind or ("text" if not atts else atts[0]["kind"]),
-            "text": m.text or "",
-            "url": url,
-            "name": name,
-            "attachments": atts,
-        })
-
-    return out
-
-
 @router.post("/{chat_id}/read")
 def mark_read(
     chat_id: int,
@@ -614,31 +446,26 @@ def mark_read(
     return {"ok": True}
 
 
+# Same token check as /ws/events; the token must belong to user_id.
 @router.websocket("/ws/{user_id}")
-async def websocket_chat(websocket: WebSocket, user_id: int):
-    await connect_user(user_id, websocket)
+async def websocket_chat(
+    websocket: WebSocket,
+    user_id: int,
+    token: str = Query(...),
+    db: Session = Depends(database.get_db),
+):
+    principal = await run_in_threadpool(events.authenticate, db, token)
+    if principal is None or principal.uid != user_id:
+        await websocket.close(code=WS_1008_POLICY_VIOLATION)
+        return
+
+    conn = await hub.connect(
+        user_id, websocket, event_types=events.CHAT_EVENT_TYPES, fields=events.CHAT_EVENT_FIELDS
+    )
     try:
         while True:
             data = await websocket.receive_text()
-    except:
-        active_connections.pop(user_id, None)
-
-
-@router.get("/{chat_id}/messages")
-def get_messages(chat_id: int, me_id: int = Query(...), lang: Optional[str] = "en", db: Session = Depends(database.get_db)):
-    msgs = db.query(models.ChatMessage).filter(models.ChatMessage.chat_id == chat_id).all()
-
-    out = []
-    for m in msgs:
-        # Convert year in text
-        message_year = get_year_in_local_language(m.created_at.year, lang)
-
-        out.append({
-            "id": m.id,
-            "sender": "me" if m.sender_id == me_id else "other",
-            "text": m.text,
-            "created_at": m.created_at.isoformat(),
-            "message_year": message_year,  # Add year display by language
-        })
-
-    return out
+    except Exception:
+        pass
+    finally:
+        await hub.disconnect(conn)
@@ -0,0 +1,40 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, WebSocket, status
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from .. import database, events
+from ..realtime import hub
+
+router = APIRouter(tags=["Events"])
+
+
+# Browsers cannot set headers on a WebSocket, so the access token comes in the query string.
+@router.websocket("/ws/events")
+async def event_stream(
+    websocket: WebSocket,
+    token: str = Query(...),
+    last_event_id: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(database.get_db),
+):
+    principal = await run_in_threadpool(events.authenticate, db, token)
+    if principal is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    # Register before reading the backlog so nothing committed in between is lost;
+    # live events queue up until the replay has been sent.
+    conn = await hub.connect(principal.uid, websocket, start=False)
+    try:
+        backlog, replayed = await run_in_threadpool(events.resume, db, principal, last_event_id)
+        for data in backlog:
+            await websocket.send_json(data)
+        conn.skip_ids = replayed
+        hub.start_sender(conn)
+        while True:
+            await websocket.receive_text()
+    except Exception:
+        pass
+    finally:
+        await hub.disconnect(conn)
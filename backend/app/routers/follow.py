@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from ..database import get_db
-from .. import models , oauth2
-from ..oauth2 import get_current_user
+from .. import models , oauth2, timeline, inbox, identity
+from ..oauth2 import get_current_principal
 from .notification import create_notification_template
 
 router = APIRouter(prefix="/follow", tags=["follow"])
@@ -17,7 +17,7 @@ router = APIRouter(prefix="/follow", tags=["follow"])
 def follow_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: identity.Principal = Depends(get_current_principal),
 ):
     # Do not follow yourself
     if user_id == current_user.uid:
@@ -94,13 +94,8 @@ def follow_user(
         following_id=user_id,
     )
     db.add(new_follow)
-
-    noti_payload = {
-        "title": "Follow",
-        "receiver_id": user_id,
-        "target_role": "user",
-        "message": f"{current_user.name} started following you"
-    }
+    timeline.backfill_follow(db, current_user.uid, user_id)
+    inbox.open_chat_if_mutual(db, current_user.uid, user_id)
 
     try:
         create_notification_template(
@@ -131,7 +126,7 @@ def follow_user(
 def unfollow_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: identity.Principal = Depends(get_current_principal),
 ):
     follow = (
         db.query(models.Follow)
@@ -142,6 +137,7 @@ def unfollow_user(
         raise HTTPException(status_code=404, detail="You are not following this user")
 
     db.delete(follow)
+    timeline.remove_follow(db, current_user.uid, user_id)
 
     noti = (
         db.query(models.Notification)
@@ -166,7 +162,7 @@ def unfollow_user(
 @router.get("/following")
 def get_following(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: identity.Principal = Depends(get_current_principal),
 ):
     following = (
         db.query(models.User)
@@ -192,7 +188,7 @@ def get_following(
 @router.get("/followers")
 def get_followers(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: identity.Principal = Depends(get_current_principal),
 ):
     followers = (
         db.query(models.User)
@@ -218,7 +214,7 @@ def get_followers(
 @router.get("/requests")
 def get_follow_requests(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: identity.Principal = Depends(get_current_principal),
 ):
     reqs = (
         db.query(models.FollowRequest, models.User)
@@ -250,7 +246,7 @@ def get_follow_requests(
 def approve_follow_request(
     request_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
     # Find a request
     follow_req = db.query(models.FollowRequest).filter(
@@ -268,6 +264,8 @@ def approve_follow_request(
     )
 
     db.add(new_follow)
+    timeline.backfill_follow(db, follow_req.requester_id, current_user.uid)
+    inbox.open_chat_if_mutual(db, follow_req.requester_id, current_user.uid)
 
     # Update request status
     follow_req.status = "approved"
@@ -283,7 +281,7 @@ def approve_follow_request(
 def reject_follow_request(
     request_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
     follow_req = db.query(models.FollowRequest).filter(
         models.FollowRequest.id == request_id,
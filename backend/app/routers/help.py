@@ -1,10 +1,9 @@
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
 from sqlalchemy.orm import Session
-from .. import models, schemas
-from ..config import UPLOAD_ROOT, BACKEND_URL
+from .. import models, schemas, media, identity
+from ..config import BACKEND_URL
 from ..database import get_db
-from ..oauth2 import get_current_user
-import os
+from ..oauth2 import get_current_principal
 
 router = APIRouter(prefix="/help_reports", tags=["Help Reports"])
 
@@ -13,29 +12,21 @@ router = APIRouter(prefix="/help_reports", tags=["Help Reports"])
 # 0. USER — CREATE HELP REPORT
 # =====================================================================
 @router.post("/create", response_model=schemas.HelpReportResponse)
-async def create_help_report(
+def create_help_report(
     message: str = Form(...),
     file: UploadFile | None = File(None),
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: identity.Principal = Depends(get_current_principal)
 ):
     file_path = None
 
     # Save file if uploaded
     if file:
-        save_root = UPLOAD_ROOT                    # static mount root
-        save_dir = f"{save_root}/help"           # folder inside uploads/help
-        os.makedirs(save_dir, exist_ok=True)
-
-        cleaned_name = file.filename.replace(" ", "_")
-        full_path = os.path.join(save_dir, cleaned_name)
-
-        # save file to disk
-        with open(full_path, "wb") as f:
-            f.write(await file.read())
+        # save file into the media store (uploads/blobs/...)
+        stored = media.store_upload(db, file)
 
         # store only relative path (match StaticFiles)
-        file_path = f"help/{cleaned_name}"
+        file_path = stored.path
 
     # Save report
     report = models.HelpReport(
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+from .. import database, oauth2
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["Internal"],
+    dependencies=[Depends(oauth2.get_admin_user)],
+)
+
+
+@router.get("/db-pool")
+def get_db_pool_status():
+    return database.pool_status()
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
-from .. import models, schemas, oauth2
+from .. import models, schemas, oauth2, media, identity
 from ..database import get_db
 
 router = APIRouter(
@@ -11,7 +11,7 @@ router = APIRouter(
 
 
 # helper: check admin
-def require_admin(current_user: models.User = Depends(oauth2.get_current_user)):
+def require_admin(current_user: identity.Principal = Depends(oauth2.get_current_principal)):
     if not getattr(current_user, "is_admin", False):
         # แก้ตาม field จริงใน User model ถ้าใช้ชื่ออื่น เช่น role == "admin"
         raise HTTPException(
@@ -101,6 +101,7 @@ def delete_news(
     news = db.query(models.News).filter(models.News.id == news_id).first()
     if not news:
         raise HTTPException(status_code=404, detail="News not found")
+    media.release(db, [news.image_url])
     db.delete(news)
     db.commit()
     return
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends
 from sqlalchemy.orm import Session
-import os, uuid
-from app import models
+import os
+from app import models, media, config
 from app.database import get_db
 
 router = APIRouter()
@@ -12,7 +12,7 @@ os.makedirs(NEWS_UPLOAD_DIR, exist_ok=True)
 
 
 @router.post("/news/{news_id}/upload-image")
-async def upload_news_image(
+def upload_news_image(
     news_id: int,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
@@ -21,21 +21,13 @@ async def upload_news_image(
     if not news:
         raise HTTPException(status_code=404, detail="News not found")
 
-    # Folder of each news id => uploads/news/<id>/
-    upload_dir = os.path.join(NEWS_UPLOAD_DIR, str(news_id))
-    os.makedirs(upload_dir, exist_ok=True)
-
-    file_ext = file.filename.split(".")[-1]
-    filename = f"{uuid.uuid4()}.{file_ext}"
-    file_path = os.path.join(upload_dir, filename)
-
-    # Write files to disk
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+    # Write the file into the media store
+    stored = media.store_upload(db, file, max_bytes=config.UPLOAD_MAX_IMAGE_BYTES)
 
     # The path that the frontend uses to call
-    rel_path = f"/uploads/news/{news_id}/{filename}"
+    rel_path = media.url_for(stored.path)
 
+    media.release(db, [news.image_url])
     news.image_url = rel_path
     db.commit()
     db.refresh(news)
@@ -1,10 +1,11 @@
-from fastapi import status, HTTPException, Depends, APIRouter, UploadFile, File
+from fastapi import status, HTTPException, Depends, APIRouter, Response, UploadFile, File
 from datetime import timedelta
 from sqlalchemy import func, distinct, desc, or_, and_
 from sqlalchemy.orm import Session
-from .. import models, schemas, utils, oauth2
-from ..database import get_db
-from typing import List
+from .. import models, schemas, utils, oauth2, identity, notifications, badges
+from ..database import get_db, get_read_db, run_db
+from ..feed import NEXT_CURSOR_HEADER
+from typing import List, Optional
 import datetime, shutil, os
 from ..models import User, Post, Report
 from ..schemas import AdminUserDetailResponse
@@ -22,6 +23,8 @@ def create_notification_template(
     current_user: models.User,
     payload_data: dict 
 ):
+    # current_user is the sender. The report titles use its name; every other
+    # title only needs uid, so an identity.Principal will do.
     data = payload_data.copy() 
 
     if data["title"] == "ReportUser" and data.get("receiver_id"):
@@ -88,125 +91,76 @@ def get_all_notifications(db: Session = Depends(get_db)):
 
 
 @router.get("/admin", response_model=List[schemas.NotificationResponse])
-def get_admin_notifications(db: Session = Depends(get_db)):
-    notifications = db.query(models.Notification).filter(
-        models.Notification.target_role == "admin"
-    ).order_by(models.Notification.created_at.desc()).all()
-
-    result = []
-    for noti in notifications:
-        sender = db.query(models.User).filter(models.User.uid == noti.sender_id).first()
-
-        result.append(
-            schemas.NotificationResponse.from_orm(noti).copy(update={
-                "is_read": False,  # Admin view doesn't track read status per user
-                "sender_username": sender.username if sender else None,
-                "sender_avatar": sender.profile_image if sender else None
-            })
-        )
-    return result
+async def get_admin_notifications(
+    response: Response,
+    page: notifications.NotificationPage = Depends(notifications.get_notification_page),
+    db = Depends(get_read_db),
+):
+    def load(db: Session):
+        # Admin view doesn't track read status per user
+        criteria = models.Notification.target_role == "admin"
+        return notifications.load_page(db, criteria, page, response)
+
+    return await run_db(db, load)
 
 
 @router.get("/user/{uid}", response_model=List[schemas.NotificationResponse])
-def get_user_notifications(uid: int, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.uid == uid).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    target_role = "admin" if user.is_admin else "user"
-
-    read_ids = db.query(models.NotificationRead.notification_id).filter(
-        models.NotificationRead.user_id == uid
-    ).all()
-    read_ids_set = set(r[0] for r in read_ids)
-
-    if user.is_admin:
-        notifications = db.query(models.Notification).filter(
-            or_(
-                models.Notification.target_role == "admin",
-                models.Notification.receiver_id == uid,
-                models.Notification.title == "all"
-            )
-        ).order_by(models.Notification.created_at.desc()).all()
-    else:
-        notifications = db.query(models.Notification).filter(
-            or_(
-                and_(
-                    models.Notification.target_role == "user",
-                    models.Notification.receiver_id == uid
-                ),
-                models.Notification.title == "all"
-            )
-        ).order_by(models.Notification.created_at.desc()).all()
-
-    # annotate
-    result = []
-    for noti in notifications:
-        sender = db.query(models.User).filter(models.User.uid == noti.sender_id).first()
-        result.append(
-            schemas.NotificationResponse.from_orm(noti).copy(update={
-                "is_read": noti.id in read_ids_set,
-                "sender_username": sender.username if sender else None,
-                "sender_avatar": sender.profile_image if sender else None,
-            })
-        )
-    return result
+async def get_user_notifications(
+    uid: int,
+    response: Response,
+    page: notifications.NotificationPage = Depends(notifications.get_notification_page),
+    db = Depends(get_read_db),
+):
+    def load(db: Session):
+        is_admin = db.query(models.User.is_admin).filter(models.User.uid == uid).scalar()
+        if is_admin is None:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        criteria = notifications.audience_filter(uid, is_admin)
+        return notifications.load_page(db, criteria, page, response, reader_uid=uid)
+
+    return await run_db(db, load)
 
 
 @router.get("/me", response_model=List[schemas.NotificationResponse])
-def get_my_notifications(
-    skip: int = 0,
-    limit: int = 20,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+async def get_my_notifications(
+    response: Response,
+    page: notifications.NotificationPage = Depends(notifications.get_notification_page),
+    db = Depends(get_read_db),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
 ):
-    # Determine target role based on is_admin
-    target_role = "admin" if current_user.is_admin else "user"
-
-    # Get read notification IDs
-    read_ids = db.query(models.NotificationRead.notification_id).filter(
-        models.NotificationRead.user_id == current_user.uid
-    ).all()
-    read_ids_set = set(r[0] for r in read_ids)
-
-    # Get relevant notifications
-    if target_role == "admin":
-        notifications = db.query(models.Notification).filter(
-            (models.Notification.target_role == target_role) |
-            (models.Notification.receiver_id == current_user.uid) |
-            (models.Notification.title == "All")
-        ).order_by(models.Notification.created_at.desc()).all()
-    else:
-        notifications = db.query(models.Notification).filter(
-        or_(
-            and_(
-                models.Notification.target_role == target_role,
-                models.Notification.receiver_id == current_user.uid
-            ),
-            models.Notification.title == "All"
-        )
-    ).order_by(models.Notification.created_at.desc()).all()
-
-    # Annotate each with is_read
-    result = []
-    for noti in notifications:
-        sender = db.query(models.User).filter(models.User.uid == noti.sender_id).first()
-
-        result.append(
-            schemas.NotificationResponse.from_orm(noti).copy(update={
-                "is_read": noti.id in read_ids_set,
-                "sender_username": sender.username if sender else None,
-                "sender_avatar": sender.profile_image if sender else None
-            })
-        )
-    return result
+    def load(db: Session):
+        criteria = notifications.audience_filter(current_user.uid, current_user.is_admin)
+        return notifications.load_page(db, criteria, page, response, reader_uid=current_user.uid)
+
+    return await run_db(db, load)
+
+
+# List page and unread count in one round trip
+@router.get("/me/summary", response_model=schemas.NotificationSummaryResponse)
+async def get_my_notification_summary(
+    response: Response,
+    page: notifications.NotificationPage = Depends(notifications.get_notification_page),
+    db = Depends(get_read_db),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
+):
+    def load(db: Session):
+        criteria = notifications.audience_filter(current_user.uid, current_user.is_admin)
+        items = notifications.load_page(db, criteria, page, response, reader_uid=current_user.uid)
+        return {
+            "items": items,
+            "unread_count": badges.get_badges(db, current_user.uid, current_user.is_admin)["unread_notifications"],
+            "next_cursor": response.headers.get(NEXT_CURSOR_HEADER),
+        }
+
+    return await run_db(db, load)
 
 
 @router.post("/{id}/read", status_code=204)
 def mark_notification_as_read(
     id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
     exists = db.query(models.NotificationRead).filter_by(
         notification_id=id,
@@ -226,21 +180,14 @@ def mark_notification_as_read(
 
 
 @router.get("/me/unread/count")
-def get_unread_count(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+async def get_unread_count(
+    db = Depends(get_read_db),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
 ):
-    read_ids = db.query(models.NotificationRead.notification_id).filter(
-        models.NotificationRead.user_id == current_user.uid
-    ).subquery()
-
-    count = db.query(func.count(models.Notification.id)).filter(
-        (models.Notification.target_role == current_user.role) |
-        (models.Notification.receiver_id == current_user.uid),
-        ~models.Notification.id.in_(read_ids)
-    ).scalar()
+    def load(db: Session):
+        return {"unread_count": badges.get_badges(db, current_user.uid, current_user.is_admin)["unread_notifications"]}
 
-    return {"unread_count": count}
+    return await run_db(db, load)
 
 
 @router.get("/{id}", response_model=schemas.NotificationResponse)
@@ -252,29 +199,27 @@ def get_notification_by_id(id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/system/{uid}", response_model=List[schemas.NotificationResponse])
-def get_system_notifications(uid: int, db: Session = Depends(get_db)):
-    # User exists?
-    user = db.query(models.User).filter(models.User.uid == uid).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # RULE: Only take notifications from the system.
-    system_titles = ["HelpReport", "HelpReportReply", "Help Update", "Report Update"]
-
-    notifications = db.query(models.Notification).filter(
-        models.Notification.receiver_id == uid,
-        models.Notification.title.in_(system_titles)
-    ).order_by(models.Notification.created_at.desc()).all()
-
-    # Annotate
-    result = []
-    for noti in notifications:
-        sender = db.query(models.User).filter(models.User.uid == noti.sender_id).first()
-        result.append(
-            schemas.NotificationResponse.from_orm(noti).copy(update={
-                "is_read": False,  # System Tab does not track read
-                "sender_username": sender.username if sender else None,
-                "sender_avatar": sender.profile_image if sender else None,
-            })
+async def get_system_notifications(
+    uid: int,
+    response: Response,
+    title: Optional[str] = None,
+    page: notifications.NotificationPage = Depends(notifications.get_notification_page),
+    db = Depends(get_read_db),
+):
+    def load(db: Session):
+        # User exists?
+        if db.query(models.User.uid).filter(models.User.uid == uid).first() is None:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        # RULE: Only take notifications from the system. System Tab does not track read.
+        # `title` narrows it to one kind (e.g. HelpReportReply), filtered before paging.
+        titles = notifications.SYSTEM_TITLES
+        if title is not None:
+            titles = [title] if title in titles else []
+        criteria = and_(
+            models.Notification.receiver_id == uid,
+            models.Notification.title.in_(titles),
         )
-    return result
+        return notifications.load_page(db, criteria, page, response)
+
+    return await run_db(db, load)
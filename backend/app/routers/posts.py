@@ -1,19 +1,10 @@
-from fastapi import APIRouter, Depends, Form, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, Form, HTTPException, Response, status, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from sqlalchemy.orm import joinedload
 import os
-import shutil
 from .notification import create_notification_template
-from .. import models, schemas, database, oauth2, utils
-
-
-def is_blocked(db, viewer_uid, target_uid):
-    block = db.query(models.Block).filter_by(
-        blocker_id=viewer_uid,
-        blocked_id=target_uid
-    ).first()
-    return block is not None
+from .. import models, schemas, database, oauth2, utils, feed, counters, timeline, media, identity, hashtags
 
 
 router = APIRouter(
@@ -37,7 +28,7 @@ def create_post(
     tags: Optional[str] = Form(None),
     files: List[UploadFile] = File([]),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(utils.check_ban_status)
+    current_user: identity.Principal = Depends(utils.check_ban_status)
 ):
     forum = db.query(models.Forum).filter(models.Forum.fid == forum_id).first()
     if not forum:
@@ -51,6 +42,7 @@ def create_post(
     db.add(new_post)
     db.commit()
     db.refresh(new_post)
+    timeline.fan_out_post(db, new_post)
 
     if tags:
         try:
@@ -63,29 +55,14 @@ def create_post(
 
     # Save the attachment
     for upload_file in files:
-        filename = f"{new_post.pid}_{upload_file.filename}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
-        
-        mime_type = upload_file.content_type or "application/octet-stream"
-
-        ext = os.path.splitext(upload_file.filename)[1].lower()
-        if ext in [".jpg", ".jpeg", ".png", ".gif", ".webp"]:
-            file_type = "image"
-        elif ext in [".mp4", ".mov", ".avi", ".mkv"]:
-            file_type = "video"
-        elif ext in [".pdf"]:
-            file_type = "pdf"
-        else:
-            file_type = "file"
+        stored = media.store_upload(db, upload_file)
+        file_type = stored.kind
 
         # Record without referencing columns that may not yet exist in the DB.
         try:
             db.add(models.PostImage(
                 post_id=new_post.pid,
-                path=f"/{UPLOAD_DIR}/{filename}",
+                path=media.url_for(stored.path),
                 caption=None,
                 file_type=file_type,   # Available if available in the model
             ))
@@ -93,7 +70,7 @@ def create_post(
             # If the model does not have a file_type column, fallback is used.
             db.add(models.PostImage(
                 post_id=new_post.pid,
-                path=f"/{UPLOAD_DIR}/{filename}",
+                path=media.url_for(stored.path),
                 caption=None
             ))
     db.commit()
@@ -135,7 +112,7 @@ def upload_post_files(
     post_id: int,
     files: List[UploadFile] = File(...),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
     # Validate post ownership
     post = db.query(models.Post).filter(models.Post.pid == post_id).first()
@@ -144,47 +121,29 @@ def upload_post_files(
     if post.user_id != current_user.uid:
         raise HTTPException(status_code=403, detail="Not authorized to upload files to this post")
 
-    # Prepare upload directory
-    UPLOAD_DIR = "uploads/post"
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-
     saved_files = []
 
     for upload_file in files:
-        # Sanitize filename
-        original_name = os.path.basename(upload_file.filename)
-        filename = f"{post_id}_{original_name}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-
-        # Save file to disk
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
-
-        mime_type = upload_file.content_type or "application/octet-stream"
+        # Save file into the media store
+        stored = media.store_upload(db, upload_file)
 
         # Create DB record
-        ext = os.path.splitext(upload_file.filename)[1].lower()
-        if ext in [".jpg", ".jpeg", ".png", ".gif", ".webp"]:
-            file_type = "image"
-        elif ext in [".mp4", ".mov", ".avi", ".mkv"]:
-            file_type = "video"
-        elif ext in [".pdf"]:
-            file_type = "pdf"
-        else:
-            file_type = "file"
+        file_type = stored.kind
         try:
             image_record = models.PostImage(
                 post_id=post_id,
-                path=f"/{UPLOAD_DIR}/{filename}",
+                path=media.url_for(stored.path),
                 caption=None,
                 file_type=file_type,
             )
         except TypeError:
             image_record = models.PostImage(
                 post_id=post_id,
-                path=f"/{UPLOAD_DIR}/{filename}",
+                path=media.url_for(stored.path),
                 caption=None
             )
+        db.add(image_record)
+        saved_files.append(image_record)
 
     db.commit()
     db.refresh(post)
@@ -196,308 +155,168 @@ def upload_post_files(
 
 
 @router.get("/me", response_model=List[schemas.PostResponse])
-def get_my_posts(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+async def get_my_posts(
+    response: Response,
+    page: feed.FeedPage = Depends(feed.get_feed_page),
+    db = Depends(database.get_read_db),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
 ):
-    posts = db.query(models.Post).filter(models.Post.user_id == current_user.uid).all()
-    response = []
-
-    for post in posts:
-        like_count = db.query(models.Like).filter(models.Like.post_id == post.pid).count()
-        response.append(
-            schemas.PostResponse(
-                pid=post.pid,
-                post_content=post.post_content,
-                forum_id=post.forum_id,
-                user_id=post.user_id,
-                username=post.user.username,
-                name=post.user.name,
-                profile_image=post.user.profile_image,
-                like_count=like_count,
-                tags=post.tags,
-                images=post.images,
-                comments=post.comments,
-                created_at=post.created_at
-            )
+    def load(db: Session):
+        query = (
+            db.query(models.Post)
+            .options(*feed.POST_FEED_OPTIONS)
+            .filter(models.Post.user_id == current_user.uid)
         )
+        posts = feed.paginate_posts(query, page, response)
+        return feed.build_post_responses(db, posts, viewer_uid=current_user.uid)
 
-    return response
+    return await database.run_db(db, load)
 
 
 @router.get("/all", response_model=List[schemas.PostResponse])
-def get_all_posts(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+async def get_all_posts(
+    response: Response,
+    page: feed.FeedPage = Depends(feed.get_feed_page),
+    db = Depends(database.get_read_db),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
 ):
-    posts = db.query(models.Post).order_by(models.Post.pid.desc()).all()
-    
-    response = []
-
-    for post in posts:
-
-        if is_blocked(db, current_user.uid, post.user_id):
-            continue
-
-        like_count = db.query(models.Like).filter(models.Like.post_id == post.pid).count()
-        is_liked_by_me = db.query(models.Like).filter_by(post_id=post.pid, user_id=current_user.uid).first() is not None
-
-        enriched_comments = []
-        for c in post.comments:
-            user = db.query(models.User).filter(models.User.uid == c.user_id).first()
-
-            files = db.query(models.CommentFile).filter(models.CommentFile.comment_id == c.cid).all()
-            files_response = [
-                schemas.CommentFileResponse(
-                    id=f.id,
-                    path=f.path,
-                    file_type=f.file_type
-                )
-                for f in files
-            ]
-
-            enriched_comments.append(
-                schemas.CommentResponse(
-                    cid=c.cid,
-                    content=c.content,
-                    user_id=c.user_id,
-                    post_id=c.post_id,
-                    username=user.username if user else None,
-                    profile_image=user.profile_image if user else None,
-                    created_at=c.created_at,
-                    files=files_response   
-                )
-            )
-
-        response.append(
-            schemas.PostResponse(
-                pid=post.pid,
-                post_content=post.post_content,
-                forum_id=post.forum_id,
-                user_id=post.user_id,
-                username=post.user.username,
-                name=post.user.name or post.user.username,
-                profile_image=post.user.profile_image,
-                liked=is_liked_by_me,
-                like_count=like_count,
-                tags=post.tags,
-                images=post.images,
-                comments=enriched_comments,
-                created_at=post.created_at
-            )
-        )
+    def load(db: Session):
+        query = db.query(models.Post).options(*feed.POST_FEED_OPTIONS)
+        query = feed.visible_to(query, current_user.uid)
+        posts = feed.paginate_posts(query, page, response)
+        return feed.build_post_responses(db, posts, viewer_uid=current_user.uid)
 
-    return response
+    return await database.run_db(db, load)
 
 
 @router.get("/", response_model=List[schemas.PostResponse])
-def get_posts(
+async def get_posts(
+    response: Response,
     user_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    page: feed.FeedPage = Depends(feed.get_feed_page),
+    db = Depends(database.get_read_db),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
 ):
-    # Start main query
-    query = db.query(models.Post)
-
-    # If user_id exists → only pull that person's posts
-    if user_id is not None:
-        query = query.filter(models.Post.user_id == user_id)
-
-    # Sort posts from newest to oldest
-    posts = (
-        query.options(
-            joinedload(models.Post.images),
-            joinedload(models.Post.tags),
-            joinedload(models.Post.comments),
-            joinedload(models.Post.user)
-        )
-        .order_by(models.Post.created_at.desc())
-        .all()
-    )
+    def load(db: Session):
+        # Start main query
+        query = db.query(models.Post).options(*feed.POST_FEED_OPTIONS)
 
-    response = []
-
-    for post in posts:
-
-        if is_blocked(db, current_user.uid, post.user_id):
-            continue
-
-        # Count the number of likes
-        like_count = db.query(models.Like).filter(models.Like.post_id == post.pid).count()
-
-        # Enrich comment data
-        enriched_comments = []
-        for c in post.comments:
-            user = db.query(models.User).filter(models.User.uid == c.user_id).first()
-
-            # Pull comment attachments
-            files = db.query(models.CommentFile).filter(models.CommentFile.comment_id == c.cid).all()
-            files_response = [
-                schemas.CommentFileResponse(
-                    id=f.id,
-                    path=f.path,
-                    file_type=f.file_type
-                )
-                for f in files
-            ]
-
-            enriched_comments.append(
-                schemas.CommentResponse(
-                    cid=c.cid,
-                    content=c.content,
-                    user_id=c.user_id,
-                    post_id=c.post_id,
-                    username=user.username if user else None,
-                    profile_image=user.profile_image if user else None,
-                    created_at=c.created_at,
-                    files=files_response  
-                )
-            )
+        # If user_id exists → only pull that person's posts
+        if user_id is not None:
+            query = query.filter(models.Post.user_id == user_id)
 
-        # Add information to each post in response.
-        response.append(
-            schemas.PostResponse(
-                pid=post.pid,
-                post_content=post.post_content,
-                forum_id=post.forum_id,
-                user_id=post.user_id,
-                username=post.user.username if post.user else "Unknown",
-                name=(post.user.name or post.user.username) if post.user else "Unknown",
-                profile_image=post.user.profile_image if post.user else None,
-                like_count=like_count,
-                tags=post.tags,
-                images=post.images,
-                comments=enriched_comments,
-                created_at=post.created_at
-            )
-        )
+        query = feed.visible_to(query, current_user.uid)
+
+        # Newest first, one page at a time
+        posts = feed.paginate_posts(query, page, response)
+        return feed.build_post_responses(db, posts, viewer_uid=current_user.uid)
 
-    return response
+    return await database.run_db(db, load)
 
 
 @router.get("/forum/{forum_id}", response_model=List[schemas.PostResponse])
-def get_posts_by_forum(
+async def get_posts_by_forum(
     forum_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    response: Response,
+    page: feed.FeedPage = Depends(feed.get_feed_page),
+    db = Depends(database.get_read_db),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
 ):
-    posts = db.query(models.Post).filter(models.Post.forum_id == forum_id).order_by(models.Post.pid.desc()).all()
-    response = []
-
-    for post in posts:
-
-        if is_blocked(db, current_user.uid, post.user_id):
-            continue
-        
-        like_count = db.query(models.Like).filter(models.Like.post_id == post.pid).count()
-        response.append(
-            schemas.PostResponse(
-                pid=post.pid,
-                post_content=post.post_content,
-                forum_id=post.forum_id,
-                user_id=post.user_id,
-                username=post.user.username,
-                name=post.user.name or post.user.username,
-                profile_image=post.user.profile_image,
-                like_count=like_count,
-                tags=post.tags,
-                images=post.images,
-                comments=post.comments,
-                created_at=post.created_at
-            )
+    def load(db: Session):
+        query = (
+            db.query(models.Post)
+            .options(*feed.POST_FEED_OPTIONS)
+            .filter(models.Post.forum_id == forum_id)
         )
-    return response
+        query = feed.visible_to(query, current_user.uid)
+        posts = feed.paginate_posts(query, page, response)
+        return feed.build_post_responses(db, posts, viewer_uid=current_user.uid)
+
+    return await database.run_db(db, load)
 
 
 @router.get("/following", response_model=List[schemas.PostResponse])
-def get_following_posts(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+async def get_following_posts(
+    response: Response,
+    page: feed.FeedPage = Depends(feed.get_feed_page),
+    db = Depends(database.get_read_db),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
 ):
+    def load(db: Session):
+        query = db.query(models.Post).options(*feed.POST_FEED_OPTIONS)
 
-    following_ids = (
-        db.query(models.Follow.following_id)
-        .filter(models.Follow.follower_id == current_user.uid)
-        .subquery()
-    )
-
-    # Including your own posts.
-    posts = (
-        db.query(models.Post)
-        .filter(
-            (models.Post.user_id.in_(following_ids)) |
-            (models.Post.user_id == current_user.uid)
-        )
-        .order_by(models.Post.created_at.desc())
-        .all()
-    )
+        if timeline.is_enabled():
+            # Precomputed timeline (already includes your own posts)
+            query = query.filter(timeline.following_feed_filter(current_user.uid))
+        else:
+            following_ids = (
+                db.query(models.Follow.following_id)
+                .filter(models.Follow.follower_id == current_user.uid)
+                .subquery()
+            )
 
-    response = []
-    for post in posts:
-        like_count = db.query(models.Like).filter(models.Like.post_id == post.pid).count()
-
-        response.append(
-            schemas.PostResponse(
-                pid=post.pid,
-                post_content=post.post_content,
-                forum_id=post.forum_id,
-                user_id=post.user_id,
-                username=post.user.username,
-                name=post.user.name or post.user.username,
-                profile_image=post.user.profile_image,
-                like_count=like_count,
-                liked=False,
-                tags=post.tags,
-                images=post.images,
-                comments=post.comments,
-                created_at=post.created_at
+            # Including your own posts.
+            query = query.filter(
+                (models.Post.user_id.in_(following_ids)) |
+                (models.Post.user_id == current_user.uid)
             )
-        )
 
-    return response
+        query = feed.visible_to(query, current_user.uid)
+        posts = feed.paginate_posts(query, page, response)
+        return feed.build_post_responses(db, posts, viewer_uid=current_user.uid)
+
+    return await database.run_db(db, load)
+
+
+@router.get("/hashtags", response_model=List[schemas.HashtagCount])
+async def get_hashtags(
+    response: Response,
+    page: hashtags.HashtagPage = Depends(hashtags.get_hashtag_page),
+    db = Depends(database.get_read_db),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
+):
+    return await database.run_db(db, lambda s: hashtags.tag_counts(s, page, current_user.uid, response))
+
+
+@router.get("/hashtag/{tag}", response_model=List[schemas.PostResponse])
+async def get_posts_by_hashtag(
+    tag: str,
+    response: Response,
+    page: feed.FeedPage = Depends(feed.get_feed_page),
+    db = Depends(database.get_read_db),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
+):
+    def load(db: Session):
+        query = db.query(models.Post).options(*feed.POST_FEED_OPTIONS)
+        query = hashtags.tagged_posts(query, tag)
+        query = feed.visible_to(query, current_user.uid)
+        posts = feed.paginate_posts(query, page, response)
+        return feed.build_post_responses(db, posts, viewer_uid=current_user.uid)
+
+    return await database.run_db(db, load)
 
 
 @router.get("/{post_id}", response_model=schemas.PostResponse)
-def get_post(
+async def get_post(
     post_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db = Depends(database.get_read_db),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
 ):
-    post = db.query(models.Post).filter(models.Post.pid == post_id).first()
+    def load(db: Session):
+        post = (
+            db.query(models.Post)
+            .options(*feed.POST_FEED_OPTIONS)
+            .filter(models.Post.pid == post_id, feed.visibility_filter(current_user.uid))
+            .first()
+        )
+        if post is None:
+            return None
+        return feed.build_post_response(db, post, viewer_uid=current_user.uid)
 
+    post = await database.run_db(db, load)
     if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
-
-    like_count = db.query(models.Like).filter(models.Like.post_id == post_id).count()
-
-    # Serialize comments
-    serialized_comments = [
-    schemas.CommentResponse(
-        cid=comment.cid,
-        user_id=comment.user_id,
-        username=comment.user.username if comment.user else "Unknown",
-        name=(comment.user.name or comment.user.username) if comment.user else "Unknown",
-        profile_image=comment.user.profile_image if comment.user else None,
-        content=comment.content,
-        created_at=comment.created_at
-    )
-    for comment in post.comments
-]
-
-    return schemas.PostResponse(
-        pid=post.pid,
-        post_content=post.post_content,
-        forum_id=post.forum_id,
-        user_id=post.user_id,
-        username=post.user.username,
-        name=post.user.name or post.user.username,
-        profile_image=post.user.profile_image,
-        like_count=like_count,
-        tags=post.tags,
-        images=post.images,
-        comments=serialized_comments,
-        created_at=post.created_at
-    )
+    return post
 
 
 @router.put("/{post_id}", response_model=schemas.PostResponse)
@@ -505,7 +324,7 @@ def update_post(
     post_id: int,
     updated_post: schemas.PostUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(utils.check_ban_status)
+    current_user: identity.Principal = Depends(utils.check_ban_status)
 ):
     post = db.query(models.Post).filter(models.Post.pid == post_id).first()
 
@@ -525,58 +344,14 @@ def update_post(
     db.commit()
     db.refresh(post)
 
-    like_count = db.query(models.Like).filter(models.Like.post_id == post.pid).count()
-
-    # Pull comments with user and attachments
-    enriched_comments = []
-    for c in post.comments:
-        user = db.query(models.User).filter(models.User.uid == c.user_id).first()
-        files = db.query(models.CommentFile).filter(models.CommentFile.comment_id == c.cid).all()
-
-        files_response = [
-            schemas.CommentFileResponse(
-                id=f.id,
-                path=f.path,
-                file_type=f.file_type
-            )
-            for f in files
-        ]
-
-        enriched_comments.append(
-            schemas.CommentResponse(
-                cid=c.cid,
-                content=c.content,
-                user_id=c.user_id,
-                post_id=c.post_id,
-                username=user.username if user else None,
-                name=(user.name or user.username) if user else "Unknown",
-                profile_image=user.profile_image if user else None,
-                created_at=c.created_at,
-                files=files_response
-            )
-        )
-
-    return schemas.PostResponse(
-        pid=post.pid,
-        post_content=post.post_content,
-        forum_id=post.forum_id,
-        user_id=post.user_id,
-        username=post.user.username,
-        name=post.user.name or post.user.username,
-        profile_image=post.user.profile_image,
-        like_count=like_count,
-        tags=post.tags,
-        images=post.images,
-        comments=enriched_comments, 
-        created_at=post.created_at
-    )
+    return feed.build_post_response(db, post, viewer_uid=current_user.uid)
 
 
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_post(
     post_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
     post_query = db.query(models.Post).filter(models.Post.pid == post_id)
     post = post_query.first()
@@ -585,6 +360,7 @@ def delete_post(
     if post.user_id != current_user.uid:
         raise HTTPException(status_code=403, detail="Not authorized to delete this post")
 
+    media.release(db, media.post_media_paths(db, post_id))
     db.query(models.PostImage).filter(models.PostImage.post_id == post_id).delete()
 
     post.tags = []
@@ -595,12 +371,12 @@ def delete_post(
 
 
 @router.post("/{post_id}/comments", response_model=schemas.CommentResponse)
-async def create_comment(
+def create_comment(
     post_id: int,
     content: str = Form(""), 
     files: List[UploadFile] = File(None),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(utils.check_ban_status)
+    current_user: identity.Principal = Depends(utils.check_ban_status)
 ):
     # Check if the post actually exists
     post = db.query(models.Post).filter(models.Post.pid == post_id).first()
@@ -615,6 +391,7 @@ async def create_comment(
         username=current_user.username
     )
     db.add(new_comment)
+    counters.bump_comment_count(db, post_id, 1)
     db.commit()
     db.refresh(new_comment)
 
@@ -622,27 +399,14 @@ async def create_comment(
     saved_files = []
     if files:
         for upload_file in files:
-            # Create a new file name to prevent duplicates.
-            filename = f"{new_comment.cid}_{upload_file.filename}"
-            file_path = os.path.join(COMMENT_UPLOAD_DIR, filename)
-
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(upload_file.file, buffer)
-
-            ext = os.path.splitext(upload_file.filename)[1].lower()
-            if ext in [".jpg", ".jpeg", ".png", ".gif", ".webp"]:
-                file_type = "image"
-            elif ext in [".mp4", ".mov", ".avi", ".mkv"]:
-                file_type = "video"
-            elif ext in [".pdf"]:
-                file_type = "pdf"
-            else:
-                file_type = "file"
+            # Identical files are stored once (see app.media).
+            stored = media.store_upload(db, upload_file)
+            file_type = stored.kind
 
             # Save to comment_files table (must be in models.py)
             file_record = models.CommentFile(
                 comment_id=new_comment.cid,
-                path=f"/{COMMENT_UPLOAD_DIR}/{filename}",
+                path=media.url_for(stored.path),
                 file_type=file_type
             )
             db.add(file_record)
@@ -661,19 +425,21 @@ async def create_comment(
             )
         )
 
+    # The principal has no display name or avatar; both go into the
+    # notification text and the response.
+    author = db.get(models.User, current_user.uid)
+
     if post.user_id != current_user.uid:
-        print(post.user_id, current_user.uid)
         noti_payload = {
             "title": "Comment",
             "receiver_id": post.user_id,
             "target_role": "user",
-            "message": f"{current_user.name} commented on your post ID {post_id}"
+            "message": f"{author.name} commented on your post ID {post_id}"
         }
-        print(noti_payload)
         try:
             create_notification_template(
                 db=db,
-                current_user=current_user,
+                current_user=author,
                 payload_data=noti_payload
             )
             db.commit()
@@ -686,9 +452,9 @@ async def create_comment(
         content=new_comment.content,
         user_id=new_comment.user_id,
         post_id=new_comment.post_id,
-        username=current_user.username,
-        name=current_user.name or current_user.username,
-        profile_image=current_user.profile_image,
+        username=author.username,
+        name=author.name or author.username,
+        profile_image=author.profile_image,
         created_at=new_comment.created_at,
         files=files_response
     )
@@ -703,50 +469,14 @@ def get_comments_for_post(
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    comments = (
-        db.query(models.Comment)
-        .filter(models.Comment.post_id == post_id)
-        .order_by(models.Comment.created_at.asc())
-        .all()
-    )
-
-    response = []
-    for c in comments:
-        user = db.query(models.User).filter(models.User.uid == c.user_id).first()
-
-        # Pull comment attachments (CommentFile)
-        files = db.query(models.CommentFile).filter(models.CommentFile.comment_id == c.cid).all()
-        files_response = [
-            schemas.CommentFileResponse(
-                id=f.id,
-                path=f.path,
-                file_type=f.file_type
-            ) for f in files
-        ]
-
-        # Return all data
-        response.append(
-            schemas.CommentResponse(
-                cid=c.cid,
-                content=c.content,
-                user_id=c.user_id,
-                post_id=c.post_id,
-                username=user.username if user else None,
-                name=(user.name or user.username) if user else "Unknown",
-                profile_image=user.profile_image if user else None,
-                created_at=c.created_at,
-                files=files_response
-            )
-        )
-
-    return response
+    return feed.fetch_comments(db, [post_id]).get(post_id, [])
 
 
 @router.post("/{post_id}/like")
 def toggle_like_post(
     post_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
     post = db.query(models.Post).filter(models.Post.pid == post_id).first()
     if not post:
@@ -756,6 +486,7 @@ def toggle_like_post(
 
     if like:
         db.delete(like)
+        counters.bump_like_count(db, post_id, -1)
         noti = db.query(models.Notification).filter_by(
             title="Like",
             sender_id=current_user.uid,
@@ -768,19 +499,22 @@ def toggle_like_post(
 
     new_like = models.Like(post_id=post_id, user_id=current_user.uid)
     db.add(new_like)
+    counters.bump_like_count(db, post_id, 1)
 
     if post.user_id != current_user.uid:
+        # Only the notification text needs the sender's name.
+        sender = db.get(models.User, current_user.uid)
         noti_payload = {
             "title": "Like",
             "receiver_id": post.user_id,
             "target_role": "user",
-            "message": f"{current_user.name} liked your post ID {post_id}"
+            "message": f"{sender.name} liked your post ID {post_id}"
         }
 
         try:
             create_notification_template(
                 db=db,
-                current_user=current_user,
+                current_user=sender,
                 payload_data=noti_payload
             )
         except Exception as e:
@@ -867,85 +601,35 @@ def report_comment(
 
   
 @router.get("/{id}/posts", response_model=List[schemas.PostResponse])
-def get_user_posts(
+async def get_user_posts(
     id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    response: Response,
+    page: feed.FeedPage = Depends(feed.get_feed_page),
+    db = Depends(database.get_read_db),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
 ):
-    user = db.query(models.User).filter(models.User.uid == id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # preload ความสัมพันธ์ทั้งหมด (เหมือน /posts)
-    posts = (
-        db.query(models.Post)
-        .options(
-            joinedload(models.Post.images),
-            joinedload(models.Post.tags),
-            joinedload(models.Post.comments),
-            joinedload(models.Post.user)
+    def load(db: Session):
+        if db.get(models.User, id) is None:
+            return None
+        query = (
+            db.query(models.Post)
+            .options(*feed.POST_FEED_OPTIONS)
+            .filter(models.Post.user_id == id)
         )
-        .filter(models.Post.user_id == id)
-        .order_by(models.Post.created_at.desc())
-        .all()
-    )
+        query = feed.visible_to(query, current_user.uid)
+        posts = feed.paginate_posts(query, page, response)
+        return feed.build_post_responses(db, posts, viewer_uid=current_user.uid)
 
-    response = []
-    for post in posts:
-        like_count = db.query(models.Like).filter(models.Like.post_id == post.pid).count()
-
-        # enrich comments พร้อม username/profile
-        enriched_comments = []
-        for c in post.comments:
-            user = db.query(models.User).filter(models.User.uid == c.user_id).first()
-
-            # ดึงไฟล์แนบของคอมเมนต์
-            files = db.query(models.CommentFile).filter(models.CommentFile.comment_id == c.cid).all()
-            files_response = [
-                schemas.CommentFileResponse(
-                    id=f.id,
-                    path=f.path,
-                    file_type=f.file_type
-                )
-                for f in files
-            ]
-
-            enriched_comments.append(
-                schemas.CommentResponse(
-                    cid=c.cid,
-                    content=c.content,
-                    user_id=c.user_id,
-                    post_id=c.post_id,
-                    username=user.username if user else None,
-                    profile_image=user.profile_image if user else None,
-                    created_at=c.created_at,
-                    files=files_response  
-                )
-            )
-
-        response.append(
-            schemas.PostResponse(
-                pid=post.pid,
-                post_content=post.post_content,
-                forum_id=post.forum_id,
-                user_id=post.user_id,
-                username=user.username,
-                profile_image=user.profile_image,
-                like_count=like_count,
-                tags=post.tags,
-                images=post.images,        
-                comments=enriched_comments,
-                created_at=post.created_at
-            )
-        )
-
-    return response
+    posts = await database.run_db(db, load)
+    if posts is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return posts
 
 
 @router.delete("/comments/{comment_id}", status_code=204)
 def delete_comment(
     comment_id: int,
-    current_user: models.User = Depends(oauth2.get_current_user),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal),
     db: Session = Depends(get_db)
 ):
     comment = db.query(models.Comment).filter(models.Comment.cid == comment_id).first()
@@ -961,6 +645,8 @@ def delete_comment(
     if noti:
         db.delete(noti)
 
+    media.release(db, [f.path for f in comment.files])
     db.delete(comment)
+    counters.bump_comment_count(db, comment.post_id, -1)
     db.commit()
     return {"detail": "Comment deleted"}
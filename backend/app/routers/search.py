@@ -0,0 +1,36 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.orm import Session
+
+from .. import database, identity, oauth2, schemas, search
+
+router = APIRouter(
+    prefix="/search",
+    tags=["Search"]
+)
+
+
+@router.get("/users", response_model=List[schemas.UserBriefResponse])
+async def search_users(
+    response: Response,
+    page: search.SearchPage = Depends(search.get_search_page),
+    db = Depends(database.get_read_db),
+):
+    def load(db: Session):
+        return search.search_users(db, page, response)
+
+    return await database.run_db(db, load)
+
+
+@router.get("/posts", response_model=List[schemas.PostResponse])
+async def search_posts(
+    response: Response,
+    page: search.SearchPage = Depends(search.get_search_page),
+    db = Depends(database.get_read_db),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
+):
+    def load(db: Session):
+        return search.search_posts(db, page, response, viewer_uid=current_user.uid)
+
+    return await database.run_db(db, load)
@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
-from .. import models
+from typing import List
+from .. import schemas, search
 from ..database import get_db
-from sqlalchemy import or_
 
 
 router = APIRouter(
@@ -11,25 +11,11 @@ router = APIRouter(
 )
 
 
-@router.get("/search")
-def search_users(q: str, db: Session = Depends(get_db)):
-    users = (
-        db.query(models.User)
-        .filter(
-            or_(
-                models.User.username.ilike(f"%{q}%"),
-                models.User.name.ilike(f"%{q}%")
-            )
-        )
-        .all()
-    )
-
-    return [
-        {
-            "uid": u.uid,
-            "username": u.username,
-            "name": u.name,
-            "profile_image": u.profile_image
-        }
-        for u in users
-    ]
+# Kept for the existing search box; same matching and ranking as /search/users.
+@router.get("/search", response_model=List[schemas.UserBriefResponse])
+def search_users(
+    response: Response,
+    page: search.SearchPage = Depends(search.get_search_page),
+    db: Session = Depends(get_db),
+):
+    return search.search_users(db, page, response)
@@ -1,9 +1,9 @@
 from fastapi import status, HTTPException, Depends, APIRouter, UploadFile, File
 from sqlalchemy.orm import Session
-from .. import models, schemas, utils, oauth2
+from .. import models, schemas, utils, oauth2, counters, timeline, inbox, media, config, identity, database, passwords
 from ..database import get_db
 from typing import List
-import datetime, shutil, os
+import datetime, os
 from .notification import create_notification_template
 from pydantic import BaseModel, validator
 import re
@@ -18,42 +18,45 @@ router = APIRouter(
 
 # Sign Up
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.UserResponse)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    # Recheck email
-    existing_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email is already in use"
-        )
-    
-    # Recheck username
-    existing_username = db.query(models.User).filter(models.User.username == user.username).first()
-    if existing_username:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username is already taken"
-        )
-    
-    # hash the password before storing it.
-    hashed_pwd = utils.hash(user.password)
-    user.password = hashed_pwd
+async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    def check_available(db: Session):
+        # Recheck email
+        existing_user = db.query(models.User).filter(models.User.email == user.email).first()
+        if existing_user:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email is already in use"
+            )
 
-    # Create a new user (except confirm_password)
-    new_user = models.User(**user.model_dump(exclude={"confirm_password"}))
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    access_token = oauth2.create_access_token(data={"user_id": new_user.uid})
+        # Recheck username
+        existing_username = db.query(models.User).filter(models.User.username == user.username).first()
+        if existing_username:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username is already taken"
+            )
+
+    await database.run_db(db, check_available)
 
-    return new_user
+    # hash the password before storing it (in the hashing pool).
+    user.password = await passwords.hash_password(user.password)
+
+    def insert(db: Session):
+        # Create a new user (except confirm_password)
+        new_user = models.User(**user.model_dump(exclude={"confirm_password"}))
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+        return new_user
+
+    return await database.run_db(db, insert)
 
 
 # Retrieve current user information (using JWT token)
 @router.get("/me", response_model=schemas.UserResponse)
 def get_current_user_data(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
     user = db.query(models.User).filter(models.User.uid == current_user.uid).first()
     if not user:
@@ -88,7 +91,7 @@ def update_user(
     id: int,
     updated_data: schemas.UserUpdate,
     db: Session = Depends(get_db),
-    current_user: int = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
     user = db.query(models.User).filter(models.User.uid == id).first()
     if not user:
@@ -104,6 +107,7 @@ def update_user(
             setattr(user, key, value)
 
     db.commit()
+    identity.invalidate(id)
     db.refresh(user)
     return user
 
@@ -114,17 +118,11 @@ def upload_user_avatar(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
-    UPLOAD_DIR = "uploads/user"
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-    filename = f"{current_user.uid}_{file.filename}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
+    stored = media.store_upload(db, file, max_bytes=config.UPLOAD_MAX_IMAGE_BYTES)
 
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # Save path to user model
-    current_user.profile_image = f"/{UPLOAD_DIR}/{filename}"
+    # Save path to user model (the previous avatar loses a reference)
+    media.release(db, [current_user.profile_image])
+    current_user.profile_image = media.url_for(stored.path)
     db.commit()
     db.refresh(current_user)
 
@@ -135,7 +133,7 @@ def upload_user_avatar(
 def follow_user(
     id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
     # Do not follow yourself
     if id == current_user.uid:
@@ -214,6 +212,8 @@ def follow_user(
     )
     db.add(follow)
     db.flush()
+    timeline.backfill_follow(db, current_user.uid, id)
+    inbox.open_chat_if_mutual(db, current_user.uid, id)
     db.commit()
     db.refresh(follow)
 
@@ -227,7 +227,7 @@ def follow_user(
 def unfollow_user(
     id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
     follow = db.query(models.Follow).filter_by(
         follower_id=current_user.uid,
@@ -238,6 +238,7 @@ def unfollow_user(
         raise HTTPException(status_code=404, detail="You are not following this user")
 
     db.delete(follow)
+    timeline.remove_follow(db, current_user.uid, id)
     db.commit()
 
     return {"message": f"You have unfollowed user {id}"}
@@ -246,7 +247,7 @@ def unfollow_user(
 @router.get("/me/followers", response_model=List[schemas.UserBriefResponse])
 def get_my_followers(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
 
     follows = db.query(models.Follow).filter(models.Follow.following_id == current_user.uid).all()
@@ -269,7 +270,7 @@ def get_my_followers(
 @router.get("/me/following", response_model=List[schemas.UserBriefResponse])
 def get_my_following(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
     follows = db.query(models.Follow).filter(models.Follow.follower_id == current_user.uid).all()
     response = []
@@ -292,7 +293,7 @@ def get_my_following(
 def get_user_followers(
     id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
     target_user = db.query(models.User).filter(models.User.uid == id).first()
     if not target_user:
@@ -320,7 +321,7 @@ def get_user_followers(
 def get_user_following(
     id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
     target_user = db.query(models.User).filter(models.User.uid == id).first()
     if not target_user:
@@ -407,28 +408,31 @@ class ChangePasswordRequest(BaseModel):
 
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     data: ChangePasswordRequest,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal_async)
 ):
 
-    user = db.query(models.User).filter(models.User.uid == current_user.uid).first()
+    user = await database.run_db(db, lambda s: s.query(models.User).filter(models.User.uid == current_user.uid).first())
 
     # 1) ตรวจสอบรหัสเดิม
-    if not utils.verify(data.current_password, user.password):
+    if not await passwords.verify_password(data.current_password, user.password):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
 
     # 2) ห้ามใช้รหัสเดิมซ้ำ
-    if utils.verify(data.new_password, user.password):
+    if await passwords.verify_password(data.new_password, user.password):
         raise HTTPException(status_code=400, detail="New password cannot be the same as old password")
 
     # 3) แฮชและบันทึก
-    hashed_new = utils.hash(data.new_password)
-    user.password = hashed_new
+    hashed_new = await passwords.hash_password(data.new_password)
 
-    db.commit()
-    db.refresh(user)
+    def save(db: Session):
+        user.password = hashed_new
+        db.commit()
+        db.refresh(user)
+
+    await database.run_db(db, save)
 
     return {"message": "Password changed successfully"}
 
@@ -436,7 +440,7 @@ def change_password(
 @router.delete("/delete", status_code=200)
 def delete_current_user(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    current_user: identity.Principal = Depends(oauth2.get_current_principal),
 ):
     user = db.query(models.User).filter(models.User.uid == current_user.uid).first()
 
@@ -444,8 +448,12 @@ def delete_current_user(
         raise HTTPException(status_code=404, detail="User not found")
 
     # ลบ user
+    touched_post_ids = counters.posts_touched_by_user(db, user.uid)
     db.delete(user)
+    db.flush()
+    counters.recompute_post_counters(db, touched_post_ids)
     db.commit()
+    identity.invalidate(current_user.uid)
 
     return {"message": "Account deleted successfully"}
 
@@ -454,7 +462,7 @@ def delete_current_user(
 def get_user_detail(
     id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: identity.Principal = Depends(oauth2.get_current_principal)
 ):
     user = db.query(models.User).filter(models.User.uid == id).first()
     if not user:
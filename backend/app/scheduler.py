@@ -0,0 +1,183 @@
+"""
+In-process periodic jobs, run by one worker at a time.
+
+Every worker starts the scheduler loop from the app lifespan, but only the
+leader runs jobs. On PostgreSQL the leader is the worker holding a
+session-level advisory lock (LEADER_LOCK_KEY) on a connection it keeps open.
+The other workers try to take the lock each tick, so they take over within
+SCHEDULER_TICK_SECONDS when the leader exits or loses its connection. On
+other databases (single-process dev and tests) the worker is always the leader.
+
+Jobs are synchronous `run(db) -> int` functions that commit their own work.
+They run in a thread so the event loop keeps serving requests.
+
+    study-reaper   app.study.reap_stale_sessions   every STUDY_REAPER_INTERVAL_SECONDS
+    ban-expiry     app.identity.expire_bans        every BAN_EXPIRY_INTERVAL_SECONDS
+    event-prune    app.events.prune_expired        every EVENT_PRUNE_INTERVAL_SECONDS
+
+With SCHEDULER_ENABLED=0 nothing runs in-process; run every job once from
+cron instead:
+
+    python -m app.scheduler
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import config, events, identity, study
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_lock id shared by every worker of this app (b"hubersch" as a bigint).
+LEADER_LOCK_KEY = 0x6875626572736368
+
+
+class Job(NamedTuple):
+    name: str
+    interval: float
+    run: Callable[[Session], int]
+
+
+def default_jobs() -> List[Job]:
+    return [
+        Job("study-reaper", config.STUDY_REAPER_INTERVAL_SECONDS, study.reap_stale_sessions),
+        Job("ban-expiry", config.BAN_EXPIRY_INTERVAL_SECONDS, identity.expire_bans),
+        Job("event-prune", config.EVENT_PRUNE_INTERVAL_SECONDS, events.prune_expired),
+    ]
+
+
+def run_job(job: Job, session_factory) -> int:
+    db = session_factory()
+    try:
+        result = job.run(db)
+        if result:
+            logger.info("Scheduled job %s: %s row(s)", job.name, result)
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class Scheduler:
+    def __init__(self, jobs: List[Job], engine, session_factory, tick: float = 15.0):
+        self.jobs = jobs
+        self.engine = engine
+        self.session_factory = session_factory
+        self.tick = tick
+        self._next_run: Dict[str, float] = {}
+        self._lock_conn = None
+        self._task: Optional[asyncio.Task] = None
+        # A tick still running in its thread when stop() is called finishes before the lock is released.
+        self._mutex = threading.Lock()
+
+    def ensure_leader(self) -> bool:
+        """Keep or try to take the leader lock; returns whether this worker leads."""
+        if self.engine.dialect.name != "postgresql":
+            return True
+        if self._lock_conn is not None:
+            try:
+                self._lock_conn.execute(text("SELECT 1"))
+                self._lock_conn.commit()
+                return True
+            except Exception:
+                logger.warning("Lost the scheduler leader connection")
+                self._drop_lock_conn()
+
+        conn = self.engine.connect()
+        try:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": LEADER_LOCK_KEY}).scalar()
+            # The lock belongs to the session, not the transaction.
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        logger.info("This worker is now the scheduler leader")
+        self._lock_conn = conn
+        self._next_run.clear()
+        return True
+
+    def release(self):
+        with self._mutex:
+            if self._lock_conn is None:
+                return
+            try:
+                self._lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LEADER_LOCK_KEY})
+                self._lock_conn.commit()
+                self._lock_conn.close()
+            except Exception:
+                self._drop_lock_conn()
+            self._lock_conn = None
+
+    def _drop_lock_conn(self):
+        # Close the DBAPI connection for real so the server frees the lock,
+        # instead of returning it to the pool still holding it.
+        try:
+            self._lock_conn.invalidate()
+        except Exception:
+            pass
+        self._lock_conn = None
+
+    def run_due(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Run the jobs whose interval has elapsed, if this worker leads; returns results by job name."""
+        with self._mutex:
+            if not self.ensure_leader():
+                return {}
+            now = time.monotonic() if now is None else now
+            results = {}
+            for job in self.jobs:
+                if self._next_run.get(job.name, 0.0) > now:
+                    continue
+                self._next_run[job.name] = now + job.interval
+                try:
+                    results[job.name] = run_job(job, self.session_factory)
+                except Exception:
+                    logger.exception("Scheduled job %s failed", job.name)
+            return results
+
+    async def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.release)
+
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.run_due)
+            except Exception:
+                logger.exception("Scheduler tick failed")
+            await asyncio.sleep(self.tick)
+
+
+def create_scheduler() -> Scheduler:
+    from .database import SessionLocal, engine
+
+    return Scheduler(default_jobs(), engine, SessionLocal, tick=config.SCHEDULER_TICK_SECONDS)
+
+
+def main():
+    from .database import SessionLocal
+
+    for job in default_jobs():
+        print(f"{job.name}: {run_job(job, SessionLocal)} row(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -108,6 +108,7 @@ class PostImageResponse(BaseModel):
     id: int
     path: str
     caption: Optional[str]
+    preview_path: Optional[str] = None   # smallest resized variant for cards; None = use path
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -149,6 +150,7 @@ class PostResponse(BaseModel):
     user_id: int
     username: str
     like_count: int
+    comment_count: int = 0
     profile_image: Optional[str]
     liked: Optional[bool] = False
     tags: List[PostTagResponse] = []
@@ -158,6 +160,11 @@ class PostResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class HashtagCount(BaseModel):
+    name: str
+    count: int
+
+
 class BanRequest(BaseModel):
     duration: str
 
@@ -208,6 +215,17 @@ class NotificationResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class NotificationSummaryResponse(BaseModel):
+    items: List[NotificationResponse]
+    unread_count: int
+    next_cursor: Optional[str] = None
+
+
+class BadgesResponse(BaseModel):
+    unread_notifications: int
+    unread_messages: int
+
+
 class PostUpdate(BaseModel):
     post_content: Optional[str] = None
     forum_id: Optional[int] = None
@@ -0,0 +1,166 @@
+"""
+User and post search (/search/users, /search/posts).
+
+On PostgreSQL the queries are served by indexes from migration 0004
+(alembic/versions/0004_search_indexes.py):
+  - users: trigram GIN indexes on lower(username) / lower(name) for substring
+    matches, plus text_pattern_ops btrees for prefix (autocomplete) matches;
+  - posts and comments: a generated `search_vector` tsvector column with a
+    GIN index, queried with a prefix tsquery (`word & wor:*`) and ranked by
+    ts_rank.
+
+Other dialects (the SQLite test database) fall back to LIKE matching with
+the same ranking rules apart from the similarity/ts_rank scores.
+
+Results are limited to one page; the next page's cursor travels in the
+X-Next-Cursor header like the feeds. Ranked results cannot be keyset
+paginated, so the cursor holds an offset, capped at MAX_OFFSET.
+"""
+import base64
+import json
+import re
+from typing import List, NamedTuple, Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import case, func, literal_column, or_
+from sqlalchemy.orm import Query as SAQuery, Session
+
+from . import feed, models, schemas
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+MAX_OFFSET = 500
+MAX_QUERY_LENGTH = 100
+# Shorter queries only match prefixes: too few trigrams for a useful substring search.
+MIN_SUBSTRING_LENGTH = 3
+
+# Must match TS_CONFIG in migration 0004, which builds the search_vector columns.
+TS_CONFIG = "simple"
+
+# Characters with a meaning in to_tsquery syntax
+_TSQUERY_SPECIAL = re.compile(r"[&|!():*'\\<>\s]+")
+
+
+class SearchPage(NamedTuple):
+    q: str
+    offset: int
+    limit: int
+
+
+def encode_cursor(offset: int) -> str:
+    raw = json.dumps({"o": offset}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset = json.loads(base64.urlsafe_b64decode(padded.encode()))["o"]
+        if not isinstance(offset, int) or not 0 <= offset <= MAX_OFFSET:
+            raise ValueError(offset)
+        return offset
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def get_search_page(
+    q: str = Query(..., max_length=MAX_QUERY_LENGTH),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+) -> SearchPage:
+    """Dependency: the search terms and which page of results to return."""
+    return SearchPage(q=q.strip(), offset=decode_cursor(cursor) if cursor else 0, limit=limit)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _paginate(query: SAQuery, page: SearchPage, response: Response) -> list:
+    rows = query.offset(page.offset).limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        if page.offset + page.limit <= MAX_OFFSET:
+            response.headers[feed.NEXT_CURSOR_HEADER] = encode_cursor(page.offset + page.limit)
+    return rows
+
+
+def prefix_tsquery(q: str) -> Optional[str]:
+    """'data stru' -> 'data & stru:*' (every word must match, the last one as a prefix)."""
+    words = [w for w in _TSQUERY_SPECIAL.split(q.lower()) if w]
+    if not words:
+        return None
+    return " & ".join(words[:-1] + [words[-1] + ":*"])
+
+
+def user_query(db: Session, q: str) -> SAQuery:
+    """Users whose username or name matches, best match first."""
+    term = q.lower()
+    escaped = _escape_like(term)
+    username = func.lower(models.User.username)
+    name = func.lower(models.User.name)
+
+    if len(term) < MIN_SUBSTRING_LENGTH:
+        match = or_(username.like(f"{escaped}%", escape="\\"), name.like(f"{escaped}%", escape="\\"))
+    else:
+        match = or_(username.like(f"%{escaped}%", escape="\\"), name.like(f"%{escaped}%", escape="\\"))
+
+    tier = case(
+        (username == term, 0),
+        (username.like(f"{escaped}%", escape="\\"), 1),
+        (name.like(f"{escaped}%", escape="\\"), 2),
+        else_=3,
+    )
+    order = [tier]
+    if db.get_bind().dialect.name == "postgresql":
+        order.append(func.greatest(
+            func.similarity(username, term),
+            func.similarity(func.coalesce(name, ""), term),
+        ).desc())
+    order += [func.length(models.User.username), models.User.uid]
+
+    return db.query(models.User).filter(match).order_by(*order)
+
+
+def post_query(db: Session, q: str, viewer_uid: int) -> Optional[SAQuery]:
+    """Posts whose content, or one of whose comments, matches; most relevant first."""
+    base = db.query(models.Post).options(*feed.POST_FEED_OPTIONS)
+
+    if db.get_bind().dialect.name == "postgresql":
+        tsquery_text = prefix_tsquery(q)
+        if tsquery_text is None:
+            return None
+        tsquery = func.to_tsquery(literal_column(f"'{TS_CONFIG}'::regconfig"), tsquery_text)
+        # Generated columns from migration 0004, not mapped on the models
+        post_vector = literal_column("post.search_vector")
+        comment_vector = literal_column("comments.search_vector")
+        commented = db.query(models.Comment.post_id).filter(comment_vector.op("@@")(tsquery))
+        query = base.filter(or_(post_vector.op("@@")(tsquery), models.Post.pid.in_(commented)))
+        query = query.order_by(func.ts_rank(post_vector, tsquery).desc(), models.Post.pid.desc())
+    else:
+        pattern = f"%{_escape_like(q.lower())}%"
+        commented = db.query(models.Comment.post_id).filter(
+            func.lower(models.Comment.content).like(pattern, escape="\\")
+        )
+        query = base.filter(or_(
+            func.lower(models.Post.post_content).like(pattern, escape="\\"),
+            models.Post.pid.in_(commented),
+        ))
+        query = query.order_by(models.Post.pid.desc())
+
+    return feed.visible_to(query, viewer_uid)
+
+
+def search_users(db: Session, page: SearchPage, response: Response) -> List[models.User]:
+    if not page.q:
+        return []
+    return _paginate(user_query(db, page.q), page, response)
+
+
+def search_posts(db: Session, page: SearchPage, response: Response, viewer_uid: int) -> List[schemas.PostResponse]:
+    query = post_query(db, page.q, viewer_uid) if page.q else None
+    if query is None:
+        return []
+    posts = _paginate(query, page, response)
+    return feed.build_post_responses(db, posts, viewer_uid=viewer_uid)
+
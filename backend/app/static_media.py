@@ -0,0 +1,57 @@
+"""
+Serving for the /uploads mount.
+
+Files under blobs/ and variants/ are named after their content hash (see
+app.media / app.imaging), so their URL is already versioned: they get a
+strong ETag derived from that name and a year-long `immutable` Cache-Control.
+Name-based legacy files can be overwritten, so they are served `no-cache`
+and revalidated with the usual mtime/size ETag.
+
+Range requests (video seeking) and If-Range are handled by Starlette's
+FileResponse, which also hands the file to the server for zero-copy
+sending when it supports the ASGI `http.response.pathsend` extension.
+"""
+import os
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from .imaging import VARIANT_DIR
+from .media import BLOB_DIR
+
+IMMUTABLE_DIRS = {BLOB_DIR, VARIANT_DIR}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MUTABLE_CACHE_CONTROL = "no-cache"
+
+
+class MediaFileResponse(FileResponse):
+    # Fewer, larger reads for big media files than the 64 KiB default.
+    chunk_size = 256 * 1024
+
+
+class MediaFiles(StaticFiles):
+    def is_immutable(self, full_path) -> bool:
+        rel = os.path.relpath(full_path, self.directory)
+        return rel.split(os.sep, 1)[0] in IMMUTABLE_DIRS
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        if self.is_immutable(full_path):
+            headers = {
+                "etag": f'"{os.path.basename(full_path)}"',
+                "cache-control": IMMUTABLE_CACHE_CONTROL,
+            }
+        else:
+            headers = {"cache-control": MUTABLE_CACHE_CONTROL}
+
+        response = MediaFileResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
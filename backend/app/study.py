@@ -0,0 +1,194 @@
+"""
+Closing study sessions and crediting their time to daily_progress.
+
+A session's time is split at local midnight (config.STUDY_TIMEZONE) and each
+day's share is added to that day's daily_progress row. Everything happens in
+the caller's transaction with two statements, however many sessions and days
+are involved:
+
+- one UPDATE ... WHERE end_time IS NULL RETURNING ends the sessions, so a
+  session is credited once even when two requests race to stop it;
+- one INSERT ... ON CONFLICT (user_id, local_date) DO UPDATE adds every
+  per-day increment (in chunks of UPSERT_BATCH_ROWS rows).
+
+Sessions whose client stopped sending heartbeats (closed tab, lost network)
+are closed at their last heartbeat by `reap_stale_sessions`, which the
+scheduler runs every STUDY_REAPER_INTERVAL_SECONDS.
+
+Open sessions can be closed in bulk, e.g. before taking the service down:
+
+    python -m app.study               # every open session
+    python -m app.study --user 42     # one user's
+"""
+import argparse
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import case, update
+from sqlalchemy.orm import Session
+
+from . import config, models
+
+TZ = ZoneInfo(config.STUDY_TIMEZONE)
+
+# A day row never gains more than a day from one statement.
+MAX_DAY_SECONDS = 24 * 3600
+# Rows per INSERT; keeps the bind parameters well under the server limits.
+UPSERT_BATCH_ROWS = 1000
+
+
+class DayShare(NamedTuple):
+    local_date: date
+    day_start_utc: datetime
+    seconds: int
+
+
+class ClosedSession(NamedTuple):
+    sid: int
+    user_id: int
+    start_time: datetime
+    end_time: datetime
+    # daily_progress totals of the day the session ended on, after crediting it
+    totals: dict
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands timestamps back naive; they were written in UTC.
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def split_by_day(start: datetime, end: datetime) -> List[DayShare]:
+    """Seconds of [start, end) on each local day, first to last; the last day is always present."""
+    start, end = _utc(start), _utc(end)
+    day = start.astimezone(TZ).date()
+    last_day = end.astimezone(TZ).date()
+
+    shares = []
+    while True:
+        day_start = datetime(day.year, day.month, day.day, tzinfo=TZ).astimezone(timezone.utc)
+        next_day = day + timedelta(days=1)
+        day_end = datetime(next_day.year, next_day.month, next_day.day, tzinfo=TZ).astimezone(timezone.utc)
+        seconds = max(0, int((min(end, day_end) - max(start, day_start)).total_seconds()))
+        shares.append(DayShare(day, day_start, seconds))
+        if day >= last_day:
+            return shares
+        day = next_day
+
+
+def add_daily_seconds(db: Session, increments: Iterable[Tuple[int, DayShare]], badge: int = 0) -> Dict[Tuple[int, date], dict]:
+    """
+    Add each (user_id, DayShare) to daily_progress; does not commit.
+    Returns the new totals keyed by (user_id, local_date).
+    """
+    # ON CONFLICT DO UPDATE may touch a row only once per statement, so merge
+    # shares of the same day first. Sorted, so concurrent batches lock rows in
+    # the same order.
+    merged: Dict[Tuple[int, date], DayShare] = {}
+    for user_id, share in increments:
+        key = (user_id, share.local_date)
+        if key in merged:
+            share = share._replace(seconds=merged[key].seconds + share.seconds)
+        merged[key] = share
+    if not merged:
+        return {}
+
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    dp = models.DailyProgress
+    rows = []
+    for (user_id, local_date), share in sorted(merged.items()):
+        seconds = min(share.seconds, MAX_DAY_SECONDS)
+        rows.append({
+            "user_id": user_id,
+            "date": share.day_start_utc,
+            "local_date": local_date,
+            "total_seconds": seconds,
+            "total_minutes": seconds // 60,
+            "badge_level": badge,
+        })
+
+    totals = {}
+    for i in range(0, len(rows), UPSERT_BATCH_ROWS):
+        stmt = insert(dp).values(rows[i:i + UPSERT_BATCH_ROWS])
+        total_seconds = dp.total_seconds + stmt.excluded.total_seconds
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[dp.user_id, dp.local_date],
+            set_={
+                "total_seconds": total_seconds,
+                "total_minutes": total_seconds // 60,
+                "badge_level": case((dp.badge_level >= stmt.excluded.badge_level, dp.badge_level),
+                                    else_=stmt.excluded.badge_level),
+            },
+        ).returning(dp.user_id, dp.local_date, dp.total_seconds, dp.total_minutes, dp.badge_level)
+        for r in db.execute(stmt):
+            totals[(r.user_id, r.local_date)] = {
+                "total_seconds": r.total_seconds,
+                "total_minutes": r.total_minutes,
+                "badge_level": r.badge_level,
+            }
+    return totals
+
+
+def close_sessions(db: Session, *criteria, end_time=None) -> List[ClosedSession]:
+    """
+    End the open sessions matching `criteria` and credit their time; does not commit.
+    `end_time` defaults to now and may be a SQL expression evaluated per row.
+    """
+    s = models.StudySession
+    if end_time is None:
+        end_time = datetime.now(timezone.utc)
+    stmt = (
+        update(s)
+        .where(s.end_time.is_(None), *criteria)
+        .values(end_time=end_time)
+        .returning(s.sid, s.user_id, s.start_time, s.end_time)
+    )
+    ended = db.execute(stmt).all()
+
+    shares = {r.sid: split_by_day(r.start_time, r.end_time) for r in ended}
+    totals = add_daily_seconds(db, ((r.user_id, share) for r in ended for share in shares[r.sid]))
+    return [
+        ClosedSession(r.sid, r.user_id, r.start_time, r.end_time, totals[(r.user_id, shares[r.sid][-1].local_date)])
+        for r in ended
+    ]
+
+
+def reap_stale_sessions(db: Session, timeout_seconds: Optional[int] = None) -> int:
+    """
+    Close sessions with no heartbeat for `timeout_seconds` (default
+    STUDY_SESSION_TIMEOUT_SECONDS), crediting them up to their last heartbeat; commits.
+    """
+    if timeout_seconds is None:
+        timeout_seconds = config.STUDY_SESSION_TIMEOUT_SECONDS
+    s = models.StudySession
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=timeout_seconds)
+    closed = close_sessions(db, s.last_heartbeat_at < cutoff, end_time=s.last_heartbeat_at)
+    db.commit()
+    return len(closed)
+
+
+def main(argv: Optional[List[str]] = None):
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(prog="python -m app.study", description="Close open study sessions and credit their time.")
+    parser.add_argument("--user", type=int, help="only this user's sessions")
+    args = parser.parse_args(argv)
+
+    criteria = [models.StudySession.user_id == args.user] if args.user is not None else []
+    db = SessionLocal()
+    try:
+        closed = close_sessions(db, *criteria)
+        db.commit()
+        print(f"Closed {len(closed)} study session(s).")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Precomputed home timeline for /posts/following (fan-out-on-write).
+
+When TIMELINE_FANOUT_ENABLED is on, a new post is copied into the
+timeline_entries rows of every follower, and following someone backfills
+their recent posts. Authors with more than TIMELINE_FANOUT_MAX_FOLLOWERS
+followers (users.follower_count, see app/counters.py) are not fanned out;
+their posts are merged in on read instead. When an unfollow brings an
+author back down to the limit, their recent posts are copied into every
+follower's timeline, since they are no longer merged in on read.
+
+Existing data can be (re)loaded with:
+
+    python -m app.timeline
+"""
+from sqlalchemy import and_, exists, insert, literal, or_, select
+from sqlalchemy.orm import Session
+
+from . import config, models
+
+
+def is_enabled() -> bool:
+    return config.TIMELINE_FANOUT_ENABLED
+
+
+def follower_count(db: Session, author_id: int) -> int:
+    return db.query(models.User.follower_count).filter(models.User.uid == author_id).scalar() or 0
+
+
+def is_high_follower(db: Session, author_id: int) -> bool:
+    return follower_count(db, author_id) > config.TIMELINE_FANOUT_MAX_FOLLOWERS
+
+
+def fan_out_post(db: Session, post: models.Post):
+    """Write a new post into the author's own timeline and, for regular authors, every follower's."""
+    if not is_enabled():
+        return
+
+    db.add(models.TimelineEntry(user_id=post.user_id, post_id=post.pid, author_id=post.user_id))
+
+    if is_high_follower(db, post.user_id):
+        return
+
+    followers = select(
+        models.Follow.follower_id,
+        literal(post.pid),
+        literal(post.user_id),
+    ).where(models.Follow.following_id == post.user_id)
+
+    db.execute(
+        insert(models.TimelineEntry).from_select(
+            ["user_id", "post_id", "author_id"], followers
+        )
+    )
+
+
+def backfill_follow(db: Session, follower_id: int, author_id: int):
+    """Copy the author's most recent posts into the new follower's timeline."""
+    if not is_enabled() or is_high_follower(db, author_id):
+        return
+
+    already_there = exists().where(
+        models.TimelineEntry.user_id == follower_id,
+        models.TimelineEntry.post_id == models.Post.pid,
+    )
+    recent = (
+        select(literal(follower_id), models.Post.pid, models.Post.user_id)
+        .where(models.Post.user_id == author_id, ~already_there)
+        .order_by(models.Post.pid.desc())
+        .limit(config.TIMELINE_BACKFILL_POSTS)
+    )
+    db.execute(
+        insert(models.TimelineEntry).from_select(
+            ["user_id", "post_id", "author_id"], recent
+        )
+    )
+
+
+def backfill_followers(conn, author_id: int):
+    """Copy the author's most recent posts into every follower's timeline (missing ones only)."""
+    recent = (
+        select(models.Post.pid)
+        .where(models.Post.user_id == author_id)
+        .order_by(models.Post.pid.desc())
+        .limit(config.TIMELINE_BACKFILL_POSTS)
+    )
+    already_there = exists().where(
+        models.TimelineEntry.user_id == models.Follow.follower_id,
+        models.TimelineEntry.post_id == models.Post.pid,
+    )
+    rows = (
+        select(models.Follow.follower_id, models.Post.pid, models.Post.user_id)
+        .join(models.Post, models.Post.user_id == models.Follow.following_id)
+        .where(
+            models.Follow.following_id == author_id,
+            models.Post.pid.in_(recent.scalar_subquery()),
+            ~already_there,
+        )
+    )
+    conn.execute(
+        insert(models.TimelineEntry).from_select(
+            ["user_id", "post_id", "author_id"], rows
+        )
+    )
+
+
+def remove_follow(db: Session, follower_id: int, author_id: int):
+    """Drop an unfollowed author's posts from the follower's timeline."""
+    if not is_enabled():
+        return
+
+    db.query(models.TimelineEntry).filter(
+        models.TimelineEntry.user_id == follower_id,
+        models.TimelineEntry.author_id == author_id,
+    ).delete(synchronize_session=False)
+
+
+def high_follower_followees(viewer_uid: int):
+    """Subquery of accounts the viewer follows that are read-merged rather than fanned out."""
+    return (
+        select(models.Follow.following_id)
+        .join(models.User, models.User.uid == models.Follow.following_id)
+        .where(
+            models.Follow.follower_id == viewer_uid,
+            models.User.follower_count > config.TIMELINE_FANOUT_MAX_FOLLOWERS,
+        )
+    )
+
+
+def following_feed_filter(viewer_uid: int):
+    """
+    Post filter for the viewer's following feed: the materialized timeline plus
+    posts by high-follower accounts they follow (fan-out-on-read).
+    """
+    in_timeline = select(models.TimelineEntry.post_id).where(
+        models.TimelineEntry.user_id == viewer_uid
+    )
+    return or_(
+        models.Post.pid.in_(in_timeline),
+        models.Post.user_id.in_(high_follower_followees(viewer_uid)),
+    )
+
+
+def rebuild_timeline(db: Session, viewer_uid: int):
+    """Recreate one viewer's timeline from follows/posts."""
+    db.query(models.TimelineEntry).filter(
+        models.TimelineEntry.user_id == viewer_uid
+    ).delete(synchronize_session=False)
+
+    followees = select(models.Follow.following_id).where(models.Follow.follower_id == viewer_uid)
+    posts = select(literal(viewer_uid), models.Post.pid, models.Post.user_id).where(
+        or_(
+            models.Post.user_id == viewer_uid,
+            and_(
+                models.Post.user_id.in_(followees),
+                models.Post.user_id.not_in(high_follower_followees(viewer_uid)),
+            ),
+        )
+    )
+    db.execute(
+        insert(models.TimelineEntry).from_select(
+            ["user_id", "post_id", "author_id"], posts
+        )
+    )
+
+
+def main():
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        uids = [uid for (uid,) in db.query(models.User.uid).all()]
+        for uid in uids:
+            rebuild_timeline(db, uid)
+            db.commit()
+        print(f"Rebuilt timelines for {len(uids)} user(s).")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
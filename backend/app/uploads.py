@@ -0,0 +1,107 @@
+"""
+Shared upload pipeline for every endpoint that accepts files.
+
+`save_upload` copies an UploadFile to its destination in UPLOAD_CHUNK_SIZE
+chunks, hashing (SHA-256) as it goes and aborting with 413 once the file
+passes its size quota. Data goes to a temp file in the destination folder
+which is renamed into place only when complete, so a reader never sees a
+half-written file and a failed upload leaves nothing behind.
+
+The quota is checked while copying, i.e. after Starlette has already parsed
+the multipart body (spooling large parts to temp files), so it bounds what
+is kept, not what a client can send. Capping the request size itself is
+left to the reverse proxy (e.g. nginx `client_max_body_size`).
+
+`save_upload` blocks, so call it from sync (threadpool) endpoints.
+"""
+import hashlib
+import os
+import tempfile
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile
+
+from . import config
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".mkv"}
+
+
+class StoredUpload(NamedTuple):
+    path: str            # filesystem path the file was written to
+    size: int            # bytes
+    sha256: str          # hex digest of the content
+    kind: str            # "image" | "video" | "pdf" | "file"
+    content_type: str
+    original_name: str
+
+
+def file_kind(filename: Optional[str], content_type: Optional[str] = None) -> str:
+    """Classify an upload by extension, falling back to its content type."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext in IMAGE_EXTENSIONS:
+        return "image"
+    if ext in VIDEO_EXTENSIONS:
+        return "video"
+    if ext == ".pdf":
+        return "pdf"
+    content_type = content_type or ""
+    if content_type.startswith("image/"):
+        return "image"
+    if content_type.startswith("video/"):
+        return "video"
+    return "file"
+
+
+def max_bytes_for(kind: str) -> int:
+    if kind == "image":
+        return config.UPLOAD_MAX_IMAGE_BYTES
+    if kind == "video":
+        return config.UPLOAD_MAX_VIDEO_BYTES
+    return config.UPLOAD_MAX_FILE_BYTES
+
+
+def save_upload(upload: UploadFile, dest_path: str, max_bytes: Optional[int] = None) -> StoredUpload:
+    """Stream `upload` to `dest_path` (blocking; call from a worker thread)."""
+    original_name = os.path.basename(upload.filename or "")
+    content_type = upload.content_type or "application/octet-stream"
+    kind = file_kind(original_name, content_type)
+    limit = max_bytes if max_bytes is not None else max_bytes_for(kind)
+
+    dest_dir = os.path.dirname(dest_path) or "."
+    os.makedirs(dest_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix=".upload-", suffix=".part")
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = upload.file.read(config.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large (max {limit // (1024 * 1024)} MB for {kind})",
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    return StoredUpload(
+        path=dest_path,
+        size=size,
+        sha256=digest.hexdigest(),
+        kind=kind,
+        content_type=content_type,
+        original_name=original_name,
+    )
+
@@ -1,27 +1,19 @@
-from .models import User
-from datetime import datetime
-from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
-from .oauth2 import get_current_user 
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from fastapi import Depends
+from .oauth2 import get_current_principal
+from .identity import Principal, ensure_not_banned
+from .passwords import hash_sync, verify_sync
 
 
+# Blocking helpers for scripts and tests; request handlers use the
+# app.passwords coroutines, which run in the hashing pool.
 def hash(password: str):
-    return pwd_context.hash(password)
+    return hash_sync(password)
 
 
 def verify(plain_pass, hashed_pass):
-    return pwd_context.verify(plain_pass, hashed_pass)
+    return verify_sync(plain_pass, hashed_pass)
 
 
-def check_ban_status(user: User = Depends(get_current_user)) -> User:
-    if user.is_banned and user.ban_until:
-        now = datetime.now()
-        if user.ban_until > now:
-            ban_until_str = user.ban_until.strftime("%Y-%m-%d %H:%M:%S")
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"{user.username} is banned until {ban_until_str}"
-            )
+def check_ban_status(user: Principal = Depends(get_current_principal)) -> Principal:
+    ensure_not_banned(user)
     return user
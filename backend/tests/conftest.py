@@ -15,10 +15,14 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Ensure app import doesn't attempt DB init during tests
 os.environ.setdefault("SKIP_DB_INIT", "1")
+# Scheduled jobs would run against the configured database, not the test one
+os.environ.setdefault("SCHEDULER_ENABLED", "0")
+# Variant workers record their results through SessionLocal, i.e. the configured database
+os.environ.setdefault("MEDIA_VARIANTS_ENABLED", "0")
 
 from app.database import Base, get_db
 # ensure models are imported so they are registered on Base.metadata
-from app import models  # noqa: F401
+from app import identity, models  # noqa: F401
 from app.main import app
 from fastapi.testclient import TestClient
 
@@ -72,6 +76,13 @@ def client(db_session):
         yield c
     app.dependency_overrides.clear()
 
+@pytest.fixture(autouse=True)
+def clear_identity_cache():
+    """Tests edit users directly through db_session, bypassing the routers' invalidation."""
+    identity.cache.clear()
+    yield
+
+
 @pytest.fixture(autouse=True)
 def cleanup_uploads():
     """Remove files created under `uploads/` (post/user) after each test to keep workspace clean."""
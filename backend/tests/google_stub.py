@@ -0,0 +1,101 @@
+"""A local stand-in for Google's OAuth/OpenID endpoints, served over real HTTP."""
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+class GoogleStub:
+    def __init__(self, client_id: str):
+        self.client_id = client_id
+        self.key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.kid = uuid.uuid4().hex
+        self.hits = Counter()
+        self.codes = {}             # code -> claims
+        self.include_id_token = True
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def rotate_key(self):
+        self.key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.kid = uuid.uuid4().hex
+
+    def issue_code(self, sub: str, email: str, picture: str = None) -> str:
+        code = uuid.uuid4().hex
+        self.codes[code] = {"sub": sub, "email": email, "email_verified": True, "picture": picture}
+        return code
+
+    def id_token(self, claims: dict, **overrides) -> str:
+        now = int(time.time())
+        payload = {"iss": self.url, "aud": self.client_id, "iat": now, "exp": now + 3600, **claims, **overrides}
+        return jwt.encode(payload, self.key, algorithm="RS256", headers={"kid": self.kid})
+
+    def jwks(self) -> dict:
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(self.key.public_key()))
+        return {"keys": [{**jwk, "kid": self.kid, "alg": "RS256", "use": "sig"}]}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status, body, cache=None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if cache:
+                    self.send_header("Cache-Control", cache)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                stub.hits[self.path] += 1
+                if self.path == "/.well-known/openid-configuration":
+                    self._json(200, {
+                        "issuer": stub.url,
+                        "jwks_uri": f"{stub.url}/certs",
+                        "token_endpoint": f"{stub.url}/token",
+                        "userinfo_endpoint": f"{stub.url}/userinfo",
+                    }, cache="public, max-age=3600")
+                elif self.path == "/certs":
+                    self._json(200, stub.jwks(), cache="public, max-age=3600")
+                elif self.path == "/userinfo":
+                    token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+                    claims = stub.codes.get(token)
+                    self._json(200 if claims else 401, claims or {"error": "invalid_token"})
+                else:
+                    self._json(404, {})
+
+            def do_POST(self):
+                stub.hits[self.path] += 1
+                length = int(self.headers.get("Content-Length", 0))
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+                if self.path != "/token":
+                    return self._json(404, {})
+                claims = stub.codes.get(form.get("code"))
+                if claims is None or form.get("client_id") != stub.client_id:
+                    return self._json(400, {"error": "invalid_grant"})
+                body = {"access_token": form["code"], "token_type": "Bearer", "expires_in": 3599}
+                if stub.include_id_token:
+                    body["id_token"] = stub.id_token(claims)
+                self._json(200, body)
+
+        return Handler
@@ -213,3 +213,49 @@ def test_admin_dashboard_data(client, db_session):
     if res.status_code == 200:
         data = res.json()
         assert isinstance(data, dict)
+
+
+def test_ban_and_delete_invalidate_cached_principal(client, db_session):
+    from app import identity
+
+    user = create_user(client, "cached_principal", "cached_principal@example.com")
+    token = client.post("/login", json={"email": "cached_principal@example.com", "password": "Aa1!aaaa"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/posts/me", headers=headers).status_code == 200
+    assert identity.cache.get(user['uid']).is_banned is False
+
+    res = client.post(f"/admin/users/{user['uid']}/ban", json={"duration": "1w"})
+    assert res.status_code == 200
+    assert identity.cache.get(user['uid']) is None
+
+    assert client.get("/posts/me", headers=headers).status_code == 200
+    assert identity.cache.get(user['uid']).is_banned is True
+
+    assert client.delete(f"/admin/users/{user['uid']}").status_code == 200
+    assert client.get("/posts/me", headers=headers).status_code == 401
+
+
+def test_expired_bans_are_lifted_by_the_expiry_job(client, db_session):
+    import datetime
+    from app import identity
+
+    user = create_user(client, "ban_expiring", "ban_expiring@example.com")
+    token = client.post("/login", json={"email": "ban_expiring@example.com", "password": "Aa1!aaaa"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    db_user = db_session.query(models.User).filter(models.User.uid == user['uid']).first()
+    db_user.is_banned = True
+    db_user.ban_until = datetime.datetime.now() - datetime.timedelta(minutes=1)
+    db_session.commit()
+    identity.invalidate(user['uid'])
+
+    # ban_until decides: a run-out ban no longer blocks, even before the job clears the flag
+    data = {"post_content": "back again", "forum_id": "1"}
+    assert client.post("/posts/", data=data, headers=headers).status_code != 403
+
+    assert identity.expire_bans(db_session) >= 1
+    db_session.refresh(db_user)
+    assert db_user.is_banned is False and db_user.ban_until is None
+    assert identity.cache.get(user['uid']) is None
+    assert client.post("/posts/", data=data, headers=headers).status_code != 403
@@ -90,3 +90,99 @@ def test_access_with_invalid_token_fails(client):
     headers = {"Authorization": "Bearer invalid_token_123"}
     res = client.get("/users/me", headers=headers)
     assert res.status_code == 401
+
+
+def test_cached_principal_skips_user_lookup(client, db_session):
+    from sqlalchemy import event
+
+    payload = {"username": "principal_cache", "email": "principal_cache@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    client.post("/users/", json=payload)
+    token = client.post("/login", json={"email": payload["email"], "password": "Aa1!aaaa"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    statements = []
+
+    def count_statement(*args):
+        statements.append(args[2])
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", count_statement)
+    try:
+        assert client.get("/posts/me", headers=headers).status_code == 200
+        first = [s for s in statements if "FROM users" in s]
+        statements.clear()
+        assert client.get("/posts/me", headers=headers).status_code == 200
+        second = [s for s in statements if "FROM users" in s]
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", count_statement)
+
+    assert len(first) == len(second) + 1
+
+
+def test_ban_checked_endpoints_use_cached_principal(client, db_session):
+    from datetime import datetime, timedelta
+    from sqlalchemy import event
+    from app import identity, models
+
+    db_session.add(models.Forum(fid=600, forum_name="Principal Forum"))
+    db_session.commit()
+    payload = {"username": "principal_poster", "email": "principal_poster@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    uid = client.post("/users/", json=payload).json()["uid"]
+    token = client.post("/login", json={"email": payload["email"], "password": "Aa1!aaaa"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    pid = client.post("/posts/", data={"post_content": "mine", "forum_id": "600"}, headers=headers).json()["pid"]
+    assert client.post(f"/posts/{pid}/like", headers=headers).status_code == 200
+
+    statements = []
+
+    def count_statement(*args):
+        statements.append(args[2])
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", count_statement)
+    try:
+        assert client.post(f"/posts/{pid}/like", headers=headers).json()["message"] == "Like removed"
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", count_statement)
+    assert not [s for s in statements if "FROM users" in s]
+
+    user = db_session.get(models.User, uid)
+    user.is_banned, user.ban_until = True, datetime.now() + timedelta(days=1)
+    db_session.commit()
+    identity.invalidate(uid)
+    res = client.post("/posts/", data={"post_content": "banned", "forum_id": "600"}, headers=headers)
+    assert res.status_code == 403
+
+
+def test_login_rehashes_password_when_cost_changes(client, db_session, monkeypatch):
+    from app import config, models
+
+    payload = {"username": "rehash_user", "email": "rehash_user@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    uid = client.post("/users/", json=payload).json()["uid"]
+    original = db_session.get(models.User, uid).password
+    assert original.startswith(f"$2b${config.BCRYPT_ROUNDS:02d}$")
+
+    monkeypatch.setattr(config, "BCRYPT_ROUNDS", 5)
+    res = client.post("/login", json={"email": payload["email"], "password": "Aa1!aaaa"})
+    assert res.status_code == 200
+
+    db_session.expire_all()
+    upgraded = db_session.get(models.User, uid).password
+    assert upgraded.startswith("$2b$05$")
+    assert utils.verify("Aa1!aaaa", upgraded)
+
+    # Already at the configured cost: left alone
+    assert client.post("/login", json={"email": payload["email"], "password": "Aa1!aaaa"}).status_code == 200
+    db_session.expire_all()
+    assert db_session.get(models.User, uid).password == upgraded
+
+
+def test_login_is_rejected_fast_when_hash_queue_is_full(client, monkeypatch):
+    from app import config
+
+    payload = {"username": "hash_queue_user", "email": "hash_queue_user@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    client.post("/users/", json=payload)
+
+    monkeypatch.setattr(config, "PASSWORD_HASH_MAX_PENDING", 0)
+    res = client.post("/login", json={"email": payload["email"], "password": "Aa1!aaaa"})
+    assert res.status_code == 503
+    assert res.headers["retry-after"] == "1"
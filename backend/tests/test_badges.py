@@ -0,0 +1,158 @@
+from sqlalchemy import event
+
+from app import badges, models, notifications
+
+
+def create_user(client, username, email):
+    payload = {"username": username, "email": email, "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    r = client.post("/users/", json=payload)
+    assert r.status_code == 201
+    return r.json()
+
+
+def login(client, email):
+    token = client.post("/login", json={"email": email, "password": "Aa1!aaaa"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_notification_badge_follows_create_read_and_delete(client, db_session):
+    me = create_user(client, "badge_noti", "badge_noti@example.com")
+    other = create_user(client, "badge_noti_other", "badge_noti_other@example.com")
+    headers = login(client, "badge_noti@example.com")
+
+    start = client.get("/me/badges", headers=headers).json()["unread_notifications"]
+
+    mine = models.Notification(title="Like", message="liked", sender_id=other['uid'], receiver_id=me['uid'], target_role="user")
+    broadcast = models.Notification(title="All", message="hello everyone", sender_id=other['uid'], target_role="user")
+    theirs = models.Notification(title="Like", message="liked", sender_id=me['uid'], receiver_id=other['uid'], target_role="user")
+    admins_only = models.Notification(title="ReportPost", message="report", sender_id=other['uid'], target_role="admin")
+    db_session.add_all([mine, broadcast, theirs, admins_only])
+    db_session.commit()
+
+    assert client.get("/me/badges", headers=headers).json()["unread_notifications"] == start + 2
+
+    client.post(f"/notification/{mine.id}/read", headers=headers)
+    assert client.get("/me/badges", headers=headers).json()["unread_notifications"] == start + 1
+
+    db_session.delete(broadcast)
+    db_session.commit()
+    counts = client.get("/me/badges", headers=headers).json()
+    assert counts["unread_notifications"] == start
+    assert client.get("/notification/me/unread/count", headers=headers).json()["unread_count"] == start
+
+
+def test_deleting_a_read_notification_keeps_the_readers_badge(client, db_session):
+    owner = create_user(client, "badge_read_owner", "badge_read_owner@example.com")
+    create_user(client, "badge_read_liker", "badge_read_liker@example.com")
+    db_session.add(models.Forum(fid=601, forum_name="Badge Forum"))
+    db_session.commit()
+    owner_headers = login(client, "badge_read_owner@example.com")
+    liker_headers = login(client, "badge_read_liker@example.com")
+    pid = client.post("/posts/", data={"post_content": "like me", "forum_id": "601"}, headers=owner_headers).json()["pid"]
+    start = client.get("/me/badges", headers=owner_headers).json()["unread_notifications"]
+
+    other = models.Notification(title="Follow", message="followed", receiver_id=owner['uid'], target_role="user")
+    db_session.add(other)
+    db_session.commit()
+    client.post(f"/posts/{pid}/like", headers=liker_headers)
+    like = db_session.query(models.Notification).filter_by(title="Like", receiver_id=owner['uid']).one()
+    client.post(f"/notification/{like.id}/read", headers=owner_headers)
+    assert client.get("/me/badges", headers=owner_headers).json()["unread_notifications"] == start + 1
+
+    # unliking deletes the notification the owner has already read
+    assert client.post(f"/posts/{pid}/like", headers=liker_headers).json()["message"] == "Like removed"
+    assert client.get("/me/badges", headers=owner_headers).json()["unread_notifications"] == start + 1
+    assert client.get("/notification/me/unread/count", headers=owner_headers).json()["unread_count"] == start + 1
+
+
+def test_chat_badge_and_inbox_counters(client, db_session):
+    a = create_user(client, "badge_chat_a", "badge_chat_a@example.com")
+    b = create_user(client, "badge_chat_b", "badge_chat_b@example.com")
+    db_session.add(models.Follow(follower_id=a['uid'], following_id=b['uid']))
+    db_session.add(models.Follow(follower_id=b['uid'], following_id=a['uid']))
+    db_session.commit()
+    chat_id = client.post(f"/chats/with/{b['uid']}", params={"me_id": a['uid']}).json()['chat_id']
+    a_headers = login(client, "badge_chat_a@example.com")
+    assert client.get("/me/badges", headers=a_headers).json()["unread_messages"] == 0
+
+    for text in ("hi", "are you there?"):
+        client.post(f"/chats/{chat_id}/messages", params={"me_id": b['uid']}, json={"text": text})
+    client.post(f"/chats/{chat_id}/messages", params={"me_id": a['uid']}, json={"text": "yes"})
+
+    assert client.get("/me/badges", headers=a_headers).json()["unread_messages"] == 2
+    inbox = {c["id"]: c for c in client.get("/chats", params={"me_id": a['uid']}).json()}
+    assert inbox[chat_id]["unread"] == 2
+    inbox_b = {c["id"]: c for c in client.get("/chats", params={"me_id": b['uid']}).json()}
+    assert inbox_b[chat_id]["unread"] == 1
+
+    assert client.post(f"/chats/{chat_id}/read", params={"me_id": a['uid']}).status_code == 200
+    assert client.get("/me/badges", headers=a_headers).json()["unread_messages"] == 0
+    inbox = {c["id"]: c for c in client.get("/chats", params={"me_id": a['uid']}).json()}
+    assert inbox[chat_id]["unread"] == 0
+
+
+def test_new_users_get_a_badge_row_counting_earlier_broadcasts(client, db_session):
+    db_session.add(models.Notification(title="All", message="before you joined", target_role="user"))
+    db_session.commit()
+    broadcasts = db_session.query(models.Notification).filter(models.Notification.title.in_(("All", "all"))).count()
+
+    me = create_user(client, "badge_new", "badge_new@example.com")
+    row = db_session.get(models.UserBadge, me['uid'])
+    assert row is not None
+    assert row.unread_notifications == broadcasts
+    assert row.unread_messages == 0
+
+
+def test_badge_poll_is_a_single_primary_key_read(client, db_session):
+    create_user(client, "badge_poll", "badge_poll@example.com")
+    headers = login(client, "badge_poll@example.com")
+    client.get("/me/badges", headers=headers)     # warms the identity cache
+
+    statements = []
+
+    def count_statement(*args):
+        statements.append(args[2])
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", count_statement)
+    try:
+        assert client.get("/me/badges", headers=headers).status_code == 200
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", count_statement)
+    assert len(statements) == 1
+    assert "user_badges" in statements[0]
+
+
+def test_recount_repairs_drifted_counters(client, db_session):
+    a = create_user(client, "badge_fix_a", "badge_fix_a@example.com")
+    b = create_user(client, "badge_fix_b", "badge_fix_b@example.com")
+    chat = models.Chat(user1_id=min(a['uid'], b['uid']), user2_id=max(a['uid'], b['uid']))
+    db_session.add(chat)
+    db_session.commit()
+    db_session.add(models.ChatMessage(chat_id=chat.id, sender_id=b['uid'], kind="text", text="one"))
+    db_session.commit()
+
+    headers = login(client, "badge_fix_a@example.com")
+    assert client.get("/me/badges", headers=headers).json()["unread_messages"] == 1
+
+    read, unread = (
+        models.Notification(title="Like", message=m, sender_id=b['uid'], receiver_id=a['uid'], target_role="user")
+        for m in ("read", "unread")
+    )
+    db_session.add_all([read, unread])
+    db_session.commit()
+    client.post(f"/notification/{read.id}/read", headers=headers)
+    expected = client.get("/me/badges", headers=headers).json()["unread_notifications"]
+    assert expected == notifications.unread_count(db_session, a['uid'], False)
+
+    chat.user1_unread = chat.user2_unread = 7
+    db_session.query(models.UserBadge).filter_by(uid=a['uid']).update({"unread_messages": 9, "unread_notifications": 40})
+    db_session.commit()
+
+    badges.recount(db_session)
+    db_session.commit()
+    db_session.expire_all()
+    counts = client.get("/me/badges", headers=headers).json()
+    assert counts["unread_messages"] == 1
+    assert counts["unread_notifications"] == expected
+    side = "user1_unread" if chat.user1_id == a['uid'] else "user2_unread"
+    assert getattr(db_session.get(models.Chat, chat.id), side) == 1
@@ -1,5 +1,7 @@
 import io
 import os
+
+import pytest
 from app import models
 
 
@@ -135,3 +137,220 @@ def test_get_all_chats_for_user(client, db_session):
     assert res.status_code == 200
     chats = res.json()
     assert isinstance(chats, list)
+
+
+def test_new_message_reaches_every_open_socket(client, db_session):
+    a = create_user(client, "chat_ws_a", "chat_ws_a@example.com")
+    b = create_user(client, "chat_ws_b", "chat_ws_b@example.com")
+    db_session.add(models.Follow(follower_id=a['uid'], following_id=b['uid']))
+    db_session.add(models.Follow(follower_id=b['uid'], following_id=a['uid']))
+    db_session.commit()
+    chat_id = client.post(f"/chats/with/{b['uid']}", params={"me_id": a['uid']}).json()['chat_id']
+    token = client.post("/login", json={"email": "chat_ws_b@example.com", "password": "Aa1!aaaa"}).json()["access_token"]
+
+    # two tabs for b: the second must not replace the first
+    with client.websocket_connect(f"/chats/ws/{b['uid']}?token={token}") as tab1, \
+            client.websocket_connect(f"/chats/ws/{b['uid']}?token={token}") as tab2:
+        r = client.post(f"/chats/{chat_id}/messages", params={"me_id": a['uid']}, json={"text": "hi both"})
+        assert r.status_code == 200
+
+        for ws in (tab1, tab2):
+            # only which chat changed; the contents come from the messages endpoint
+            assert ws.receive_json() == {"type": "new_message", "chat_id": chat_id}
+
+
+def test_chat_socket_rejects_missing_or_foreign_tokens(client, db_session):
+    from starlette.websockets import WebSocketDisconnect
+
+    a = create_user(client, "chat_ws_owner", "chat_ws_owner@example.com")
+    b = create_user(client, "chat_ws_snoop", "chat_ws_snoop@example.com")
+    snoop_token = client.post("/login", json={"email": "chat_ws_snoop@example.com", "password": "Aa1!aaaa"}).json()["access_token"]
+
+    for url in (
+        f"/chats/ws/{a['uid']}",
+        f"/chats/ws/{a['uid']}?token=not-a-token",
+        f"/chats/ws/{a['uid']}?token={snoop_token}",
+    ):
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect(url) as ws:
+                ws.receive_json()
+
+
+def test_hub_disconnects_slow_consumer():
+    import asyncio
+    from app.realtime import LocalHub, SLOW_CONSUMER_CLOSE_CODE
+
+    class StuckSocket:
+        closed_with = None
+
+        async def accept(self):
+            pass
+
+        async def send_json(self, data):
+            await asyncio.sleep(3600)
+
+        async def close(self, code=1000):
+            self.closed_with = code
+
+    async def scenario():
+        hub = LocalHub(queue_size=1)
+        ws = StuckSocket()
+        await hub.connect(7, ws)
+        await asyncio.sleep(0)  # sender picks up the first event and blocks
+
+        for i in range(3):
+            await hub.publish([7], {"n": i})
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return hub, ws
+
+    hub, ws = asyncio.run(scenario())
+    assert hub.connection_count(7) == 0
+    assert ws.closed_with == SLOW_CONSUMER_CLOSE_CODE
+
+
+def test_mutual_follow_opens_chat_and_inbox_is_one_query(client, db_session):
+    from sqlalchemy import event
+
+    me = create_user(client, "inbox_me", "inbox_me@example.com")
+    token = client.post("/login", json={"email": "inbox_me@example.com", "password": "Aa1!aaaa"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    friends = [create_user(client, f"inbox_f{i}", f"inbox_f{i}@example.com") for i in range(3)]
+    for f in friends:
+        db_session.add(models.Follow(follower_id=f['uid'], following_id=me['uid']))
+    db_session.commit()
+
+    # following back makes it mutual -> the room exists before anyone opens the inbox
+    for f in friends:
+        assert client.post(f"/users/{f['uid']}/follow", headers=headers).status_code == 201
+    chats = {
+        c.user1_id if c.user2_id == me['uid'] else c.user2_id: c.id
+        for c in db_session.query(models.Chat).filter(
+            (models.Chat.user1_id == me['uid']) | (models.Chat.user2_id == me['uid'])
+        )
+    }
+    assert set(chats) == {f['uid'] for f in friends}
+
+    first, second = friends[0]['uid'], friends[1]['uid']
+    client.post(f"/chats/{chats[first]}/messages", params={"me_id": first}, json={"text": "one"})
+    client.post(f"/chats/{chats[first]}/messages", params={"me_id": first}, json={"text": "two"})
+    client.post(f"/chats/{chats[second]}/messages", params={"me_id": me['uid']}, json={"text": "mine"})
+
+    statements = []
+
+    def count_statement(*args):
+        statements.append(args[2])
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", count_statement)
+    try:
+        res = client.get("/chats", params={"me_id": me['uid']})
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", count_statement)
+
+    assert res.status_code == 200
+    assert len(statements) == 1
+    inbox = {c["id"]: c for c in res.json()}
+    assert len(inbox) == 3
+    assert inbox[chats[first]]["lastMessage"] == "two"
+    assert inbox[chats[first]]["unread"] == 2
+    assert inbox[chats[second]]["lastMessage"] == "mine"
+    assert inbox[chats[second]]["unread"] == 0
+    assert inbox[chats[friends[2]['uid']]]["last_ts"] is None
+    assert inbox[chats[friends[2]['uid']]]["lastMessage"] == ""
+
+
+def test_message_history_keyset_pages(client, db_session):
+    from datetime import datetime, timedelta
+
+    a = create_user(client, "hist_a", "hist_a@example.com")
+    b = create_user(client, "hist_b", "hist_b@example.com")
+    db_session.add(models.Follow(follower_id=a['uid'], following_id=b['uid']))
+    db_session.add(models.Follow(follower_id=b['uid'], following_id=a['uid']))
+    db_session.commit()
+    chat_id = client.post(f"/chats/with/{b['uid']}", params={"me_id": a['uid']}).json()['chat_id']
+
+    # pairs of messages share a timestamp, so ordering has to fall back to id
+    base = datetime(2024, 1, 1)
+    for i in range(7):
+        db_session.add(models.ChatMessage(
+            chat_id=chat_id, sender_id=a['uid'], kind="text", text=f"m{i}",
+            created_at=base + timedelta(minutes=i // 2),
+        ))
+    db_session.commit()
+
+    url = f"/chats/{chat_id}/messages"
+    first = client.get(url, params={"me_id": b['uid'], "limit": 3})
+    assert first.status_code == 200
+    assert [m["text"] for m in first.json()] == ["m4", "m5", "m6"]
+
+    second = client.get(url, params={"me_id": b['uid'], "limit": 3, "before": first.headers["X-Next-Cursor"]})
+    assert [m["text"] for m in second.json()] == ["m1", "m2", "m3"]
+
+    last = client.get(url, params={"me_id": b['uid'], "limit": 3, "before": second.headers["X-Next-Cursor"]})
+    assert [m["text"] for m in last.json()] == ["m0"]
+    assert "X-Next-Cursor" not in last.headers
+
+    # gap fill: everything after m1, in two pages
+    cursor = second.headers["X-Next-Cursor"]  # points at m1
+    newer = client.get(url, params={"me_id": b['uid'], "limit": 4, "after": cursor})
+    assert [m["text"] for m in newer.json()] == ["m2", "m3", "m4", "m5"]
+    rest = client.get(url, params={"me_id": b['uid'], "limit": 4, "after": newer.headers["X-Newer-Cursor"]})
+    assert [m["text"] for m in rest.json()] == ["m6"]
+    assert "X-Newer-Cursor" not in rest.headers
+
+    outsider = create_user(client, "hist_c", "hist_c@example.com")
+    assert client.get(url, params={"me_id": outsider['uid']}).status_code == 403
+    assert client.get(url, params={"me_id": b['uid'], "before": "bogus"}).status_code == 400
+
+
+def test_postgres_hub_chunks_events_too_big_for_one_notify():
+    import asyncio
+    from contextlib import asynccontextmanager
+    from app.realtime import MAX_NOTIFY_PAYLOAD, NOTIFY_CHANNEL, PostgresHub
+
+    notified = []
+
+    class FakeConnection:
+        @asynccontextmanager
+        async def transaction(self):
+            yield
+
+        async def execute(self, query, channel, payload):
+            assert len(payload.encode()) < MAX_NOTIFY_PAYLOAD
+            notified.append(payload)
+
+    class FakePool(FakeConnection):
+        @asynccontextmanager
+        async def acquire(self):
+            yield FakeConnection()
+
+    class Socket:
+        def __init__(self):
+            self.sent = []
+
+        async def accept(self):
+            pass
+
+        async def send_json(self, data):
+            self.sent.append(data)
+
+    big = {"type": "new_message", "text": 'quoted "text" \\ ' * 2000}
+
+    async def scenario():
+        sender, receiver = PostgresHub("postgresql://unused"), PostgresHub("postgresql://unused")
+        sender._publish_pool = FakePool()
+        ws = Socket()
+        await receiver.connect(5, ws)
+
+        await sender.publish([5], {"type": "unread", "n": 1})
+        await sender.publish([5], big)
+        assert len(notified) > 2
+        # Every worker, the sender included, only delivers what arrives over LISTEN
+        for payload in notified:
+            receiver._on_notify(None, 0, NOTIFY_CHANNEL, payload)
+        await asyncio.sleep(0)
+        return ws
+
+    ws = asyncio.run(scenario())
+    assert ws.sent == [{"type": "unread", "n": 1}, big]
@@ -0,0 +1,41 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+
+from app import database, feed, models
+from app.database import Base
+
+
+def test_run_db_uses_threadpool_for_sync_session(db_session):
+    count = asyncio.run(database.run_db(db_session, lambda s: s.query(models.Forum).count()))
+    assert isinstance(count, int)
+
+
+def test_run_db_runs_sync_code_on_async_session(tmp_path):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    db_file = tmp_path / "async.db"
+    sync_engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=sync_engine)
+    with sync_engine.begin() as conn:
+        conn.execute(models.User.__table__.insert().values(uid=1, username="async_u", email="async_u@example.com", created_at=datetime(2024, 1, 1)))
+        conn.execute(models.Forum.__table__.insert().values(fid=1, forum_name="Async"))
+        conn.execute(models.Post.__table__.insert().values(pid=1, post_content="hi", forum_id=1, user_id=1, created_at=datetime(2024, 1, 1)))
+    sync_engine.dispose()
+
+    async def load_feed():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                def load(s):
+                    posts = s.query(models.Post).options(*feed.POST_FEED_OPTIONS).all()
+                    return feed.build_post_responses(s, posts, viewer_uid=1)
+                return await database.run_db(db, load)
+        finally:
+            await engine.dispose()
+
+    posts = asyncio.run(load_feed())
+    assert [(p.pid, p.username) for p in posts] == [(1, "async_u")]
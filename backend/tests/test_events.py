@@ -0,0 +1,169 @@
+import io
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app import config, models
+
+
+def create_user(client, username, email):
+    payload = {"username": username, "email": email, "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    r = client.post("/users/", json=payload)
+    assert r.status_code == 201
+    return r.json()
+
+
+def login_token(client, email):
+    return client.post("/login", json={"email": email, "password": "Aa1!aaaa"}).json()["access_token"]
+
+
+def until(ws, kind):
+    """Read (and return) messages up to and including the first of type `kind`."""
+    seen = []
+    while True:
+        data = ws.receive_json()
+        seen.append(data)
+        if data["type"] == kind:
+            return seen
+
+
+def test_event_socket_pushes_notifications_unread_counts_and_messages(client, db_session):
+    me = create_user(client, "events_me", "events_me@example.com")
+    friend = create_user(client, "events_friend", "events_friend@example.com")
+    db_session.add(models.Follow(follower_id=me['uid'], following_id=friend['uid']))
+    db_session.add(models.Follow(follower_id=friend['uid'], following_id=me['uid']))
+    db_session.commit()
+    chat_id = client.post(f"/chats/with/{friend['uid']}", params={"me_id": me['uid']}).json()['chat_id']
+    token = login_token(client, "events_me@example.com")
+
+    with client.websocket_connect(f"/ws/events?token={token}") as ws:
+        hello = until(ws, "ready")
+        assert hello[-2]["type"] == "unread"
+        start = hello[-2]["unread_notifications"]
+
+        db_session.add(models.Notification(
+            title="Like", message="liked your post", sender_id=friend['uid'], receiver_id=me['uid'], target_role="user",
+        ))
+        db_session.commit()
+        noti = ws.receive_json()
+        assert noti["type"] == "notification"
+        assert noti["notification"]["message"] == "liked your post"
+        assert noti["notification"]["sender_username"] == "events_friend"
+        assert ws.receive_json() == {
+            "type": "unread", "unread_notifications": start + 1, "unread_messages": hello[-2]["unread_messages"],
+        }
+
+        r = client.post(f"/chats/{chat_id}/messages", params={"me_id": friend['uid']}, json={"text": "ping"})
+        assert r.status_code == 200
+        message = ws.receive_json()
+        assert message["type"] == "new_message"
+        assert message["chat_id"] == chat_id
+        assert message["from_user_id"] == friend['uid']
+        assert message["message"]["text"] == "ping"
+        assert message["id"] > noti["id"]
+        assert ws.receive_json()["unread_messages"] == hello[-2]["unread_messages"] + 1
+
+        files = {"files": ("notes.txt", io.BytesIO(b"notes"), "text/plain")}
+        up = client.post(f"/chats/{chat_id}/upload", params={"me_id": friend['uid']}, files=files)
+        upload = until(ws, "new_message")[-1]
+        assert upload["message"]["id"] == up.json()["message_id"]
+        assert [a["name"] for a in upload["message"]["attachments"]] == ["notes.txt"]
+
+        client.delete(f"/chats/{chat_id}/messages/{message['message']['id']}", params={"me_id": friend['uid']})
+        deleted = until(ws, "message_deleted")[-1]
+        assert deleted["message_id"] == message["message"]["id"]
+
+
+def test_reconnect_replays_missed_events_in_order(client, db_session):
+    me = create_user(client, "events_resume", "events_resume@example.com")
+    other = create_user(client, "events_resume_other", "events_resume_other@example.com")
+    token = login_token(client, "events_resume@example.com")
+
+    with client.websocket_connect(f"/ws/events?token={token}") as ws:
+        last_event_id = until(ws, "ready")[-1]["last_event_id"]
+
+    db_session.add(models.Notification(title="Follow", message="mine", sender_id=other['uid'], receiver_id=me['uid'], target_role="user"))
+    db_session.add(models.Notification(title="Follow", message="theirs", sender_id=me['uid'], receiver_id=other['uid'], target_role="user"))
+    db_session.commit()
+    db_session.add(models.Notification(title="All", message="everyone", sender_id=other['uid'], target_role="user"))
+    db_session.commit()
+    db_session.add(models.Notification(title="Follow", message="rolled back", sender_id=other['uid'], receiver_id=me['uid'], target_role="user"))
+    db_session.flush()
+    db_session.rollback()
+
+    with client.websocket_connect(f"/ws/events?token={token}&last_event_id={last_event_id}") as ws:
+        backlog = until(ws, "ready")
+    # Events at or below last_event_id are the resume overlap; the client already has them
+    replayed = [m for m in backlog if m["type"] == "notification" and m["id"] > last_event_id]
+    assert [m["notification"]["message"] for m in replayed] == ["mine", "everyone"]
+    assert replayed[0]["id"] < replayed[1]["id"]
+    assert backlog[-1]["last_event_id"] == replayed[-1]["id"]
+
+
+def test_reconnect_replays_an_event_committed_after_a_higher_id(client, db_session):
+    me = create_user(client, "events_late", "events_late@example.com")
+    other = create_user(client, "events_late_other", "events_late_other@example.com")
+    token = login_token(client, "events_late@example.com")
+
+    def notification(message):
+        return {"notification": {"message": message}}
+
+    early = models.UserEvent(user_id=other['uid'], type="notification", payload=notification("placeholder"))
+    db_session.add(early)
+    db_session.commit()
+    seen = models.UserEvent(user_id=me['uid'], type="notification", payload=notification("seen"))
+    db_session.add(seen)
+    db_session.commit()
+    # The transaction holding the lower id commits after the client saw `seen`
+    late_id = early.id
+    db_session.delete(early)
+    db_session.commit()
+    db_session.add(models.UserEvent(id=late_id, user_id=me['uid'], type="notification", payload=notification("late")))
+    db_session.commit()
+
+    with client.websocket_connect(f"/ws/events?token={token}&last_event_id={seen.id}") as ws:
+        backlog = until(ws, "ready")
+    replayed = {m["id"]: m["notification"]["message"] for m in backlog if m["type"] == "notification"}
+    assert replayed[late_id] == "late"
+    assert replayed[seen.id] == "seen"
+    assert backlog[-1]["last_event_id"] == seen.id
+
+
+def test_reconnect_too_far_behind_is_told_to_resync(client, db_session, monkeypatch):
+    me = create_user(client, "events_resync", "events_resync@example.com")
+    token = login_token(client, "events_resync@example.com")
+    with client.websocket_connect(f"/ws/events?token={token}") as ws:
+        last_event_id = until(ws, "ready")[-1]["last_event_id"]
+
+    for i in range(3):
+        db_session.add(models.Notification(title="Like", message=f"n{i}", receiver_id=me['uid'], target_role="user"))
+    db_session.commit()
+
+    monkeypatch.setattr(config, "EVENT_REPLAY_LIMIT", 2)
+    with client.websocket_connect(f"/ws/events?token={token}&last_event_id={last_event_id}") as ws:
+        backlog = until(ws, "ready")
+    assert [m["type"] for m in backlog] == ["resync", "unread", "ready"]
+
+
+def test_scheduler_prunes_events_past_the_retention_window(db_session):
+    from datetime import datetime, timedelta, timezone
+
+    from app import scheduler
+
+    now = datetime.now(timezone.utc)
+    old = models.UserEvent(type="unread", payload={}, created_at=now - timedelta(hours=config.EVENT_RETENTION_HOURS + 1))
+    recent = models.UserEvent(type="unread", payload={}, created_at=now)
+    db_session.add_all([old, recent])
+    db_session.commit()
+    old_id, recent_id = old.id, recent.id
+
+    prune = next(job for job in scheduler.default_jobs() if job.name == "event-prune")
+    assert scheduler.run_job(prune, lambda: db_session) >= 1
+    assert db_session.get(models.UserEvent, old_id) is None
+    assert db_session.get(models.UserEvent, recent_id) is not None
+
+
+def test_event_socket_requires_a_valid_token(client):
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/ws/events?token=not-a-token") as ws:
+            ws.receive_json()
@@ -0,0 +1,80 @@
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from app import config, google_oauth, models
+from google_stub import GoogleStub
+
+
+@pytest.fixture()
+def google(monkeypatch):
+    stub = GoogleStub(client_id="test-client.apps.googleusercontent.com").start()
+    monkeypatch.setattr(config, "GOOGLE_CLIENT_ID", stub.client_id)
+    monkeypatch.setattr(config, "GOOGLE_CLIENT_SECRET", "test-secret")
+    monkeypatch.setattr(config, "GOOGLE_TOKEN_URL", f"{stub.url}/token")
+    monkeypatch.setattr(config, "GOOGLE_USERINFO_URL", f"{stub.url}/userinfo")
+    monkeypatch.setattr(config, "GOOGLE_DISCOVERY_URL", f"{stub.url}/.well-known/openid-configuration")
+    google_oauth.client.clear_cache()
+    yield stub
+    google_oauth.client.clear_cache()
+    stub.stop()
+
+
+def callback(client, code):
+    res = client.get("/auth/google/callback", params={"code": code}, follow_redirects=False)
+    return res, {k: v[0] for k, v in parse_qs(urlparse(res.headers.get("location", "")).query).items()}
+
+
+def test_google_login_verifies_id_token_locally_and_caches_keys(client, db_session, google):
+    res, params = callback(client, google.issue_code("g-sub-1", "google_one@example.com"))
+    assert res.status_code == 307
+    assert params["new_user"] == "true"
+    user = db_session.query(models.User).filter_by(oauth_id="g-sub-1").one()
+    assert user.email == "google_one@example.com"
+    assert int(params["uid"]) == user.uid
+
+    res, params = callback(client, google.issue_code("g-sub-1", "google_one@example.com"))
+    assert params["new_user"] == "false"
+
+    assert google.hits["/token"] == 2
+    assert google.hits["/.well-known/openid-configuration"] == 1
+    assert google.hits["/certs"] == 1
+    assert google.hits["/userinfo"] == 0
+
+
+def test_google_login_refreshes_keys_after_rotation(client, google, monkeypatch):
+    assert callback(client, google.issue_code("g-sub-rot", "google_rot@example.com"))[0].status_code == 307
+
+    google.rotate_key()
+    monkeypatch.setattr(google_oauth, "JWKS_MIN_REFRESH_SECONDS", 0)
+    assert callback(client, google.issue_code("g-sub-rot", "google_rot@example.com"))[0].status_code == 307
+    assert google.hits["/certs"] == 2
+
+
+def test_google_login_rejects_token_for_another_client(client, google, monkeypatch):
+    code = google.issue_code("g-sub-aud", "google_aud@example.com")
+    real_id_token = google.id_token
+    monkeypatch.setattr(google, "id_token", lambda claims: real_id_token(claims, aud="someone-else"))
+
+    res, _ = callback(client, code)
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Invalid Google ID token"
+
+
+def test_google_login_falls_back_to_userinfo_and_reports_bad_codes(client, google):
+    google.include_id_token = False
+    res, params = callback(client, google.issue_code("g-sub-ui", "google_ui@example.com", picture="http://pic"))
+    assert res.status_code == 307
+    assert params["email"] == "google_ui@example.com"
+    assert google.hits["/userinfo"] == 1
+
+    res, _ = callback(client, "not-a-real-code")
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Failed to retrieve Google token"
+
+
+def test_google_unreachable_is_a_bad_gateway(client, google, monkeypatch):
+    monkeypatch.setattr(config, "GOOGLE_TOKEN_URL", "http://127.0.0.1:9/token")
+    monkeypatch.setattr(config, "GOOGLE_HTTP_RETRIES", 0)
+    res, _ = callback(client, google.issue_code("g-sub-down", "google_down@example.com"))
+    assert res.status_code == 502
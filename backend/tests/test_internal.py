@@ -0,0 +1,60 @@
+from app import database, models
+
+
+def test_db_pool_status_requires_admin(client):
+    user = {"username": "pool_user", "email": "pool_user@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    client.post("/users/", json=user)
+    token = client.post("/login", json={"email": user["email"], "password": "Aa1!aaaa"}).json()["access_token"]
+
+    res = client.get("/internal/db-pool", headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 403
+
+
+def test_db_pool_status_for_admin(client, db_session):
+    user = {"username": "pool_admin", "email": "pool_admin@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    uid = client.post("/users/", json=user).json()["uid"]
+    db_session.query(models.User).filter(models.User.uid == uid).update({"is_admin": True})
+    db_session.commit()
+    token = client.post("/login", json={"email": user["email"], "password": "Aa1!aaaa"}).json()["access_token"]
+
+    res = client.get("/internal/db-pool", headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    body = res.json()
+    for key in ("size", "checked_out", "overflow", "checkouts", "timeouts", "wait_seconds_max"):
+        assert key in body
+
+
+def test_pool_stats_records_waits():
+    stats = database.PoolStats()
+    stats.record(0.5)
+    stats.record(1.5)
+    stats.record(2.0, timed_out=True)
+    snap = stats.snapshot()
+    assert snap["checkouts"] == 2
+    assert snap["timeouts"] == 1
+    assert snap["wait_seconds_max"] == 2.0
+
+
+def test_instrumented_pool_counts_checkouts_and_timeouts(tmp_path):
+    import pytest
+    from sqlalchemy import create_engine, exc, text
+
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=database.InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    before = database.pool_stats.snapshot()
+
+    held = engine.connect()
+    held.execute(text("SELECT 1"))
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    held.close()
+    engine.dispose()
+
+    after = database.pool_stats.snapshot()
+    assert after["checkouts"] == before["checkouts"] + 1
+    assert after["timeouts"] == before["timeouts"] + 1
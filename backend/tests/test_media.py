@@ -0,0 +1,255 @@
+import hashlib
+import io
+import os
+
+from app import config, media, models
+
+
+def create_user(client, username, email):
+    payload = {"username": username, "email": email, "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    r = client.post("/users/", json=payload)
+    assert r.status_code == 201
+    return r.json()
+
+
+def make_friends_chat(client, db_session, a, b):
+    db_session.add(models.Follow(follower_id=a['uid'], following_id=b['uid']))
+    db_session.add(models.Follow(follower_id=b['uid'], following_id=a['uid']))
+    db_session.commit()
+    return client.post(f"/chats/with/{b['uid']}", params={"me_id": a['uid']}).json()['chat_id']
+
+
+def blob_for(db_session, url_or_path):
+    db_session.expire_all()
+    return db_session.query(models.MediaBlob).filter_by(path=media.relative_path(url_or_path)).one()
+
+
+def test_same_content_is_stored_once_and_forward_adds_a_reference(client, db_session):
+    a = create_user(client, "media_a", "media_a@example.com")
+    b = create_user(client, "media_b", "media_b@example.com")
+    c = create_user(client, "media_c", "media_c@example.com")
+    chat_ab = make_friends_chat(client, db_session, a, b)
+    chat_ac = make_friends_chat(client, db_session, a, c)
+
+    content = b"the same meme, sent twice"
+    urls = []
+    for chat_id, name in ((chat_ab, "meme.png"), (chat_ac, "meme-copy.png")):
+        up = client.post(
+            f"/chats/{chat_id}/upload",
+            params={"me_id": a['uid']},
+            files={"files": (name, io.BytesIO(content), "image/png")},
+        )
+        assert up.status_code == 200
+        urls.append(up.json()["attachments"][0]["url"])
+
+    assert urls[0] == urls[1]
+    assert urls[0].startswith("/uploads/blobs/")
+    blob = blob_for(db_session, urls[0])
+    assert blob.ref_count == 2
+    assert blob.size == len(content)
+    assert os.path.exists(os.path.join(config.UPLOAD_ROOT, media.relative_path(urls[0])))
+
+    src = db_session.query(models.ChatMessage).filter_by(chat_id=chat_ab).order_by(models.ChatMessage.id.desc()).first()
+    fwd = client.post(f"/chats/{chat_ac}/forward", params={"me_id": a['uid']}, json={"source_message_id": src.id})
+    assert fwd.status_code == 200, fwd.text
+    assert fwd.json()["attachments"][0]["url"] == urls[0]
+    assert blob_for(db_session, urls[0]).ref_count == 3
+
+
+def test_garbage_collection_keeps_referenced_blobs(client, db_session):
+    payload = {"username": "media_gc", "email": "media_gc@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    client.post("/users/", json=payload)
+    token = client.post("/login", json={"email": payload["email"], "password": "Aa1!aaaa"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def upload_avatar(data):
+        res = client.post("/users/upload-avatar", files={"file": ("me.png", io.BytesIO(data), "image/png")}, headers=headers)
+        assert res.status_code == 200
+        return res.json()["filename"]
+
+    old = upload_avatar(b"first avatar for gc")
+    new = upload_avatar(b"second avatar for gc")
+    assert blob_for(db_session, old).ref_count == 0
+    assert blob_for(db_session, new).ref_count == 1
+
+    # a stray file from an upload whose transaction never committed
+    stray = os.path.join(config.UPLOAD_ROOT, media.BLOB_DIR, "zz", "zz", "stray.bin")
+    os.makedirs(os.path.dirname(stray), exist_ok=True)
+    with open(stray, "wb") as fh:
+        fh.write(b"orphan")
+
+    media.collect_garbage(db_session, grace_seconds=0)
+    db_session.commit()
+
+    assert not os.path.exists(os.path.join(config.UPLOAD_ROOT, media.relative_path(old)))
+    assert db_session.query(models.MediaBlob).filter_by(path=media.relative_path(old)).first() is None
+    assert not os.path.exists(stray)
+    assert os.path.exists(os.path.join(config.UPLOAD_ROOT, media.relative_path(new)))
+    assert blob_for(db_session, new).ref_count == 1
+
+
+def test_concurrent_first_upload_under_another_extension_keeps_one_file(client, db_session, monkeypatch):
+    a = create_user(client, "media_race", "media_race@example.com")
+    b = create_user(client, "media_race_b", "media_race_b@example.com")
+    chat_id = make_friends_chat(client, db_session, a, b)
+    data = b"same bytes, two names"
+    sha = hashlib.sha256(data).hexdigest()
+    theirs = media.blob_path(sha, ".jpeg")
+    real_blob_path = media.blob_path
+
+    def blob_path_after_other_upload(sha256, ext):
+        # the other request stores and commits between our lookup and our insert
+        disk = os.path.join(config.UPLOAD_ROOT, *theirs.split("/"))
+        os.makedirs(os.path.dirname(disk), exist_ok=True)
+        with open(disk, "wb") as fh:
+            fh.write(data)
+        db_session.add(models.MediaBlob(sha256=sha256, path=theirs, size=len(data), content_type="image/jpeg", ref_count=1))
+        db_session.commit()
+        return real_blob_path(sha256, ext)
+
+    monkeypatch.setattr(media, "blob_path", blob_path_after_other_upload)
+    res = client.post(
+        f"/chats/{chat_id}/upload",
+        params={"me_id": a['uid']},
+        files={"files": ("mine.png", io.BytesIO(data), "image/png")},
+    )
+    assert res.status_code == 200
+
+    assert res.json()["attachments"][0]["url"] == media.url_for(theirs)
+    assert blob_for(db_session, theirs).ref_count == 2
+    assert os.path.exists(os.path.join(config.UPLOAD_ROOT, *theirs.split("/")))
+    assert not os.path.exists(os.path.join(config.UPLOAD_ROOT, *real_blob_path(sha, ".png").split("/")))
+
+
+def test_committed_image_uploads_are_queued_for_variants(client, db_session, monkeypatch):
+    from app import imaging
+
+    queued = []
+    monkeypatch.setattr(imaging, "schedule", lambda blobs: queued.extend(blobs))
+
+    payload = {"username": "media_variants", "email": "media_variants@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    client.post("/users/", json=payload)
+    token = client.post("/login", json={"email": payload["email"], "password": "Aa1!aaaa"}).json()["access_token"]
+    res = client.post(
+        "/users/upload-avatar",
+        files={"file": ("v.png", io.BytesIO(b"avatar needing variants"), "image/png")},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert res.status_code == 200
+    assert [path for _, path in queued] == [media.relative_path(res.json()["filename"])]
+
+
+def test_feed_links_smallest_suitable_variant(client, db_session, monkeypatch):
+    monkeypatch.setattr(config, "MEDIA_PREVIEW_WIDTH", 300)
+
+    db_session.add(models.Forum(fid=109, forum_name="Test Forum 11"))
+    sha = "ab" * 32
+    blob = models.MediaBlob(sha256=sha, path=media.blob_path(sha, ".jpg"), size=5000, content_type="image/jpeg", ref_count=1)
+    db_session.add(blob)
+    for width, fmt in [(160, "webp"), (320, "jpg"), (320, "webp"), (640, "webp")]:
+        db_session.add(models.MediaVariant(
+            blob_sha256=sha, width=width, format=fmt, height=width,
+            path=f"variants/ab/ab/{sha}_w{width}.{fmt}", size=width,
+        ))
+    db_session.commit()
+
+    payload = {"username": "media_feed", "email": "media_feed@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    uid = client.post("/users/", json=payload).json()["uid"]
+    token = client.post("/login", json={"email": payload["email"], "password": "Aa1!aaaa"}).json()["access_token"]
+    post = models.Post(post_content="with photo", forum_id=109, user_id=uid)
+    db_session.add(post)
+    db_session.flush()
+    db_session.add(models.PostImage(post_id=post.pid, path=media.url_for(blob.path), file_type="image"))
+    db_session.commit()
+
+    res = client.get("/posts/forum/109", headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    image = res.json()[0]["images"][0]
+    assert image["path"] == media.url_for(blob.path)
+    assert image["preview_path"] == f"/uploads/variants/ab/ab/{sha}_w320.webp"
+
+
+def test_uploaded_image_gets_rendered_variants(client, db_session, monkeypatch):
+    from PIL import Image
+
+    from app import imaging
+
+    monkeypatch.setattr(config, "MEDIA_VARIANT_WIDTHS", "160,320,1280")
+    monkeypatch.setattr(config, "MEDIA_PREVIEW_WIDTH", 300)
+    db_session.add(models.Forum(fid=113, forum_name="Test Forum 14"))
+    db_session.commit()
+
+    a = create_user(client, "media_render", "media_render@example.com")
+    token = client.post("/login", json={"email": "media_render@example.com", "password": "Aa1!aaaa"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    png = io.BytesIO()
+    Image.new("RGB", (800, 600), (200, 30, 30)).save(png, format="PNG")
+    res = client.post(
+        "/posts/",
+        data={"post_content": "rendered photo", "forum_id": 113},
+        files=[("files", ("photo.png", png.getvalue(), "image/png"))],
+        headers=headers,
+    )
+    assert res.status_code == 200
+    blob = blob_for(db_session, res.json()["images"][0]["path"])
+
+    source = os.path.join(config.UPLOAD_ROOT, *blob.path.split("/"))
+    variants = imaging.render_variants(source, blob.sha256, imaging._widths(), config.UPLOAD_ROOT)
+    imaging.record_variants(db_session, blob.sha256, variants)
+    db_session.commit()
+
+    rows = db_session.query(models.MediaVariant).filter_by(blob_sha256=blob.sha256).all()
+    assert sorted((v.width, v.height, v.format) for v in rows) == [
+        (160, 120, "png"), (160, 120, "webp"), (320, 240, "png"), (320, 240, "webp"),
+    ]
+    for v in rows:
+        with Image.open(os.path.join(config.UPLOAD_ROOT, *v.path.split("/"))) as rendered:
+            assert rendered.size == (v.width, v.height)
+            assert rendered.format == v.format.upper()
+
+    res = client.get("/posts/forum/113", headers=headers)
+    assert res.status_code == 200
+    image = res.json()[0]["images"][0]
+    assert image["path"] == media.url_for(blob.path)
+    assert image["preview_path"] == media.url_for(imaging.variant_path(blob.sha256, 320, "webp"))
+
+
+def test_blob_urls_are_immutable_and_support_ranges(client, db_session):
+    a = create_user(client, "media_serve_a", "media_serve_a@example.com")
+    b = create_user(client, "media_serve_b", "media_serve_b@example.com")
+    chat_id = make_friends_chat(client, db_session, a, b)
+
+    content = bytes(range(256)) * 4
+    up = client.post(
+        f"/chats/{chat_id}/upload",
+        params={"me_id": a['uid']},
+        files={"files": ("clip.mp4", io.BytesIO(content), "video/mp4")},
+    )
+    url = up.json()["attachments"][0]["url"]
+
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.content == content
+    assert "immutable" in full.headers["cache-control"]
+    etag = full.headers["etag"]
+    assert media.relative_path(url).rsplit("/", 1)[1] in etag
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    part = client.get(url, headers={"Range": "bytes=100-199"})
+    assert part.status_code == 206
+    assert part.content == content[100:200]
+    assert part.headers["content-range"] == f"bytes 100-199/{len(content)}"
+
+
+def test_legacy_upload_paths_are_revalidated(client):
+    legacy = os.path.join(config.UPLOAD_ROOT, "post", "legacy_cache.txt")
+    os.makedirs(os.path.dirname(legacy), exist_ok=True)
+    with open(legacy, "wb") as fh:
+        fh.write(b"may be overwritten")
+
+    res = client.get("/uploads/post/legacy_cache.txt")
+    assert res.status_code == 200
+    assert res.headers["cache-control"] == "no-cache"
+    assert res.headers["etag"]
@@ -0,0 +1,113 @@
+import datetime
+import os
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, event, inspect, text
+
+from app import index_usage, models
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def alembic_config(url):
+    cfg = Config()
+    cfg.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    cfg.set_main_option("sqlalchemy.url", url)
+    return cfg
+
+
+def sqlite_engine(url):
+    engine = create_engine(url)
+    event.listen(engine, "connect", lambda conn, record: conn.create_function("now", 0, lambda: "2026-01-01 00:00:00"))
+    return engine
+
+
+def test_upgrade_brings_a_baseline_database_to_head(tmp_path, monkeypatch):
+    """Data in the baseline schema is backfilled, merged and indexed on the way to head"""
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    command.upgrade(alembic_config(url), "0001")
+    engine = sqlite_engine(url)
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (uid, username, email, is_private, is_admin) VALUES "
+            "(1, 'mig_a', 'mig_a@example.com', 0, 0), (2, 'mig_b', 'mig_b@example.com', 0, 0)"
+        ))
+        conn.execute(text("INSERT INTO forum (fid, forum_name) VALUES (1, 'Migrations')"))
+        conn.execute(text("INSERT INTO post (pid, post_content, forum_id, user_id) VALUES (1, 'legacy #Exams and #exams #ก๋วยเตี๋ยว', 1, 1)"))
+        conn.execute(text("INSERT INTO likes (user_id, post_id) VALUES (1, 1), (2, 1)"))
+        conn.execute(text("INSERT INTO follows (follower_id, following_id) VALUES (2, 1)"))
+        conn.execute(text("INSERT INTO notifications (id, title, message, target_role) VALUES (1, 'All', 'hello', 'user')"))
+        conn.execute(text("INSERT INTO notification_reads (notification_id, user_id) VALUES (1, 2)"))
+        conn.execute(text("INSERT INTO study_sessions (sid, user_id, start_time) VALUES (1, 1, '2025-12-31 23:00:00')"))
+        # a day the old read-then-insert race duplicated
+        conn.execute(text(
+            "INSERT INTO daily_progress (id, user_id, date, total_minutes, badge_level, total_seconds) VALUES "
+            "(1, 1, '2026-05-01 00:00:00', 10, 0, 600), (2, 1, '2026-05-01 00:00:00', 1, 1, 90), "
+            "(3, 1, '2026-05-02 00:00:00', 2, 0, 120)"
+        ))
+
+    command.upgrade(alembic_config(url), "head")
+
+    inspector = inspect(engine)
+    assert {"ix_post_forum_pid", "ix_post_user_pid"} <= {i["name"] for i in inspector.get_indexes("post")}
+    assert "ix_likes_post_id" in {i["name"] for i in inspector.get_indexes("likes")}
+    assert "uq_daily_progress_user_local_date" in {i["name"] for i in inspector.get_indexes("daily_progress")}
+    assert "ix_daily_progress_user_date" not in {i["name"] for i in inspector.get_indexes("daily_progress")}
+    assert "ix_study_sessions_open_heartbeat" in {i["name"] for i in inspector.get_indexes("study_sessions")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT like_count, comment_count FROM post WHERE pid = 1")).one() == (2, 0)
+        days = conn.execute(text(
+            "SELECT id, local_date, total_seconds, total_minutes, badge_level FROM daily_progress ORDER BY id"
+        )).all()
+        assert [tuple(d) for d in days] == [(1, "2026-05-01", 690, 11, 1), (3, "2026-05-02", 120, 2, 0)]
+        # open sessions count as last seen when the migration ran, not when they started
+        heartbeat = conn.execute(text("SELECT last_heartbeat_at FROM study_sessions WHERE sid = 1")).scalar()
+        migrated_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        assert abs(datetime.datetime.fromisoformat(heartbeat) - migrated_at) < datetime.timedelta(minutes=5)
+        assert conn.execute(text("SELECT uid, follower_count FROM users ORDER BY uid")).all() == [(1, 1), (2, 0)]
+        badge_rows = conn.execute(text("SELECT uid, unread_notifications, unread_messages FROM user_badges ORDER BY uid")).all()
+        assert [tuple(r) for r in badge_rows] == [(1, 1, 0), (2, 0, 0)]
+        tags = conn.execute(text("SELECT tag FROM post_hashtags WHERE post_id = 1 ORDER BY tag")).scalars().all()
+        assert tags == ["exams", "ก๋วยเตี๋ยว"]
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == "0009"
+
+
+def test_migrations_build_the_schema_of_the_models(tmp_path, monkeypatch):
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    url = f"sqlite:///{tmp_path / 'fresh.db'}"
+    command.upgrade(alembic_config(url), "head")
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn)
+        diff = compare_metadata(context, models.Base.metadata)
+    # SQLite cannot add a constraint to a table, so 0005 leaves the unique index without one there
+    unique_day = [d for d in diff if d[1].name == "uq_daily_progress_user_local_date"]
+    assert sorted(d[0] for d in unique_day) == ["add_constraint", "remove_index"]
+    assert [d for d in diff if d not in unique_day] == []
+
+    command.downgrade(alembic_config(url), "base")
+    assert inspect(engine).get_table_names() == ["alembic_version"]
+
+
+def test_index_usage_report_flags_unused_secondary_indexes():
+    def usage(name, scans, unique=False, primary=False):
+        return index_usage.IndexUsage(
+            table_name="post", index_name=name, scans=scans, tuples_read=scans * 10,
+            size_bytes=16384, size="16 kB", is_unique=unique, is_primary=primary, is_valid=True,
+        )
+
+    rows = [usage("post_pkey", 0, unique=True, primary=True), usage("ix_post_user_pid", 0), usage("ix_post_forum_pid", 42)]
+    assert [r.index_name for r in rows if r.unused] == ["ix_post_user_pid"]
+
+    report = index_usage.format_report(rows)
+    lines = report.splitlines()
+    assert lines[0] == "Index scans since the statistics were last reset"
+    assert "primary key" in next(line for line in lines if "post_pkey" in line)
+    assert next(line for line in lines if "ix_post_user_pid" in line).endswith("unused")
+    assert lines[-1] == "1 unused index(es), 16 kB in total."
@@ -251,3 +251,126 @@ def test_notification_types(client, db_session):
         res = client.post("/notification/", json=payload, headers=headers)
         if res.status_code == 200:
             assert res.json()['title'] == noti_type
+
+
+def test_my_notifications_page_in_one_query_with_read_state(client, db_session):
+    from sqlalchemy import event
+    from app import feed
+
+    me = create_user(client, "noti_pager", "noti_pager@example.com")
+    senders = [create_user(client, f"noti_sender_{i}", f"noti_sender_{i}@example.com") for i in range(3)]
+    notis = [
+        models.Notification(title="Like", message=f"like {i}", sender_id=senders[i % 3]['uid'],
+                            receiver_id=me['uid'], target_role="user")
+        for i in range(5)
+    ]
+    db_session.add_all(notis)
+    db_session.commit()
+    db_session.add(models.NotificationRead(notification_id=notis[4].id, user_id=me['uid']))
+    db_session.commit()
+
+    token = client.post("/login", json={"email": "noti_pager@example.com", "password": "Aa1!aaaa"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get("/notification/me", headers=headers)     # warm the identity cache
+
+    statements = []
+
+    def count_statement(*args):
+        statements.append(args[2])
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", count_statement)
+    try:
+        first = client.get("/notification/me", params={"limit": 3}, headers=headers)
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", count_statement)
+    assert first.status_code == 200
+    assert len(statements) == 1
+
+    mine = [n for n in first.json() if n["receiver_id"] == me['uid']]
+    assert [n["id"] for n in mine] == [notis[4].id, notis[3].id, notis[2].id][:len(mine)]
+    assert mine[0]["is_read"] is True
+    assert mine[0]["sender_username"] == "noti_sender_1"
+
+    seen = [n["id"] for n in first.json()]
+    cursor = first.headers[feed.NEXT_CURSOR_HEADER]
+    for _ in range(10):
+        if not cursor:
+            break
+        page = client.get("/notification/me", params={"limit": 3, "cursor": cursor}, headers=headers)
+        seen += [n["id"] for n in page.json()]
+        cursor = page.headers.get(feed.NEXT_CURSOR_HEADER)
+    assert not cursor, "cursor never ran out"
+    assert {n.id for n in notis} <= set(seen)
+    assert len(seen) == len(set(seen))
+
+
+def test_notification_summary_returns_page_and_unread_count(client, db_session):
+    me = create_user(client, "noti_summary", "noti_summary@example.com")
+    other = create_user(client, "noti_summary_other", "noti_summary_other@example.com")
+    token = client.post("/login", json={"email": "noti_summary@example.com", "password": "Aa1!aaaa"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    before = client.get("/notification/me/summary", headers=headers).json()["unread_count"]
+    mine = models.Notification(title="Follow", message="followed you", sender_id=other['uid'],
+                               receiver_id=me['uid'], target_role="user")
+    not_mine = models.Notification(title="Follow", message="followed someone else", sender_id=me['uid'],
+                                   receiver_id=other['uid'], target_role="user")
+    db_session.add_all([mine, not_mine])
+    db_session.commit()
+
+    res = client.get("/notification/me/summary", params={"limit": 1}, headers=headers)
+    assert res.status_code == 200
+    body = res.json()
+    assert body["unread_count"] == before + 1
+    assert body["items"][0]["id"] == mine.id
+    assert body["items"][0]["is_read"] is False
+    assert client.get("/notification/me/unread/count", headers=headers).json()["unread_count"] == before + 1
+
+    client.post(f"/notification/{mine.id}/read", headers=headers)
+    assert client.get("/notification/me/summary", headers=headers).json()["unread_count"] == before
+
+
+def test_system_notifications_filter_by_title_before_paging(client, db_session):
+    me = create_user(client, "noti_system", "noti_system@example.com")
+    replies = [
+        models.Notification(title="HelpReportReply", message=f"reply {i}", receiver_id=me['uid'], target_role="user")
+        for i in range(3)
+    ]
+    updates = [
+        models.Notification(title="Help Update", message=f"update {i}", receiver_id=me['uid'], target_role="user")
+        for i in range(3)
+    ]
+    db_session.add_all(replies + updates)
+    db_session.commit()
+
+    first = client.get(f"/notification/system/{me['uid']}", params={"title": "HelpReportReply", "limit": 2})
+    assert [n["id"] for n in first.json()] == [replies[2].id, replies[1].id]
+    rest = client.get(
+        f"/notification/system/{me['uid']}",
+        params={"title": "HelpReportReply", "cursor": first.headers["X-Next-Cursor"]},
+    )
+    assert [n["id"] for n in rest.json()] == [replies[0].id]
+    assert "X-Next-Cursor" not in rest.headers
+
+    assert len(client.get(f"/notification/system/{me['uid']}").json()) == 6
+    assert client.get(f"/notification/system/{me['uid']}", params={"title": "Follow"}).json() == []
+
+
+def test_notification_cursor_survives_deleting_the_boundary(client, db_session):
+    me = create_user(client, "noti_boundary", "noti_boundary@example.com")
+    notis = [
+        models.Notification(title="HelpReportReply", message=f"reply {i}", receiver_id=me['uid'], target_role="user")
+        for i in range(3)
+    ]
+    db_session.add_all(notis)
+    db_session.commit()
+
+    first = client.get(f"/notification/system/{me['uid']}", params={"limit": 2})
+    assert [n["id"] for n in first.json()] == [notis[2].id, notis[1].id]
+
+    db_session.delete(notis[1])
+    db_session.commit()
+
+    rest = client.get(f"/notification/system/{me['uid']}", params={"cursor": first.headers["X-Next-Cursor"]})
+    assert rest.status_code == 200
+    assert [n["id"] for n in rest.json()] == [notis[0].id]
@@ -1,4 +1,4 @@
-from app import models
+from app import identity, models
 
 
 def test_create_post_and_comment_and_like(client, db_session):
@@ -179,3 +179,298 @@ def test_like_post_multiple_users(client, db_session):
     
     like2 = client.post(f"/posts/{post_id}/like", headers=headers2)
     assert like2.status_code == 200
+
+
+def _signup_and_login(client, username):
+    user = {"username": username, "email": f"{username}@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    uid = client.post("/users/", json=user).json()["uid"]
+    login = client.post("/login", json={"email": user["email"], "password": "Aa1!aaaa"})
+    return uid, {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+
+def test_feed_hydrates_likes_and_comments_in_fixed_queries(client, db_session):
+    """Feed query count should not grow with the number of posts/comments"""
+    from sqlalchemy import event
+
+    forum = models.Forum(fid=105, forum_name="Test Forum 7")
+    db_session.add(forum)
+    db_session.commit()
+
+    author_id, author_headers = _signup_and_login(client, "feed_author")
+    _, viewer_headers = _signup_and_login(client, "feed_viewer")
+
+    def make_posts(n):
+        for i in range(n):
+            pid = client.post("/posts/", data={"post_content": f"Feed {i}", "forum_id": "105"}, headers=author_headers).json()["pid"]
+            client.post(f"/posts/{pid}/comments", data={"content": "hi"}, headers=viewer_headers)
+            client.post(f"/posts/{pid}/like", headers=viewer_headers)
+
+    statements = []
+
+    def count_statement(*args):
+        statements.append(args[2])
+
+    def fetch_feed():
+        statements.clear()
+        identity.cache.clear()
+        event.listen(db_session.get_bind(), "before_cursor_execute", count_statement)
+        try:
+            res = client.get("/posts/", params={"user_id": author_id}, headers=viewer_headers)
+        finally:
+            event.remove(db_session.get_bind(), "before_cursor_execute", count_statement)
+        assert res.status_code == 200
+        return res.json(), len(statements)
+
+    make_posts(2)
+    posts, small_page_queries = fetch_feed()
+    assert len(posts) == 2
+    for p in posts:
+        assert p["like_count"] == 1
+        assert p["liked"] is True
+        assert [c["username"] for c in p["comments"]] == ["feed_viewer"]
+
+    make_posts(3)
+    posts, large_page_queries = fetch_feed()
+    assert len(posts) == 5
+    assert large_page_queries == small_page_queries
+
+
+def test_feed_embeds_only_the_newest_comments(client, db_session, monkeypatch):
+    """Feed pages carry FEED_COMMENTS_PER_POST comments per post; single-post responses have them all"""
+    from app import config
+
+    monkeypatch.setattr(config, "FEED_COMMENTS_PER_POST", 2)
+    forum = models.Forum(fid=111, forum_name="Test Forum 12")
+    db_session.add(forum)
+    db_session.commit()
+
+    author_id, headers = _signup_and_login(client, "cap_author")
+    busy = client.post("/posts/", data={"post_content": "Busy", "forum_id": "111"}, headers=headers).json()["pid"]
+    quiet = client.post("/posts/", data={"post_content": "Quiet", "forum_id": "111"}, headers=headers).json()["pid"]
+    for text in ("one", "two", "three", "four"):
+        client.post(f"/posts/{busy}/comments", data={"content": text}, headers=headers)
+    client.post(f"/posts/{quiet}/comments", data={"content": "only"}, headers=headers)
+
+    posts = {p["pid"]: p for p in client.get("/posts/forum/111", headers=headers).json()}
+    assert [c["content"] for c in posts[busy]["comments"]] == ["three", "four"]
+    assert posts[busy]["comment_count"] == 4
+    assert [c["content"] for c in posts[quiet]["comments"]] == ["only"]
+
+    single = client.get(f"/posts/{busy}", headers=headers).json()
+    assert [c["content"] for c in single["comments"]] == ["one", "two", "three", "four"]
+    edited = client.put(f"/posts/{busy}", json={"post_content": "Busier"}, headers=headers).json()
+    assert [c["content"] for c in edited["comments"]] == ["one", "two", "three", "four"]
+
+    everything = client.get(f"/posts/{busy}/comments", headers=headers).json()
+    assert [c["content"] for c in everything] == ["one", "two", "three", "four"]
+
+
+def test_feed_keyset_pagination(client, db_session):
+    """Pages are bounded by limit and chained with the next-cursor header"""
+    forum = models.Forum(fid=106, forum_name="Test Forum 8")
+    db_session.add(forum)
+    db_session.commit()
+
+    author_id, headers = _signup_and_login(client, "page_author")
+    created = [
+        client.post("/posts/", data={"post_content": f"Page {i}", "forum_id": "106"}, headers=headers).json()["pid"]
+        for i in range(5)
+    ]
+
+    first = client.get("/posts/forum/106", params={"limit": 2}, headers=headers)
+    assert first.status_code == 200
+    assert [p["pid"] for p in first.json()] == created[::-1][:2]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get("/posts/forum/106", params={"limit": 2, "cursor": cursor}, headers=headers)
+    assert [p["pid"] for p in second.json()] == created[::-1][2:4]
+
+    last = client.get("/posts/forum/106", params={"limit": 2, "before_pid": created[1]}, headers=headers)
+    assert [p["pid"] for p in last.json()] == [created[0]]
+    assert "X-Next-Cursor" not in last.headers
+
+    bad = client.get("/posts/forum/106", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert bad.status_code == 400
+
+
+def test_hashtag_counts_and_tag_feed(client, db_session):
+    """Tags are indexed on write; the tag pages count and page posts without reading post text"""
+    db_session.add(models.Forum(fid=112, forum_name="Test Forum 13"))
+    db_session.commit()
+
+    _, headers = _signup_and_login(client, "tag_author")
+    texts = ["#Exams are near #tutoring", "more #exams", "#exams #EXAMS again", "no tags here"]
+    pids = [
+        client.post("/posts/", data={"post_content": text, "forum_id": "112"}, headers=headers).json()["pid"]
+        for text in texts
+    ]
+
+    counts = {t["name"]: t["count"] for t in client.get("/posts/hashtags", headers=headers).json()}
+    assert counts["exams"] == 3
+    assert counts["tutoring"] == 1
+    assert [t["name"] for t in client.get("/posts/hashtags", params={"q": "#TUT"}, headers=headers).json()] == ["tutoring"]
+
+    first = client.get("/posts/hashtag/Exams", params={"limit": 2}, headers=headers)
+    assert [p["pid"] for p in first.json()] == [pids[2], pids[1]]
+    rest = client.get("/posts/hashtag/exams", params={"cursor": first.headers["X-Next-Cursor"]}, headers=headers)
+    assert [p["pid"] for p in rest.json()] == [pids[0]]
+
+    # Edits re-index the post, deletes drop it
+    client.put(f"/posts/{pids[0]}", json={"post_content": "now about #tutoring only"}, headers=headers)
+    assert client.delete(f"/posts/{pids[1]}", headers=headers).status_code == 204
+    counts = {t["name"]: t["count"] for t in client.get("/posts/hashtags", headers=headers).json()}
+    assert counts["exams"] == 1
+    assert counts["tutoring"] == 1
+    assert [p["pid"] for p in client.get("/posts/hashtag/exams", headers=headers).json()] == [pids[2]]
+
+
+def test_post_counters_follow_likes_and_comments(client, db_session):
+    """like_count/comment_count stay in step and can be rebuilt from source tables"""
+    from app import counters
+
+    forum = models.Forum(fid=107, forum_name="Test Forum 9")
+    db_session.add(forum)
+    db_session.commit()
+
+    _, author_headers = _signup_and_login(client, "count_author")
+    _, fan_headers = _signup_and_login(client, "count_fan")
+    pid = client.post("/posts/", data={"post_content": "Count me", "forum_id": "107"}, headers=author_headers).json()["pid"]
+
+    client.post(f"/posts/{pid}/like", headers=author_headers)
+    client.post(f"/posts/{pid}/like", headers=fan_headers)
+    cid = client.post(f"/posts/{pid}/comments", data={"content": "one"}, headers=fan_headers).json()["cid"]
+    client.post(f"/posts/{pid}/comments", data={"content": "two"}, headers=author_headers)
+
+    post = client.get(f"/posts/{pid}", headers=fan_headers).json()
+    assert (post["like_count"], post["comment_count"]) == (2, 2)
+
+    client.post(f"/posts/{pid}/like", headers=author_headers)
+    assert client.delete(f"/posts/comments/{cid}", headers=fan_headers).status_code == 204
+
+    post = client.get(f"/posts/{pid}", headers=fan_headers).json()
+    assert (post["like_count"], post["comment_count"]) == (1, 1)
+
+    # Drift gets repaired by the reconciliation pass
+    db_session.query(models.Post).filter(models.Post.pid == pid).update({"like_count": 42, "comment_count": 7})
+    db_session.commit()
+    counters.recompute_post_counters(db_session)
+    db_session.commit()
+    db_session.expire_all()
+
+    refreshed = db_session.query(models.Post).filter(models.Post.pid == pid).one()
+    assert (refreshed.like_count, refreshed.comment_count) == (1, 1)
+
+
+def test_following_feed_from_precomputed_timeline(client, db_session, monkeypatch):
+    """Fan-out-on-write timeline, with read-merge for high-follower authors"""
+    from app import config
+
+    monkeypatch.setattr(config, "TIMELINE_FANOUT_ENABLED", True)
+    monkeypatch.setattr(config, "TIMELINE_FANOUT_MAX_FOLLOWERS", 1)
+
+    forum = models.Forum(fid=108, forum_name="Test Forum 10")
+    db_session.add(forum)
+    db_session.commit()
+
+    reader_id, reader_headers = _signup_and_login(client, "tl_reader")
+    writer_id, writer_headers = _signup_and_login(client, "tl_writer")
+    star_id, star_headers = _signup_and_login(client, "tl_star")
+    _, fan_headers = _signup_and_login(client, "tl_fan")
+
+    def post_as(headers, text):
+        return client.post("/posts/", data={"post_content": text, "forum_id": "108"}, headers=headers).json()["pid"]
+
+    def following_feed():
+        return [p["pid"] for p in client.get("/posts/following", headers=reader_headers).json()]
+
+    old_post = post_as(writer_headers, "before follow")
+    client.post(f"/follow/{writer_id}", headers=reader_headers)
+    assert following_feed() == [old_post]  # backfilled on follow
+
+    own_post = post_as(reader_headers, "mine")
+    new_post = post_as(writer_headers, "after follow")
+    assert following_feed() == [new_post, own_post, old_post]
+    assert db_session.query(models.TimelineEntry).filter_by(user_id=reader_id).count() == 3
+
+    # The star has two followers, so their posts are merged in on read, not fanned out
+    client.post(f"/follow/{star_id}", headers=reader_headers)
+    client.post(f"/follow/{star_id}", headers=fan_headers)
+    star_post = post_as(star_headers, "big news")
+    assert db_session.query(models.TimelineEntry).filter_by(post_id=star_post).count() == 1
+    assert following_feed() == [star_post, new_post, own_post, old_post]
+
+    client.delete(f"/follow/{writer_id}", headers=reader_headers)
+    assert following_feed() == [star_post, own_post]
+
+    def follower_counts():
+        db_session.expire_all()
+        rows = db_session.query(models.User.uid, models.User.follower_count).filter(models.User.uid.in_([writer_id, star_id]))
+        return dict(rows.all())
+
+    assert follower_counts() == {writer_id: 0, star_id: 2}
+    assert client.delete("/users/delete", headers=fan_headers).status_code == 200
+    assert follower_counts() == {writer_id: 0, star_id: 1}
+
+
+def test_read_merged_posts_stay_when_an_author_drops_below_the_fanout_limit(client, db_session, monkeypatch):
+    """Posts made while an author was read-merged are backfilled once they are fanned out again"""
+    from app import config
+
+    monkeypatch.setattr(config, "TIMELINE_FANOUT_ENABLED", True)
+    monkeypatch.setattr(config, "TIMELINE_FANOUT_MAX_FOLLOWERS", 1)
+    db_session.add(models.Forum(fid=602, forum_name="Fanout Forum"))
+    db_session.commit()
+
+    reader_id, reader_headers = _signup_and_login(client, "drop_reader")
+    star_id, star_headers = _signup_and_login(client, "drop_star")
+    _, fan_headers = _signup_and_login(client, "drop_fan")
+    client.post(f"/follow/{star_id}", headers=reader_headers)
+    client.post(f"/follow/{star_id}", headers=fan_headers)
+
+    star_post = client.post("/posts/", data={"post_content": "while big", "forum_id": "602"}, headers=star_headers).json()["pid"]
+    assert db_session.query(models.TimelineEntry).filter_by(user_id=reader_id, post_id=star_post).count() == 0
+
+    client.delete(f"/follow/{star_id}", headers=fan_headers)
+    assert db_session.query(models.TimelineEntry).filter_by(user_id=reader_id, post_id=star_post).count() == 1
+    assert [p["pid"] for p in client.get("/posts/following", headers=reader_headers).json()] == [star_post]
+
+
+def test_feeds_hide_blocked_and_private_authors_without_short_pages(client, db_session):
+    """Blocks (either way) and unfollowed private accounts are filtered in SQL, so pages stay full"""
+    db_session.add(models.Forum(fid=110, forum_name="Visibility Forum"))
+    db_session.commit()
+
+    viewer_id, viewer = _signup_and_login(client, "vis_viewer")
+    _, public = _signup_and_login(client, "vis_public")
+    blocked_id, blocked = _signup_and_login(client, "vis_blocked")
+    blocker_id, blocker = _signup_and_login(client, "vis_blocker")
+    private_id, private = _signup_and_login(client, "vis_private")
+    friend_id, friend = _signup_and_login(client, "vis_friend")
+
+    def post(headers, text):
+        return client.post("/posts/", data={"post_content": text, "forum_id": "110"}, headers=headers).json()["pid"]
+
+    visible = [post(public, "public 1")]
+    hidden = [post(blocked, "blocked"), post(blocker, "blocker"), post(private, "private")]
+    visible += [post(friend, "private friend"), post(viewer, "mine"), post(public, "public 2")]
+
+    db_session.add(models.Block(blocker_id=viewer_id, blocked_id=blocked_id))
+    db_session.add(models.Block(blocker_id=blocker_id, blocked_id=viewer_id))
+    db_session.query(models.User).filter(models.User.uid.in_([private_id, friend_id])).update({"is_private": True})
+    db_session.add(models.Follow(follower_id=viewer_id, following_id=friend_id))
+    db_session.commit()
+
+    first = client.get("/posts/forum/110", params={"limit": 2}, headers=viewer)
+    second = client.get("/posts/forum/110", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]}, headers=viewer)
+    assert [p["pid"] for p in first.json() + second.json()] == visible[::-1]
+    assert "X-Next-Cursor" not in second.headers
+
+    for pid in hidden:
+        assert client.get(f"/posts/{pid}", headers=viewer).status_code == 404
+    assert client.get(f"/posts/{blocker_id}/posts", headers=viewer).json() == []
+    assert client.get(f"/posts/{private_id}/posts", headers=viewer).json() == []
+    assert [p["pid"] for p in client.get(f"/posts/{friend_id}/posts", headers=viewer).json()] == [visible[1]]
+
+    # The private author and the blocker still see their own posts
+    assert client.get(f"/posts/{hidden[2]}", headers=private).status_code == 200
+    assert client.get(f"/posts/{hidden[1]}", headers=blocker).status_code == 200
@@ -0,0 +1,28 @@
+from app import scheduler
+
+
+def test_scheduler_runs_each_job_once_per_interval(db_session):
+    calls = []
+
+    def job(name):
+        def run(db):
+            calls.append(name)
+            return 1
+        return run
+
+    def broken(db):
+        raise RuntimeError("boom")
+
+    jobs = [
+        scheduler.Job("fast", 10, job("fast")),
+        scheduler.Job("slow", 60, job("slow")),
+        scheduler.Job("broken", 10, broken),
+    ]
+    s = scheduler.Scheduler(jobs, db_session.get_bind(), lambda: db_session)
+
+    # SQLite has no advisory locks, so this process is always the leader
+    assert s.run_due(now=0) == {"fast": 1, "slow": 1}
+    assert s.run_due(now=5) == {}
+    assert s.run_due(now=10) == {"fast": 1}
+    assert s.run_due(now=60) == {"fast": 1, "slow": 1}
+    assert calls == ["fast", "slow", "fast", "fast", "slow"]
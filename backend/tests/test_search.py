@@ -0,0 +1,80 @@
+from app import feed, models
+
+
+def create_user(client, username, email, name=None):
+    payload = {"username": username, "email": email, "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    r = client.post("/users/", json=payload)
+    assert r.status_code == 201
+    user = r.json()
+    if name:
+        token = client.post("/login", json={"email": email, "password": "Aa1!aaaa"}).json()["access_token"]
+        client.put(f"/users/{user['uid']}", json={"name": name}, headers={"Authorization": f"Bearer {token}"})
+    return user
+
+
+def login(client, email):
+    token = client.post("/login", json={"email": email, "password": "Aa1!aaaa"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_user_search_ranks_exact_then_prefix_then_substring(client):
+    create_user(client, "xq_mango_fan", "xq_mango_fan@example.com")
+    create_user(client, "xqmango", "xqmango@example.com")
+    create_user(client, "xq_other", "xq_other@example.com", name="Xqmango Lover")
+    create_user(client, "the_xqmango_guy", "the_xqmango_guy@example.com")
+
+    res = client.get("/search/users", params={"q": "XQMango"})
+    assert res.status_code == 200
+    assert [u["username"] for u in res.json()] == ["xqmango", "xq_other", "the_xqmango_guy"]
+    assert set(res.json()[0]) == {"uid", "username", "name", "profile_image"}
+
+    # Short queries are prefix-only (autocomplete)
+    short = [u["username"] for u in client.get("/search/users", params={"q": "xq"}).json()]
+    assert short == ["xqmango", "xq_other", "xq_mango_fan"]
+
+
+def test_user_search_is_paginated_and_escapes_wildcards(client):
+    for i in range(5):
+        create_user(client, f"pg_search_{i}", f"pg_search_{i}@example.com")
+
+    first = client.get("/search/users", params={"q": "pg_search_", "limit": 3})
+    assert len(first.json()) == 3
+    cursor = first.headers[feed.NEXT_CURSOR_HEADER]
+    second = client.get("/search/users", params={"q": "pg_search_", "limit": 3, "cursor": cursor})
+    assert len(second.json()) == 2
+    assert feed.NEXT_CURSOR_HEADER not in second.headers
+    names = [u["username"] for u in first.json() + second.json()]
+    assert sorted(names) == [f"pg_search_{i}" for i in range(5)]
+
+    # "_" and "%" are literal characters, not LIKE wildcards
+    assert client.get("/search/users", params={"q": "pg%search"}).json() == []
+    assert client.get("/search/users", params={"q": "x", "cursor": "bogus"}).status_code == 400
+
+    # The legacy endpoint goes through the same search, with a limit
+    legacy = client.get("/users/search", params={"q": "pg_search_", "limit": 2})
+    assert len(legacy.json()) == 2
+
+
+def test_post_search_matches_content_and_comments_and_hides_blocked(client, db_session):
+    db_session.add(models.Forum(fid=500, forum_name="Search Forum"))
+    db_session.commit()
+    author = create_user(client, "search_author", "search_author@example.com")
+    blocked = create_user(client, "search_blocked", "search_blocked@example.com")
+    viewer = create_user(client, "search_viewer", "search_viewer@example.com")
+
+    by_content = models.Post(post_content="Notes on Quokkalogy 101", forum_id=500, user_id=author["uid"])
+    by_comment = models.Post(post_content="unrelated", forum_id=500, user_id=author["uid"])
+    hidden = models.Post(post_content="more quokkalogy", forum_id=500, user_id=blocked["uid"])
+    db_session.add_all([by_content, by_comment, hidden])
+    db_session.flush()
+    db_session.add(models.Comment(post_id=by_comment.pid, user_id=viewer["uid"], username="search_viewer", content="see quokkalogy notes"))
+    db_session.commit()
+
+    headers = login(client, "search_viewer@example.com")
+    assert client.post(f"/block/{blocked['uid']}", headers=headers).status_code in (200, 201)
+
+    res = client.get("/search/posts", params={"q": "quokkalogy"}, headers=headers)
+    assert res.status_code == 200
+    assert {p["pid"] for p in res.json()} == {by_content.pid, by_comment.pid}
+
+    assert client.get("/search/posts", params={"q": "quokkalogy"}).status_code == 401
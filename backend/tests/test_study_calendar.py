@@ -23,7 +23,7 @@ def test_get_daily_progress_no_data_returns_zero(client):
     assert body["total_seconds"] == 0
 
 
-def test_start_and_stop_session_with_monkeypatched_upsert(client, db_session, monkeypatch):
+def test_start_and_stop_session(client, db_session):
     # create a user
     payload = {
         "username": "sc_user2",
@@ -35,44 +35,6 @@ def test_start_and_stop_session_with_monkeypatched_upsert(client, db_session, mo
     assert r.status_code == 201
     user = r.json()
 
-    # monkeypatch upsert_daily_progress to a sqlite-friendly implementation
-    import app.routers.study_calendar as sc
-
-    def fake_upsert(db, user_id: int, add_seconds: int, badge: int, target_day_utc: datetime.datetime):
-        # find or create daily progress for target day (compare by Bangkok date YYYY-MM-DD)
-        from sqlalchemy import func
-
-        # target_day_utc is the start of the Bangkok day in UTC time
-        # Convert it back to Bangkok to get the actual date that was intended
-        tz = ZoneInfo("Asia/Bangkok")
-        target_date_bangkok = target_day_utc.astimezone(tz).date().isoformat()
-        
-        # Query using Bangkok date conversion (same as the calendar endpoint)
-        dp = (
-            db.query(models.DailyProgress)
-            .filter(models.DailyProgress.user_id == user_id)
-            .filter(func.date(models.DailyProgress.date) == target_date_bangkok)
-            .first()
-        )
-        if not dp:
-            dp = models.DailyProgress(
-                user_id=user_id,
-                date=target_day_utc,
-                total_seconds=add_seconds,
-                total_minutes=add_seconds // 60,
-                badge_level=badge,
-            )
-            db.add(dp)
-        else:
-            dp.total_seconds = (dp.total_seconds or 0) + add_seconds
-            dp.total_minutes = (dp.total_seconds or 0) // 60
-            dp.badge_level = max(dp.badge_level or 0, badge)
-        db.commit()
-        return {"total_seconds": dp.total_seconds, "total_minutes": dp.total_minutes, "badge_level": dp.badge_level}
-
-    # patch into module
-    monkeypatch.setattr(sc, "upsert_daily_progress", fake_upsert)
-
     # start session (user_id is a query param for this endpoint)
     start = client.post("/study/start", params={"user_id": user["uid"]})
     assert start.status_code == 200
@@ -84,6 +46,9 @@ def test_start_and_stop_session_with_monkeypatched_upsert(client, db_session, mo
     body = stop.json()
     assert "total_seconds" in body and "total_minutes" in body
 
+    # a stopped session is not credited twice
+    assert client.post(f"/study/stop/{sid}").json() == {"error": "Invalid session"}
+
 def test_calendar_returns_entries(client, db_session):
     # create user and a daily progress entry directly
     u = {"username": "cal_user", "email": "cal@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
@@ -104,3 +69,85 @@ def test_calendar_returns_entries(client, db_session):
     key = today_bangkok.strftime("%Y-%m-%d")
     assert key in data
     assert data[key]["total_minutes"] == 30
+
+
+def test_close_sessions_splits_days_and_credits_them_in_one_batch(client, db_session):
+    from app import study
+
+    uids = []
+    for name in ("sc_bulk1", "sc_bulk2"):
+        u = {"username": name, "email": f"{name}@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+        r = client.post("/users/", json=u)
+        assert r.status_code == 201
+        uids.append(r.json()["uid"])
+
+    def bangkok(*args):
+        return datetime.datetime(*args, tzinfo=ZoneInfo("Asia/Bangkok")).astimezone(datetime.timezone.utc)
+
+    # 22:00 -> 01:30 the next night, and two sessions of the other user on one day
+    sessions = [
+        models.StudySession(user_id=uids[0], start_time=bangkok(2026, 3, 9, 22)),
+        models.StudySession(user_id=uids[1], start_time=bangkok(2026, 3, 10, 9)),
+        models.StudySession(user_id=uids[1], start_time=bangkok(2026, 3, 10, 11)),
+    ]
+    db_session.add_all(sessions)
+    db_session.commit()
+    sids = [s.sid for s in sessions]
+
+    assert [d.seconds for d in study.split_by_day(sessions[0].start_time, bangkok(2026, 3, 10, 1, 30))] == [7200, 5400]
+
+    closed = study.close_sessions(db_session, models.StudySession.sid.in_(sids), end_time=bangkok(2026, 3, 10, 12))
+    db_session.commit()
+    assert sorted(c.sid for c in closed) == sorted(sids)
+    # every open session matching the criteria was closed; nothing is closed twice
+    assert study.close_sessions(db_session, models.StudySession.sid.in_(sids)) == []
+
+    rows = (
+        db_session.query(models.DailyProgress)
+        .filter(models.DailyProgress.user_id.in_(uids))
+        .order_by(models.DailyProgress.user_id, models.DailyProgress.local_date)
+        .all()
+    )
+    assert [(r.user_id, r.local_date, r.total_seconds) for r in rows] == [
+        (uids[0], datetime.date(2026, 3, 9), 7200),
+        (uids[0], datetime.date(2026, 3, 10), 12 * 3600),
+        (uids[1], datetime.date(2026, 3, 10), 3 * 3600 + 3600),
+    ]
+
+    res = client.get(f"/study/calendar/{uids[0]}/2026/3")
+    assert set(res.json()) == {"2026-03-09", "2026-03-10"}
+    assert client.get(f"/study/progress/{uids[1]}/2026/3/10").json()["total_seconds"] == 4 * 3600
+
+
+def test_heartbeat_and_stale_session_reaper(client, db_session):
+    from app import study
+
+    u = {"username": "sc_reaper", "email": "sc_reaper@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    r = client.post("/users/", json=u)
+    assert r.status_code == 201
+    uid = r.json()["uid"]
+
+    sid = client.post("/study/start", params={"user_id": uid}).json()["sid"]
+    # starting again resumes the open session instead of opening another
+    assert client.post("/study/start", params={"user_id": uid}).json()["sid"] == sid
+    assert client.post(f"/study/heartbeat/{sid}").json()["active"] is True
+
+    # the client went away 20 minutes after starting, and has been silent for an hour
+    now = datetime.datetime.now(datetime.timezone.utc)
+    session = db_session.get(models.StudySession, sid)
+    session.start_time = now - datetime.timedelta(minutes=80)
+    session.last_heartbeat_at = now - datetime.timedelta(minutes=60)
+    db_session.commit()
+
+    assert study.reap_stale_sessions(db_session, timeout_seconds=600) >= 1
+    db_session.expire_all()
+    session = db_session.get(models.StudySession, sid)
+    assert session.end_time is not None
+
+    credited = sum(
+        p.total_seconds for p in db_session.query(models.DailyProgress).filter(models.DailyProgress.user_id == uid)
+    )
+    assert credited == 20 * 60
+    assert client.get(f"/study/active/{uid}").json()["active"] is False
+    assert client.post(f"/study/heartbeat/{sid}").json()["active"] is False
+    assert client.post(f"/study/stop/{sid}").json() == {"error": "Invalid session"}
@@ -2,75 +2,17 @@
 Integration tests for study-calendar endpoints.
 These tests are marked with @pytest.mark.integration and should run
 against a real Postgres database (e.g., in GitHub Actions CI).
-They verify the Postgres-specific SQL (timezone, date_trunc, ON CONFLICT UPSERT).
-
-Locally, the upsert_daily_progress function is monkeypatched to use SQLAlchemy
-instead of raw SQL so tests can run on SQLite. In CI with Postgres, the real
-SQL is used.
+They verify the day bucketing (local_date) and the ON CONFLICT upsert, which
+use the same statements on SQLite locally and on Postgres in CI.
 """
 import datetime
 from zoneinfo import ZoneInfo
-import os
 import pytest
 from app import models
-from sqlalchemy import func, text
-
-# Only run integration tests if Postgres is configured (DATABASE_URL set)
-POSTGRES_AVAILABLE = "postgresql" in os.environ.get("DATABASE_URL", "").lower()
-
-
-@pytest.fixture
-def patch_upsert_for_sqlite(monkeypatch, request):
-    """
-    If running on SQLite (not Postgres), monkeypatch upsert_daily_progress
-    to use SQLAlchemy instead of raw SQL so tests can run locally.
-    """
-    if POSTGRES_AVAILABLE:
-        # Postgres is available, don't patch; use the real SQL
-        yield
-        return
-
-    # Patch for SQLite
-    import app.routers.study_calendar as sc
-
-    def fake_upsert(db, user_id: int, add_seconds: int, badge: int, target_day_utc: datetime.datetime):
-        """SQLite-friendly upsert using SQLAlchemy."""
-        # target_day_utc is the start of the Bangkok day in UTC time
-        # Convert it back to Bangkok to get the actual date that was intended
-        tz = ZoneInfo("Asia/Bangkok")
-        target_date_bangkok = target_day_utc.astimezone(tz).date().isoformat()
-        
-        # Query using Bangkok date conversion (same as the calendar endpoint)
-        dp = (
-            db.query(models.DailyProgress)
-            .filter(models.DailyProgress.user_id == user_id)
-            .filter(func.date(models.DailyProgress.date) == target_date_bangkok)
-            .first()
-        )
-        if not dp:
-            dp = models.DailyProgress(
-                user_id=user_id,
-                date=target_day_utc,
-                total_seconds=add_seconds,
-                total_minutes=add_seconds // 60,
-                badge_level=badge,
-            )
-            db.add(dp)
-        else:
-            dp.total_seconds = (dp.total_seconds or 0) + add_seconds
-            dp.total_minutes = (dp.total_seconds or 0) // 60
-            dp.badge_level = max(dp.badge_level or 0, badge)
-        db.commit()
-        return {"total_seconds": dp.total_seconds, "total_minutes": dp.total_minutes, "badge_level": dp.badge_level}
-
-    original_upsert = sc.upsert_daily_progress
-    monkeypatch.setattr(sc, "upsert_daily_progress", fake_upsert)
-    yield
-    monkeypatch.setattr(sc, "upsert_daily_progress", original_upsert)
 
 
 @pytest.mark.integration
-def test_upsert_daily_progress_raw_sql_inserts_new_record(client, db_session, patch_upsert_for_sqlite):
+def test_upsert_daily_progress_raw_sql_inserts_new_record(client, db_session):
     """Test that upsert_daily_progress inserts a new DailyProgress row when none exists."""
     # create a user
     payload = {"username": "int_user1", "email": "int_user1@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
@@ -104,7 +46,7 @@ def test_upsert_daily_progress_raw_sql_inserts_new_record(client, db_session, pa
 
 
 @pytest.mark.integration
-def test_upsert_daily_progress_raw_sql_updates_existing_record(client, db_session, patch_upsert_for_sqlite):
+def test_upsert_daily_progress_raw_sql_updates_existing_record(client, db_session):
     """Test that upsert_daily_progress updates total_seconds/badge when a record already exists for today."""
     # create a user
     payload = {"username": "int_user2", "email": "int_user2@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
@@ -133,7 +75,7 @@ def test_upsert_daily_progress_raw_sql_updates_existing_record(client, db_sessio
 
 
 @pytest.mark.integration
-def test_get_calendar_returns_daily_progress_across_month(client, db_session, patch_upsert_for_sqlite):
+def test_get_calendar_returns_daily_progress_across_month(client, db_session):
     """Test that calendar endpoint returns DailyProgress entries for a month using Postgres-specific date filtering."""
     payload = {"username": "int_user3", "email": "int_user3@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
     r = client.post("/users/", json=payload)
@@ -179,7 +121,7 @@ def test_get_daily_progress_returns_zeros_for_date_with_no_activity(client):
 
 
 @pytest.mark.integration
-def test_timezone_conversion_in_calendar_query(client, db_session, patch_upsert_for_sqlite):
+def test_timezone_conversion_in_calendar_query(client, db_session):
     """
     Test that the calendar endpoint correctly filters by date using timezone conversion.
     This verifies that the Postgres timezone(...) function works in the query.
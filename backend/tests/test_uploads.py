@@ -0,0 +1,74 @@
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+from app import config, uploads
+
+
+def make_upload(name, data, content_type="application/octet-stream"):
+    return UploadFile(io.BytesIO(data), filename=name, headers=Headers({"content-type": content_type}))
+
+
+def test_save_upload_streams_hashes_and_renames(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_CHUNK_SIZE", 4)
+    data = b"0123456789abcdef-tail"
+    dest = tmp_path / "nested" / "clip.png"
+
+    stored = uploads.save_upload(make_upload("../clip.png", data, "image/png"), str(dest))
+
+    assert dest.read_bytes() == data
+    assert stored.size == len(data)
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert stored.kind == "image"
+    assert stored.original_name == "clip.png"
+    assert os.listdir(dest.parent) == ["clip.png"]  # no temp file left behind
+
+
+def test_save_upload_over_quota_leaves_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_CHUNK_SIZE", 8)
+    monkeypatch.setattr(config, "UPLOAD_MAX_VIDEO_BYTES", 20)
+    dest = tmp_path / "movie.mp4"
+
+    with pytest.raises(HTTPException) as exc:
+        uploads.save_upload(make_upload("movie.mp4", b"x" * 64, "video/mp4"), str(dest))
+
+    assert exc.value.status_code == 413
+    assert os.listdir(tmp_path) == []
+
+
+def test_save_upload_keeps_previous_file_when_replacement_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_MAX_FILE_BYTES", 10)
+    dest = tmp_path / "notes.txt"
+    dest.write_bytes(b"original")
+
+    with pytest.raises(HTTPException):
+        uploads.save_upload(make_upload("notes.txt", b"y" * 50), str(dest))
+
+    assert dest.read_bytes() == b"original"
+
+
+def test_file_kind():
+    assert uploads.file_kind("a.JPG") == "image"
+    assert uploads.file_kind("a.mkv") == "video"
+    assert uploads.file_kind("a.pdf") == "pdf"
+    assert uploads.file_kind("blob", "video/webm") == "video"
+    assert uploads.file_kind("notes.txt", "text/plain") == "file"
+
+
+def test_avatar_upload_rejects_oversized_image(client, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_MAX_IMAGE_BYTES", 16)
+    payload = {"username": "big_avatar", "email": "big_avatar@example.com", "password": "Aa1!aaaa", "confirm_password": "Aa1!aaaa"}
+    client.post("/users/", json=payload)
+    token = client.post("/login", json={"email": payload["email"], "password": "Aa1!aaaa"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    res = client.post(
+        "/users/upload-avatar",
+        files={"file": ("huge.png", io.BytesIO(b"p" * 64), "image/png")},
+        headers=headers,
+    )
+    assert res.status_code == 413
@@ -48,11 +48,11 @@ def test_get_user_with_auth(client, db_session):
     db_session.commit()
     db_session.refresh(user)
 
-    # override oauth2.get_current_user to return this user
+    # override oauth2.get_current_principal to return this user
     def override_current_user():
         return user
 
-    client.app.dependency_overrides[oauth2.get_current_user] = override_current_user
+    client.app.dependency_overrides[oauth2.get_current_principal] = override_current_user
 
     res = client.get(f"/users/{user.uid}")
     assert res.status_code == 200
@@ -61,7 +61,7 @@ def test_get_user_with_auth(client, db_session):
     assert data["username"] == user.username
 
     # cleanup override
-    client.app.dependency_overrides.pop(oauth2.get_current_user, None)
+    client.app.dependency_overrides.pop(oauth2.get_current_principal, None)
 
 
 def test_upload_avatar_and_update_profile(client, db_session, tmp_path):
@@ -6,6 +6,9 @@ export default function NotificationsAdmin() {
   const [notifications, setNotifications] = useState([]);
   const [grouped, setGrouped] = useState({});
   const [sections, setSections] = useState([]);
+  // Cursor of the next (older) page (X-Next-Cursor)
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   function groupByDate(notifs) {
     if (!notifs || notifs.length === 0) return {};
@@ -37,56 +40,70 @@ export default function NotificationsAdmin() {
     return groupedData;
   }
 
-  useEffect(() => {
-    async function fetchAdminNotifications() {
-      try {
-        const key = localStorage.getItem("currentUserKey");
-        const auth = key ? JSON.parse(localStorage.getItem(key)) : null;
-
-        if (!auth?.token) {
-          console.error("No auth token found");
-          return;
-        }
-
-        const response = await fetch(`${API_URL}/notification/admin`, {
-          headers: { Authorization: `Bearer ${auth.token}` },
-        });
-
-        if (!response.ok) throw new Error("Failed to fetch notifications");
-
-        const raw = await response.json();
-
-        const formatted = raw.map((n) => ({
-          id: n.id,
-          name: n.sender_username,
-          avatar: n.sender_avatar
-            ? `${API_URL}${n.sender_avatar}`
-            : "/images/default-avatar.png",
-          created_at: n.created_at,
-          text: n.message,
-          is_read: n.is_read || false,
-        }));
-
-        setNotifications(formatted);
-
-        const groupedData = groupByDate(formatted);
-        setGrouped(groupedData);
-
-        const order = ["today", "yesterday"];
-        const extra = Object.keys(groupedData)
-          .filter((k) => !order.includes(k))
-          .sort()
-          .reverse();
-
-        setSections(order.filter((k) => groupedData[k]).concat(extra));
-      } catch (err) {
-        console.error("Fetch error:", err);
+  // The first page of notifications, or the page after `cursor`
+  async function fetchAdminNotifications(cursor = null) {
+    try {
+      const key = localStorage.getItem("currentUserKey");
+      const auth = key ? JSON.parse(localStorage.getItem(key)) : null;
+
+      if (!auth?.token) {
+        console.error("No auth token found");
+        return;
       }
+
+      const response = await fetch(
+        cursor
+          ? `${API_URL}/notification/admin?cursor=${encodeURIComponent(cursor)}`
+          : `${API_URL}/notification/admin`,
+        { headers: { Authorization: `Bearer ${auth.token}` } }
+      );
+
+      if (!response.ok) throw new Error("Failed to fetch notifications");
+
+      const raw = await response.json();
+
+      const formatted = raw.map((n) => ({
+        id: n.id,
+        name: n.sender_username,
+        avatar: n.sender_avatar
+          ? `${API_URL}${n.sender_avatar}`
+          : "/images/default-avatar.png",
+        created_at: n.created_at,
+        text: n.message,
+        is_read: n.is_read || false,
+      }));
+
+      setNotifications((prev) => (cursor ? [...prev, ...formatted] : formatted));
+      setNextCursor(response.headers.get("X-Next-Cursor"));
+    } catch (err) {
+      console.error("Fetch error:", err);
     }
+  }
 
+  useEffect(() => {
     fetchAdminNotifications();
   }, []);
 
+  useEffect(() => {
+    const groupedData = groupByDate(notifications);
+    setGrouped(groupedData);
+
+    const order = ["today", "yesterday"];
+    const extra = Object.keys(groupedData)
+      .filter((k) => !order.includes(k))
+      .sort()
+      .reverse();
+
+    setSections(order.filter((k) => groupedData[k]).concat(extra));
+  }, [notifications]);
+
+  const handleLoadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    await fetchAdminNotifications(nextCursor);
+    setLoadingMore(false);
+  };
+
   return (
     <div className="flex flex-col w-full h-[calc(100vh-64px)] bg-white overflow-hidden">
       <div className="p-6 border-b bg-white">
@@ -125,6 +142,18 @@ export default function NotificationsAdmin() {
             </div>
           </div>
         ))}
+
+        {nextCursor && (
+          <div className="flex justify-center">
+            <button
+              onClick={handleLoadMore}
+              disabled={loadingMore}
+              className="px-4 py-2 border mb-2 hover:bg-gray-200 rounded-lg"
+            >
+              {loadingMore ? "Loading…" : "Load more"}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
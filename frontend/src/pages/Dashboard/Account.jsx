@@ -20,6 +20,9 @@ export default function Account() {
   const [following, setFollowing] = useState(0);
   const [file, setFile] = useState(null);
   const [myPosts, setMyPosts] = useState([]);
+  // Cursor of the next page of my posts (X-Next-Cursor)
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [editingPost, setEditingPost] = useState(null);
   const [deletingPost, setDeletingPost] = useState(null);
   const [editContent, setEditContent] = useState("");
@@ -57,17 +60,7 @@ export default function Account() {
             : "/images/default-avatar.png"
         );
 
-        // Load your own posts (except for timers)
-        const postsRes = await fetch(`${API_URL}/posts/me`, {
-          headers: { Authorization: `Bearer ${authData.token}` },
-        });
-        if (postsRes.ok) {
-          const postsData = await postsRes.json();
-          const filtered = postsData.filter(
-            (p) => !p.category?.toLowerCase().includes("time")
-          );
-          setMyPosts(filtered);
-        }
+        await fetchMyPosts(authData.token);
       } catch (err) {
         console.error("Error loading profile:", err);
       }
@@ -76,6 +69,39 @@ export default function Account() {
     fetchData();
   }, []);
 
+  // Load your own posts (except for timers): the first page, or the page after `cursor`
+  const fetchMyPosts = async (token, cursor = null) => {
+    const postsRes = await fetch(
+      cursor ? `${API_URL}/posts/me?cursor=${encodeURIComponent(cursor)}` : `${API_URL}/posts/me`,
+      { headers: { Authorization: `Bearer ${token}` } }
+    );
+    if (postsRes.ok) {
+      const postsData = await postsRes.json();
+      const filtered = postsData.filter(
+        (p) => !p.category?.toLowerCase().includes("time")
+      );
+      setMyPosts((prev) => (cursor ? [...prev, ...filtered] : filtered));
+      setNextCursor(postsRes.headers.get("X-Next-Cursor"));
+    }
+  };
+
+  const handleLoadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    const currentKey = localStorage.getItem("currentUserKey");
+    const token = currentKey
+      ? JSON.parse(localStorage.getItem(currentKey) || "{}")?.token
+      : null;
+    if (!token) return;
+
+    setLoadingMore(true);
+    try {
+      await fetchMyPosts(token, nextCursor);
+    } catch (err) {
+      console.error("Error loading posts:", err);
+    }
+    setLoadingMore(false);
+  };
+
   // Calculate age
   const calculateAge = (birth) => {
     if (!birth) return "";
@@ -550,6 +576,18 @@ export default function Account() {
         </div>
         ))
         )}
+
+        {nextCursor && (
+          <div className="mt-4 flex justify-center">
+            <button
+              onClick={handleLoadMore}
+              disabled={loadingMore}
+              className="px-4 py-2 border mb-2 hover:bg-gray-200 rounded-lg"
+            >
+              {loadingMore ? t("common.loading") : t("common.loadMore")}
+            </button>
+          </div>
+        )}
     </div>
 
     {/*Edit Modal (exactly like the Board page) */}
@@ -453,6 +453,9 @@ function formatTimeAgo(createdAt, t) {
 // Main Board
 export default function Board() {
   const [posts, setPosts] = useState([]);
+  // Cursor of the next page of the current tab (X-Next-Cursor), null on the last page
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [newPost, setNewPost] = useState("");
   const [search, setSearch] = useState("");
   const [activeTab, setActiveTab] = useState("university");
@@ -493,64 +496,77 @@ export default function Board() {
   const videoInputRef = useRef(null);
   const menuRef = useRef(null);
 
-  useEffect(() => {
-    const fetchPosts = async () => {
-      const currentKey = localStorage.getItem("currentUserKey");
-      const token = currentKey
-        ? JSON.parse(localStorage.getItem(currentKey) || "{}")?.token
-        : null;
+  // Load the first page of the current tab, or the page after `cursor`
+  const fetchPosts = async (cursor = null) => {
+    const currentKey = localStorage.getItem("currentUserKey");
+    const token = currentKey
+      ? JSON.parse(localStorage.getItem(currentKey) || "{}")?.token
+      : null;
 
-      if (!token) return;
+    if (!token) return;
 
-      const endpoint =
-        activeTab === "follow"
-          ? `${API_URL}/posts/following`
-          : `${API_URL}/posts/all`;
-
-      try {
-        const res = await fetch(endpoint, {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-      
-        if (!res.ok) throw new Error("Failed to fetch posts");
-        const data = await res.json();
-
-        const loaded = data.map((p) => ({
-          id: p.pid,
-          user_id: p.user_id,
-          username: p.username,
-          displayName: p.name || p.username,
-          text: p.post_content,
-          minutes: Math.floor((Date.now() - new Date(p.created_at)) / 60000),
-          liked: p.liked,
-          likes: p.like_count,
-          profile_image: p.profile_image,
-          comments:
-            p.comments?.map((c) => ({
-              cid: c.cid || c.id || c.comment_id,
-              username: c.username,
-              content: c.content,
-              profile_image: c.profile_image,
-              minutes: Math.floor(
-                (Date.now() - new Date(c.created_at)) / 60000
-              ),
-              created_at: c.created_at,
-              files: c.files || [],
-            })) || [],
-          images: p.images || [],
-          created_at: p.created_at,
-          category: activeTab,
-        }));
-
-        setPosts(loaded.length > 0 ? loaded : []);
-
-      } catch (err) {
-        console.error("Error loading posts:", err);
-      }
-    };
+    const endpoint =
+      activeTab === "follow"
+        ? `${API_URL}/posts/following`
+        : `${API_URL}/posts/all`;
+
+    try {
+      const res = await fetch(
+        cursor ? `${endpoint}?cursor=${encodeURIComponent(cursor)}` : endpoint,
+        { headers: { Authorization: `Bearer ${token}` } }
+      );
+    
+      if (!res.ok) throw new Error("Failed to fetch posts");
+      const data = await res.json();
+
+      const loaded = data.map((p) => ({
+        id: p.pid,
+        user_id: p.user_id,
+        username: p.username,
+        displayName: p.name || p.username,
+        text: p.post_content,
+        minutes: Math.floor((Date.now() - new Date(p.created_at)) / 60000),
+        liked: p.liked,
+        likes: p.like_count,
+        profile_image: p.profile_image,
+        comments:
+          p.comments?.map((c) => ({
+            cid: c.cid || c.id || c.comment_id,
+            username: c.username,
+            content: c.content,
+            profile_image: c.profile_image,
+            minutes: Math.floor(
+              (Date.now() - new Date(c.created_at)) / 60000
+            ),
+            created_at: c.created_at,
+            files: c.files || [],
+          })) || [],
+        // The feed only carries the newest comments; see handleLoadAllComments.
+        commentCount: p.comment_count ?? p.comments?.length ?? 0,
+        images: p.images || [],
+        created_at: p.created_at,
+        category: activeTab,
+      }));
+
+      setPosts((prev) => (cursor ? [...prev, ...loaded] : loaded));
+      setNextCursor(res.headers.get("X-Next-Cursor"));
+
+    } catch (err) {
+      console.error("Error loading posts:", err);
+    }
+  };
 
+  useEffect(() => {
+    setNextCursor(null);
     fetchPosts();
   }, [activeTab]); // Important: You must include the activeTab.
+
+  const handleLoadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    await fetchPosts(nextCursor);
+    setLoadingMore(false);
+  };
   const forumIdMap = {
   university: 1, // University Talk → forum id 1
   follow: 2,     // Follow Talk → forum id 2
@@ -611,6 +627,7 @@ const handlePost = async () => {
         likes: 0,
         liked: false,
         comments: [],
+        commentCount: 0,
         category: activeTab,
         images: created.images || [],
       },
@@ -660,6 +677,49 @@ const handlePost = async () => {
     setOpenComments((prev) => ({ ...prev, [id]: !prev[id] }));
   };
 
+  // Load every comment of a post (the feed only has the newest few)
+  const handleLoadAllComments = async (postId) => {
+    try {
+      const currentKey = localStorage.getItem("currentUserKey");
+      const token = currentKey
+        ? JSON.parse(localStorage.getItem(currentKey) || "{}")?.token
+        : null;
+
+      if (!token) return;
+
+      const res = await fetch(`${API_URL}/posts/${postId}/comments`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+
+      if (!res.ok) throw new Error("Failed to load comments");
+      const data = await res.json();
+
+      setPosts((prev) =>
+        prev.map((p) =>
+          p.id === postId
+            ? {
+                ...p,
+                comments: data.map((c) => ({
+                  cid: c.cid || c.id || c.comment_id,
+                  username: c.username,
+                  content: c.content,
+                  profile_image: c.profile_image,
+                  minutes: Math.floor(
+                    (Date.now() - new Date(c.created_at)) / 60000
+                  ),
+                  created_at: c.created_at,
+                  files: c.files || [],
+                })),
+                commentCount: data.length,
+              }
+            : p
+        )
+      );
+    } catch (err) {
+      console.error("Error loading comments:", err);
+    }
+  };
+
   // Add comment
   const handleAddComment = async (postId) => {
     const content = commentInputs[postId]?.trim();
@@ -708,6 +768,7 @@ const handlePost = async () => {
                     files: newComment.files || [],
                   },
                 ],
+                commentCount: p.commentCount + 1,
               }
             : p
         )
@@ -823,7 +884,11 @@ const handlePost = async () => {
       setPosts((prev) =>
         prev.map((p) =>
           p.id === postId
-            ? { ...p, comments: p.comments.filter((_, i) => i !== commentIndex) }
+            ? {
+                ...p,
+                comments: p.comments.filter((_, i) => i !== commentIndex),
+                commentCount: Math.max(p.commentCount - 1, 0),
+              }
             : p
         )
       );
@@ -1194,7 +1259,7 @@ const handlePost = async () => {
                       <div key={i}>
                         {isImage && (
                           <img
-                            src={`${API_URL}${img.path}`}
+                            src={`${API_URL}${img.preview_path || img.path}`}
                             alt={`attachment-${i}`}
                             className="w-44 h-44 object-cover rounded-lg border border-gray-200 shadow-sm hover:opacity-80 transition"
                             onClick={() => setPreviewImage(`${API_URL}${img.path}`)}
@@ -1244,7 +1309,7 @@ const handlePost = async () => {
                     onClick={() => handleToggleComment(p.id)}
                     className="flex items-center gap-1 hover:text-blue-600"
                   >
-                    <MessageCircle className="w-4 h-4" /> {p.comments.length}
+                    <MessageCircle className="w-4 h-4" /> {p.commentCount}
                   </button>
                 </div>
                 <div className="text-slate-400 text-xs">
@@ -1255,6 +1320,14 @@ const handlePost = async () => {
               {/* Comment section */}
               {openComments[p.id] && (
                 <div className="mt-3 space-y-2">
+                  {p.commentCount > p.comments.length && (
+                    <button
+                      onClick={() => handleLoadAllComments(p.id)}
+                      className="ml-6 text-xs text-slate-500 hover:text-blue-600"
+                    >
+                      {t("post.viewAllComments", { count: p.commentCount })}
+                    </button>
+                  )}
                   {p.comments.map((c, i) => (
                     <div key={i} className="flex gap-2 ml-6 items-start">
                       <div className="w-8 h-8 rounded-full overflow-hidden bg-gray-200">
@@ -1497,6 +1570,19 @@ const handlePost = async () => {
         {filteredPosts.length === 0 && (
           <p className="text-center text-gray-500">{t("board.noPosts")}</p>
         )}
+
+        {/* Load more */}
+        {nextCursor && (
+          <div className="mt-4 flex justify-center">
+            <button
+              onClick={handleLoadMore}
+              disabled={loadingMore}
+              className="px-4 py-2 border mb-2 hover:bg-gray-200 rounded-lg"
+            >
+              {loadingMore ? t("common.loading") : t("common.loadMore")}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Image Preview Modal */}
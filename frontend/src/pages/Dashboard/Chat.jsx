@@ -54,6 +54,11 @@ export default function Chat() {
 
   const fileInputRef = useRef(null);
   const messagesEndRef = useRef(null);
+  const messagesListRef = useRef(null);
+  // scrollHeight of the message list before older messages were prepended
+  const prependedFromRef = useRef(null);
+  const lastScrollTopRef = useRef(0);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const wsRef = useRef(null);           // WebSocket ref
 
   const makeId = (f) => `${f.name}-${f.size}-${f.lastModified}`;
@@ -75,25 +80,66 @@ export default function Chat() {
     };
   }, []);
 
-  // messages loader
+  const normalizeMessage = (m) => ({
+    id: m.id,
+    sender: m.sender,
+    text: m.text ?? "",
+    kind: m.kind ?? "text",
+    url: m.url ?? null,
+    name: m.name ?? null,
+    createdAt: m.created_at ?? null, //time the message send
+  });
+
+  // messages loader: the newest page of a chat
   const loadMessages = async (chatId) => {
     const res = await fetch(`${API_URL}/chats/${chatId}/messages?me_id=${meId}`, {
       headers: { ...authHeaders },
     });
     if (!res.ok) throw new Error("load messages failed");
-    const raw = await res.json();
-    const normalized = raw.map((m) => ({
-      id: m.id,
-      sender: m.sender,
-      text: m.text ?? "",
-      kind: m.kind ?? "text",
-      url: m.url ?? null,
-      name: m.name ?? null,
-      createdAt: m.created_at ?? null, //time the message send
-    }));
-    setSelected((prev) =>
-      prev && prev.id === chatId ? { ...prev, messages: normalized } : prev
-    );
+    const normalized = (await res.json()).map(normalizeMessage);
+    const olderCursor = res.headers.get("X-Next-Cursor");
+    setSelected((prev) => {
+      if (!prev || prev.id !== chatId) return prev;
+      // Keep the older pages already scrolled into view
+      const first = normalized[0]?.id;
+      const older = first == null ? [] : (prev.messages || []).filter((m) => m.id < first);
+      return {
+        ...prev,
+        messages: [...older, ...normalized],
+        olderCursor: older.length > 0 ? prev.olderCursor : olderCursor,
+      };
+    });
+  };
+
+  // Older messages, when the list is scrolled to the top (`before` cursor)
+  const loadOlderMessages = async () => {
+    const chat = selected;
+    if (!chat?.olderCursor || loadingOlder) return;
+    setLoadingOlder(true);
+    try {
+      const res = await fetch(
+        `${API_URL}/chats/${chat.id}/messages?me_id=${meId}&before=${encodeURIComponent(chat.olderCursor)}`,
+        { headers: { ...authHeaders } }
+      );
+      if (!res.ok) throw new Error("load older messages failed");
+      const older = (await res.json()).map(normalizeMessage);
+      if (older.length > 0) {
+        prependedFromRef.current = messagesListRef.current?.scrollHeight ?? null;
+      }
+      setSelected((prev) =>
+        prev && prev.id === chat.id
+          ? {
+              ...prev,
+              messages: [...older, ...prev.messages],
+              olderCursor: res.headers.get("X-Next-Cursor"),
+            }
+          : prev
+      );
+    } catch (e) {
+      console.error(e);
+    } finally {
+      setLoadingOlder(false);
+    }
   };
 
   // chat list loader
@@ -134,6 +180,13 @@ export default function Chat() {
   }, [meId, token]);
 
   useLayoutEffect(() => {
+    const list = messagesListRef.current;
+    if (prependedFromRef.current != null && list) {
+      // Older messages went in above: keep the same messages in view
+      list.scrollTop += list.scrollHeight - prependedFromRef.current;
+      prependedFromRef.current = null;
+      return;
+    }
     scrollToBottom();
   }, [selected?.id, selected?.messages?.length]);
 
@@ -146,9 +199,11 @@ export default function Chat() {
 
   // WebSocket for real-time
   useEffect(() => {
-    if (!meId) return;
+    if (!meId || !token) return;
 
-    const wsUrl = API_URL.replace("http", "ws") + `/chats/ws/${meId}`;
+    const wsUrl =
+      API_URL.replace("http", "ws") +
+      `/chats/ws/${meId}?token=${encodeURIComponent(token)}`;
     const ws = new WebSocket(wsUrl);
     wsRef.current = ws;
 
@@ -161,7 +216,7 @@ export default function Chat() {
         const data = JSON.parse(event.data);
         console.log("WS event:", data);
 
-        if (data.type === "new_message") {
+        if (data.type === "new_message" || data.type === "message_deleted") {
           const chatId = data.chat_id;
 
           // 1) Update room list + preview + unread
@@ -186,7 +241,7 @@ export default function Chat() {
     return () => {
       ws.close();
     };
-  }, [meId]);
+  }, [meId, token]);
 
   const handleSelectFriend = async (f) => {
     setSelected(f);
@@ -586,7 +641,19 @@ export default function Chat() {
               <p className="text-lg font-semibold">{selected.name}</p>
             </div>
 
-            <div className="flex-1 overflow-y-auto px-6 py-5 flex flex-col gap-3">
+            <div
+              ref={messagesListRef}
+              onScroll={(e) => {
+                const top = e.currentTarget.scrollTop;
+                // Only when the user scrolls up, not while scrollToBottom runs
+                if (top < lastScrollTopRef.current && top < 40) loadOlderMessages();
+                lastScrollTopRef.current = top;
+              }}
+              className="flex-1 overflow-y-auto px-6 py-5 flex flex-col gap-3"
+            >
+              {loadingOlder && (
+                <p className="text-center text-xs text-gray-400">{t("common.loading")}</p>
+              )}
               {(() => {
                 let lastDate = null; // Use it to remember what the latest date is.
 
@@ -6,6 +6,9 @@ const API_URL = `${import.meta.env.VITE_API_URL}`;
 export default function Notifications() {
   const { t } = useTranslation();
   const [notifications, setNotifications] = useState([]);
+  // Cursor of the next (older) page (X-Next-Cursor)
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const handleFollowBack = (id) => {
     setNotifications((prev) =>
@@ -15,7 +18,8 @@ export default function Notifications() {
     );
   };
 
-  useEffect(() => {
+  // The first page of notifications, or the page after `cursor`
+  async function fetchNotifications(cursor = null) {
     const currentKey = localStorage.getItem("currentUserKey");
     const authData = currentKey
       ? JSON.parse(localStorage.getItem(currentKey) || "{}")
@@ -23,37 +27,50 @@ export default function Notifications() {
 
     if (!authData?.token) return;
 
-    async function fetchNotifications() {
-      try {
-        const res = await fetch(`${API_URL}/notification/me`, {
+    try {
+      const res = await fetch(
+        cursor
+          ? `${API_URL}/notification/me?cursor=${encodeURIComponent(cursor)}`
+          : `${API_URL}/notification/me`,
+        {
           headers: {
             Authorization: `Bearer ${authData.token}`,
           },
-        });
-
-        if (!res.ok) throw new Error("Failed to fetch notifications");
-
-        const raw = await res.json();
-
-        const formatted = raw.map((n) => ({
-          id: n.id,
-          type: n.type || "system",
-          name: n.sender_username,
-          avatar: n.sender_avatar ? `${API_URL}${n.sender_avatar}` : "/images/default-avatar.png",
-          time: groupTime(n.created_at),
-          text: n.message,
-          isFollowing: false,
-        }));
-
-        setNotifications(formatted);
-      } catch (err) {
-        console.error("Error loading notifications:", err);
-      }
+        }
+      );
+
+      if (!res.ok) throw new Error("Failed to fetch notifications");
+
+      const raw = await res.json();
+
+      const formatted = raw.map((n) => ({
+        id: n.id,
+        type: n.type || "system",
+        name: n.sender_username,
+        avatar: n.sender_avatar ? `${API_URL}${n.sender_avatar}` : "/images/default-avatar.png",
+        time: groupTime(n.created_at),
+        text: n.message,
+        isFollowing: false,
+      }));
+
+      setNotifications((prev) => (cursor ? [...prev, ...formatted] : formatted));
+      setNextCursor(res.headers.get("X-Next-Cursor"));
+    } catch (err) {
+      console.error("Error loading notifications:", err);
     }
+  }
 
+  useEffect(() => {
     fetchNotifications();
   }, []);
 
+  const handleLoadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    await fetchNotifications(nextCursor);
+    setLoadingMore(false);
+  };
+
   function groupTime(dateStr) {
     const created = new Date(dateStr);
     const now = new Date();
@@ -154,6 +171,19 @@ export default function Notifications() {
           </div>
         ))}
 
+        {/* Load more */}
+        {nextCursor && (
+          <div className="flex justify-center">
+            <button
+              onClick={handleLoadMore}
+              disabled={loadingMore}
+              className="px-4 py-2 border mb-2 hover:bg-gray-200 rounded-lg"
+            >
+              {loadingMore ? t("common.loading") : t("common.loadMore")}
+            </button>
+          </div>
+        )}
+
       </div>
     </div>
   );
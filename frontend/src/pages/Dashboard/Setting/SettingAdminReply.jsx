@@ -21,6 +21,9 @@ export default function SettingAdminReply() {
   const [items, setItems] = useState([]);
   const [selected, setSelected] = useState(null);
   const [loading, setLoading] = useState(true);
+  // Cursor of the next (older) page of replies (X-Next-Cursor)
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const { t, i18n } = useTranslation();  // use i18next
   //  LOAD USER
   const currentKey = localStorage.getItem("currentUserKey");
@@ -44,7 +47,22 @@ export default function SettingAdminReply() {
 
   const token = authData?.token;
 
-  // FETCH NOTIFICATION
+  // FETCH NOTIFICATION: admin replies only, one page at a time
+  const fetchReplies = async (cursor = null) => {
+    const params = new URLSearchParams({ title: "HelpReportReply" });
+    if (cursor) params.set("cursor", cursor);
+    const res = await fetch(`${API_URL}/notification/system/${uid}?${params}`, {
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+    });
+
+    if (!res.ok) {
+      console.error("❌ Error:", await res.text());
+      return null;
+    }
+    setNextCursor(res.headers.get("X-Next-Cursor"));
+    return res.json();
+  };
+
   useEffect(() => {
     if (!uid) {
       setLoading(false);
@@ -55,24 +73,14 @@ export default function SettingAdminReply() {
       try {
         setLoading(true);
 
-        const res = await fetch(`${API_URL}/notification/system/${uid}`, {
-          headers: token ? { Authorization: `Bearer ${token}` } : {},
-        });
-
-        if (!res.ok) {
-          console.error("❌ Error:", await res.text());
+        const replies = await fetchReplies();
+        if (!replies) {
           setItems([]);
           return;
         }
 
-        const data = await res.json();
-        const sorted = data.sort(
-          (a, b) => new Date(b.created_at) - new Date(a.created_at)
-        );
-
-      const filtered = sorted.filter(n => n.title === "HelpReportReply");
-      setItems(filtered);
-      setSelected(filtered[0] || null);
+      setItems(replies);
+      setSelected(replies[0] || null);
       } catch (e) {
         console.error(e);
         setItems([]);
@@ -84,6 +92,19 @@ export default function SettingAdminReply() {
     fetchNotifs();
   }, [uid, token]);
 
+  const handleLoadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const replies = await fetchReplies(nextCursor);
+      if (replies) setItems((prev) => [...prev, ...replies]);
+    } catch (e) {
+      console.error(e);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
 
   //  UI
   return (
@@ -125,6 +146,18 @@ export default function SettingAdminReply() {
                 </span>
             </button>
             ))}
+
+        {!loading && nextCursor && (
+            <div className="p-4 flex justify-center">
+            <button
+                onClick={handleLoadMore}
+                disabled={loadingMore}
+                className="px-4 py-2 border hover:bg-gray-200 rounded-lg text-sm"
+            >
+                {loadingMore ? t("common.loading") : t("common.loadMore")}
+            </button>
+            </div>
+        )}
         </div>
     </aside>
 
@@ -523,7 +523,9 @@ export default function TagDetail() {
   const [pendingFiles, setPendingFiles] = useState([]);
   const [trending, setTrending] = useState([]);
   const [previewImage, setPreviewImage] = useState(null);
-  const [allTags, setAllTags] = useState([]);
+  // Cursor of the next page of this tag's posts (X-Next-Cursor)
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [search, setSearch] = useState("");
   const [suggestions, setSuggestions] = useState([]);
   const [menuOpen, setMenuOpen] = useState(null);
@@ -547,6 +549,37 @@ export default function TagDetail() {
     setOpenComments((prev) => ({ ...prev, [id]: !prev[id] }));
   };
 
+  // Load every comment of a post (the feed only has the newest few)
+  const handleLoadAllComments = async (pid) => {
+    const token = authData?.token;
+    if (!token) return;
+    try {
+      const res = await fetch(`${API_URL}/posts/${pid}/comments`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (!res.ok) throw new Error("Failed to load comments");
+      const data = await res.json();
+      setPosts(prev =>
+        prev.map(p =>
+          p.id === pid
+            ? {
+                ...p,
+                comments: data.map(c => ({
+                  ...c,
+                  files: Array.isArray(c.files)
+                    ? c.files.map(f => ({ ...f, path: normalizeFilePath(f.path) }))
+                    : []
+                })),
+                commentCount: data.length,
+              }
+            : p
+        )
+      );
+    } catch (err) {
+      console.error("Load comments failed:", err);
+    }
+  };
+
   // Delete your own comments
   const handleDeleteComment = async (pid, cid) => {
   const token = authData?.token;
@@ -559,7 +592,11 @@ export default function TagDetail() {
           setPosts(prev =>
           prev.map(p =>
               p.id === pid
-              ? { ...p, comments: p.comments.filter(c => c.cid !== cid) }
+              ? {
+                  ...p,
+                  comments: p.comments.filter(c => c.cid !== cid),
+                  commentCount: Math.max(p.commentCount - 1, 0),
+                }
               : p
           )
           );
@@ -591,45 +628,28 @@ export default function TagDetail() {
 
   useEffect(() => setSearch(`#${tagName}`), [tagName]);
 
-  // Load posts and tags
-  useEffect(() => {
+  const fetchTags = async (params) => {
+    const res = await fetch(`${API_URL}/posts/hashtags?${new URLSearchParams(params)}`, {
+      headers: { Authorization: `Bearer ${authData?.token}` },
+    });
+    if (!res.ok) throw new Error("Failed to fetch tags");
+    return res.json();
+  };
+
+  // Load the first page of the tag's posts, or the page after `cursor`
+  const fetchPosts = async (cursor = null) => {
     const token = authData?.token;
     if (!token) return;
-
-    const fetchPosts = async () => {
     try {
-        const res = await fetch(`${API_URL}/posts/all`, {
-        headers: { Authorization: `Bearer ${token}` },
-        });
-        const data = await res.json();
-
-        // Count tags from all posts
-        const tagCount = {};
-        data.forEach((p) => {
-        const tags = p.post_content?.match(/#[A-Za-z0-9_ก-๙]+/g) || [];
-        tags.forEach((t) => {
-            const clean = t.replace("#", "");
-            tagCount[clean] = (tagCount[clean] || 0) + 1;
-        });
-        });
-
-        const formattedTags = Object.entries(tagCount)
-        .map(([name, count]) => ({ name, count }))
-        .sort((a, b) => b.count - a.count);
-
-        setAllTags(formattedTags);
-        setTrending(formattedTags.slice(0, 20));
-
-        setSuggestions(
-        formattedTags
-            .filter((t) => t.name.toLowerCase().includes(tagName.toLowerCase()))
-            .slice(0, 6)
+        const url = `${API_URL}/posts/hashtag/${encodeURIComponent(tagName)}`;
+        const res = await fetch(
+        cursor ? `${url}?cursor=${encodeURIComponent(cursor)}` : url,
+        { headers: { Authorization: `Bearer ${token}` } }
         );
+        if (!res.ok) throw new Error("Failed to fetch posts");
+        const data = await res.json();
 
-        // Load posts for that tag
-        const regex = new RegExp(`(^|\\s)#${tagName}(\\s|$)`, "i");
-        const filtered = data.filter((p) => regex.test(p.post_content));
-        const mapped = filtered.map((p) => ({
+        const mapped = data.map((p) => ({
         id: p.pid,
         user_id: p.user_id,
         username: p.username,
@@ -648,60 +668,58 @@ export default function TagDetail() {
                 : []
             }))
           : [],
+        // The feed only carries the newest comments; see handleLoadAllComments.
+        commentCount: p.comment_count ?? p.comments?.length ?? 0,
         created_at: p.created_at,
         profile_image: p.profile_image,
         images: Array.isArray(p.images)
           ? p.images.map(img => ({ ...img, path: normalizeFilePath(img.path) }))
           : [],
         }));
-        setPosts(mapped);
+        setPosts(prev => (cursor ? [...prev, ...mapped] : mapped));
+        setNextCursor(res.headers.get("X-Next-Cursor"));
     } catch (err) {
         console.error("Error fetching posts:", err);
     }
-    };
+  };
 
-  const fetchTrending = async () => {
-    try {
-      const res = await fetch(`${API_URL}/tags/trending?limit=10`);
-      const data = await res.json();
+  // Load posts and tags
+  useEffect(() => {
+    if (!authData?.token) return;
 
-      const tags = Array.isArray(data)
-        ? data
-        : data.trending_tags || data.tags || [];
-
-      // If there is no value, use fallback.
-      if (tags.length === 0) {
-        setTrending([
-          { name: "foodaroundTU", count: 30 },
-          { name: "KU85", count: 20 },
-          { name: "Isp", count: 18 },
-        ]);
-      } else {
-        setTrending(tags);
+    const fetchTrending = async () => {
+      try {
+        setTrending(await fetchTags({ limit: 20 }));
+      } catch (err) {
+        console.error("Error fetching trending:", err);
       }
-    } catch (err) {
-      console.error("Error fetching trending:", err);
-      setTrending([
-        { name: "foodaroundTU", count: 30 },
-        { name: "KU85", count: 20 },
-        { name: "Isp", count: 18 },
-      ]);
-    }
-  };
+    };
 
-      fetchPosts();
-      fetchTrending();
-    }, [tagName]);
+    setNextCursor(null);
+    fetchPosts();
+    fetchTrending();
+  }, [tagName]);
+
+  const handleLoadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    await fetchPosts(nextCursor);
+    setLoadingMore(false);
+  };
 
   // Recommended tags
   useEffect(() => {
     const input = search.replace("#", "").trim().toLowerCase();
-    if (!input) return setSuggestions([]);
-    const filtered = allTags
-      .filter((t) => t.name.toLowerCase().includes(input))
-      .slice(0, 6);
-    setSuggestions(filtered);
-  }, [search, allTags]);
+    if (!input || !authData?.token) return setSuggestions([]);
+
+    let stale = false;
+    fetchTags({ q: input, limit: 6 })
+      .then((tags) => !stale && setSuggestions(tags))
+      .catch((err) => console.error("Error fetching tag suggestions:", err));
+    return () => {
+      stale = true;
+    };
+  }, [search]);
 
   const handleSelectTag = (tag) => {
     setIsTyping(false); 
@@ -802,7 +820,11 @@ export default function TagDetail() {
         setPosts((prev) =>
         prev.map((p) =>
             p.id === pid
-            ? { ...p, comments: [...p.comments, newComment] }
+            ? {
+                ...p,
+                comments: [...p.comments, newComment],
+                commentCount: p.commentCount + 1,
+              }
             : p
         )
         );
@@ -850,6 +872,7 @@ export default function TagDetail() {
           likes: 0,
           liked: false,
           comments: [],
+          commentCount: 0,
           created_at: new Date().toISOString(),
           profile_image: created.profile_image,
 
@@ -1204,7 +1227,7 @@ export default function TagDetail() {
                     onClick={() => handleToggleComment(p.id)}
                     className="flex items-center gap-1 hover:text-blue-600"
                     >
-                    <MessageCircle className="w-4 h-4" /> {p.comments.length}
+                    <MessageCircle className="w-4 h-4" /> {p.commentCount}
                     </button>
                 </div>
                 <div className="text-slate-400 text-xs">
@@ -1215,6 +1238,14 @@ export default function TagDetail() {
                 {/* COMMENTS SECTION */}
                 {openComments[p.id] && (
                 <div className="mt-3 space-y-2">
+                    {p.commentCount > p.comments.length && (
+                    <button
+                        onClick={() => handleLoadAllComments(p.id)}
+                        className="ml-6 text-xs text-slate-500 hover:text-blue-600"
+                    >
+                        {t("post.viewAllComments", { count: p.commentCount })}
+                    </button>
+                    )}
                     {p.comments.map((c, i) => (
                     <div key={i} className="flex gap-2 ml-6 items-start">
                         <div className="w-8 h-8 rounded-full overflow-hidden bg-gray-200">
@@ -1454,6 +1485,19 @@ export default function TagDetail() {
               </div>
             ))
           )}
+
+          {/* Load more */}
+          {nextCursor && (
+            <div className="mt-4 flex justify-center">
+              <button
+                onClick={handleLoadMore}
+                disabled={loadingMore}
+                className="px-4 py-2 border mb-2 hover:bg-gray-200 rounded-lg"
+              >
+                {loadingMore ? t("common.loading") : t("common.loadMore")}
+              </button>
+            </div>
+          )}
         </div>
       </div>
 
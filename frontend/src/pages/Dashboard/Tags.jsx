@@ -19,7 +19,8 @@ export default function Tags() {
   const { t } = useTranslation();
   const [allTags, setAllTags] = useState([]);
   const [tags, setTags] = useState([]);
-  const [offset, setOffset] = useState(0);
+  // Cursor of the next page of tags (X-Next-Cursor)
+  const [nextCursor, setNextCursor] = useState(null);
   const [loadingMore, setLoadingMore] = useState(false);
   const [hasMore, setHasMore] = useState(true);
   const [error, setError] = useState(null);
@@ -28,51 +29,42 @@ export default function Tags() {
 
   const colors = ["#4b6043", "#75975e", "#95bb72", "#b3cf99", "#c7ddb5", "#ddead1"];
 
-  // Load posts → extract hashtags
-  useEffect(() => {
+  const getToken = () => {
     const currentKey = localStorage.getItem("currentUserKey");
-    const token = currentKey
+    return currentKey
       ? JSON.parse(localStorage.getItem(currentKey) || "{}")?.token
       : null;
+  };
+
+  // One page of tags with their post counts, most used first
+  const fetchTagPage = async (limit, cursor) => {
+    const params = new URLSearchParams({ limit });
+    if (cursor) params.set("cursor", cursor);
+    const res = await fetch(`${API_URL}/posts/hashtags?${params}`, {
+      headers: { Authorization: `Bearer ${getToken()}` },
+    });
+    if (!res.ok) throw new Error("Failed to fetch tags");
+    const data = await res.json();
+    return {
+      tags: data.map(({ name, count }) => ({ name, num: count })),
+      cursor: res.headers.get("X-Next-Cursor"),
+    };
+  };
 
-    if (!token) {
+  // Load the top 6 plus the first page of the other tags
+  useEffect(() => {
+    if (!getToken()) {
       setError("Please log in to view tags.");
       return;
     }
 
     const fetchTags = async () => {
       try {
-        const res = await fetch(`${API_URL}/posts/all`, {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        if (!res.ok) throw new Error("Failed to fetch posts");
-        const data = await res.json();
-
-        // Count hashtags
-        const tagCount = {};
-        data.forEach((post) => {
-          const text = post.post_content || "";
-          const tags = text.match(/#[A-Za-z0-9_ก-๙]+/g) || [];
-          tags.forEach((t) => {
-            const key = t.replace("#", "");
-            tagCount[key] = (tagCount[key] || 0) + 1;
-          });
-        });
-
-        const formatted = Object.entries(tagCount).map(([name, num]) => ({
-          name,
-          num,
-        })).sort((a, b) => b.num - a.num);
-
-        setAllTags(formatted);
-
-        const others = formatted.slice(6);
-        const initial = others.slice(0, PAGE_SIZE);
-
-        setTags(initial);
-        setOffset(initial.length);
-        setHasMore(others.length > initial.length);
-
+        const page = await fetchTagPage(6 + PAGE_SIZE);
+        setAllTags(page.tags);
+        setTags(page.tags.slice(6));
+        setNextCursor(page.cursor);
+        setHasMore(Boolean(page.cursor));
       } catch (err) {
         console.error(err);
         setError("Error loading tags.");
@@ -83,19 +75,17 @@ export default function Tags() {
   }, []);
 
   const handleLoadMore = async () => {
-    if (loadingMore) return;
+    if (loadingMore || !nextCursor) return;
     setLoadingMore(true);
 
-    await new Promise((r) => setTimeout(r, 200));
-
-    const others = allTags.slice(6);
-    const next = others.slice(offset, offset + PAGE_SIZE);
-
-    setTags((prev) => [...prev, ...next]);
-
-    const newOffset = offset + next.length;
-    setOffset(newOffset);
-    setHasMore(others.length > newOffset);
+    try {
+      const page = await fetchTagPage(PAGE_SIZE, nextCursor);
+      setTags((prev) => [...prev, ...page.tags]);
+      setNextCursor(page.cursor);
+      setHasMore(Boolean(page.cursor));
+    } catch (err) {
+      console.error(err);
+    }
 
     setLoadingMore(false);
   };
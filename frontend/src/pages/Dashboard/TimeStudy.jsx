@@ -4,6 +4,8 @@ import { motion } from "framer-motion";
 import { useTranslation } from "react-i18next";
 
 const API_URL = `${import.meta.env.VITE_API_URL}`;
+// Must stay well under STUDY_SESSION_TIMEOUT_SECONDS, or the server closes the session.
+const HEARTBEAT_MS = 60_000;
 // สร้างวันที่ปัจจุบัน
 // const currentDate = new Date();
 
@@ -132,6 +134,26 @@ function CountTime({ onAfterStop, onSyncSeconds, userObj, token }) {
     return () => id && clearTimeout(id);
   }, [running, syncFromServer]);
 
+  // Tell the server the timer is still running; if the session was closed
+  // meanwhile (e.g. the laptop slept past the timeout), show the saved state.
+  useEffect(() => {
+    if (!running || !sessionId || !token) return;
+
+    const id = setInterval(async () => {
+      try {
+        const res = await fetch(`${API_URL}/study/heartbeat/${sessionId}`, {
+          method: "POST",
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        const data = await res.json();
+        if (!data.active) await syncFromServer();
+      } catch (e) {
+        console.error("heartbeat failed:", e);
+      }
+    }, HEARTBEAT_MS);
+    return () => clearInterval(id);
+  }, [running, sessionId, token, syncFromServer]);
+
   const startSession = async () => {
     if (!userObj?.uid || !token) return;
     try {
@@ -178,6 +200,11 @@ function CountTime({ onAfterStop, onSyncSeconds, userObj, token }) {
       }
   
       const data = await res.json();                       // Total committed
+      if (data.error) {                                   // Already closed by the server
+        await syncFromServer();
+        await onAfterStop?.();
+        return;
+      }
       const secs = data.total_seconds ?? (data.total_minutes || 0) * 60;
       setTime(secs);                                      // New time will automatically fire onSyncSeconds.
       await onAfterStop?.();                              // Call the parent to reload the calendar immediately.
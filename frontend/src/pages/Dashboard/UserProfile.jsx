@@ -49,6 +49,9 @@ export default function UserProfile() {
 
   const [user, setUser] = useState(null);
   const [posts, setPosts] = useState([]);
+  // Cursor of the next page of this user's posts (X-Next-Cursor)
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [studyTime, setStudyTime] = useState({
     seconds: 0,
     time: "00:00:00",
@@ -179,7 +182,10 @@ export default function UserProfile() {
           const postsRes = await fetch(`${API_URL}/posts/${userId}/posts`, {
             headers: { Authorization: `Bearer ${authData.token}` },
           });
-          if (postsRes.ok) setPosts(await postsRes.json());
+          if (postsRes.ok) {
+            setPosts(await postsRes.json());
+            setNextCursor(postsRes.headers.get("X-Next-Cursor"));
+          }
         }
 
       } catch (err) {
@@ -191,6 +197,50 @@ export default function UserProfile() {
     fetchUserData();
   }, [authData, userId, isFollowing, isRequested]);
 
+  const handleLoadMore = async () => {
+    if (!nextCursor || loadingMore || !authData?.token) return;
+    setLoadingMore(true);
+    try {
+      const res = await fetch(
+        `${API_URL}/posts/${userId}/posts?cursor=${encodeURIComponent(nextCursor)}`,
+        { headers: { Authorization: `Bearer ${authData.token}` } }
+      );
+      if (res.ok) {
+        const more = await res.json();
+        setPosts((prev) => [...prev, ...more]);
+        setNextCursor(res.headers.get("X-Next-Cursor"));
+      }
+    } catch (err) {
+      console.error("Error loading posts:", err);
+    }
+    setLoadingMore(false);
+  };
+
+  // The post list only carries each post's newest comments; the opened post shows them all.
+  useEffect(() => {
+    if (!authData?.token || !selectedPost) return;
+    if ((selectedPost.comment_count ?? 0) <= (selectedPost.comments?.length ?? 0)) return;
+
+    const fetchAllComments = async () => {
+      try {
+        const res = await fetch(`${API_URL}/posts/${selectedPost.pid}/comments`, {
+          headers: { Authorization: `Bearer ${authData.token}` },
+        });
+        if (!res.ok) return;
+        const comments = await res.json();
+        setSelectedPost((prev) =>
+          prev && prev.pid === selectedPost.pid
+            ? { ...prev, comments, comment_count: comments.length }
+            : prev
+        );
+      } catch (err) {
+        console.error("Error fetching comments:", err);
+      }
+    };
+
+    fetchAllComments();
+  }, [authData, selectedPost]);
+
   useEffect(() => {
     if (!authData?.token || !userId) return;
 
@@ -690,6 +740,18 @@ export default function UserProfile() {
               ) : (
                 <p className="text-gray-500 italic">{t("userProfile.noPosts")}</p>
               )}
+
+              {nextCursor && (
+                <div className="mt-4 flex justify-center">
+                  <button
+                    onClick={handleLoadMore}
+                    disabled={loadingMore}
+                    className="px-4 py-2 border mb-2 hover:bg-gray-200 rounded-lg"
+                  >
+                    {loadingMore ? t("common.loading") : t("common.loadMore")}
+                  </button>
+                </div>
+              )}
             </div>
 
             {/* Study Time */}